@@ -1,12 +1,11 @@
 """
 The primary application script for Alien Invaders
 
-This is the module with the application code.
+This is the module with the application code. The command line is handled
+in cli.py; run with --help to see the commands.
 """
-
-from consts import *
-from app import *
+from cli import main
 
 # Application code
 if __name__ == '__main__':
-    Planetoids(width=GAME_WIDTH,height=GAME_HEIGHT).run()
+    main()
@@ -8,8 +8,15 @@ This module contains the main controller class for the Planetoids application.
 """
 from consts import *
 from game2d import *
-from wave import *
+from governor import Governor
+from warmup import Warmup
+import atexit
 import json
+import time
+
+# The game modules (wave.py and models.py, which need numpy) are imported while
+# the title screen is up, and the optional diagnostics only when turned on, so
+# the window opens sooner.
 
 # PRIMARY RULE: Planetoids can only access attributes in wave.py via getters/setters
 # Planetoids is NOT allowed to access anything in models.py
@@ -106,9 +113,78 @@ class Planetoids(GameApp):
     # Attribute _livesUFO: number of lives the UFO has left
     # Invariant: _livesUFO is an int
     #
+    # Attribute _autopilot: the bot that plays the wave, for soak testing
+    # Invariant: _autopilot is an Autopilot, or None when a person is playing
+    #
+    # Attribute _governor: the quality governor watching the frame time
+    # Invariant: _governor is a Governor
+    #
+    # Attribute _updateTime: the time spent in the last call to update, in seconds
+    # Invariant: _updateTime is a float >= 0
+    #
+    # Attribute _watchdog: the thread sampling the stack during slow frames
+    # Invariant: _watchdog is a running Watchdog, or None if it is turned off
+    #
+    # Attribute _tracker: charges allocations and collections to frame phases
+    # Invariant: _tracker is an AllocationTracker, or None if it is turned off
+    #
+    # Attribute _collector: moves full garbage collections to breaks in play
+    # Invariant: _collector is a CollectorPolicy, or None if it is turned off
+    #
+    # Attribute _metrics: records frame times and counts for the metrics server
+    # Invariant: _metrics is a Metrics with its server running, or None if it is off
+    #
+    # Attribute _wavefile: the wave file loaded when a game starts
+    # Invariant: _wavefile is a str naming a JSON file
+    #
+    # Attribute _profiler: profiles each game state separately
+    # Invariant: _profiler is a StateProfiler, or None if not profiling
+    #
+    # Attribute _telemetry: writes a record of every frame to the telemetry database
+    # Invariant: _telemetry is a running TelemetryWriter, or None if it is off
+    #
+    # Attribute _warmup: loads the images, sounds and fonts while the title is up
+    # Invariant: _warmup is a Warmup
+    #
+    # Attribute _startup: the clock for the startup report
+    # Invariant: _startup is a StartupClock, or None if there is no report
+    #
 
     # DO NOT MAKE A NEW INITIALIZER!
 
+    # These may be set before the game runs, so start leaves them alone
+    _wavefile = DEFAULT_WAVE
+    _profiler = None
+    _startup = None
+
+    # SETTERS, FOR USE BEFORE THE GAME RUNS
+    def setWaveFile(self, wavefile):
+        """
+        Sets the wave file loaded when a game starts.
+
+        Parameter wavefile: the wave file
+        Precondition: wavefile is a str naming a JSON file
+        """
+        self._wavefile = wavefile
+
+    def setProfiler(self, profiler):
+        """
+        Sets the profiler told the game state on every frame.
+
+        Parameter profiler: the profiler, or None to stop profiling
+        Precondition: profiler is a StateProfiler or None
+        """
+        self._profiler = profiler
+
+    def setStartup(self, startup):
+        """
+        Sets the clock that reports the startup times after the first frame.
+
+        Parameter startup: the clock, or None for no report
+        Precondition: startup is a StartupClock or None
+        """
+        self._startup = startup
+
     # THREE MAIN GAMEAPP METHODS
     def start(self):
         """
@@ -167,190 +243,309 @@ class Planetoids(GameApp):
         # Initialize UFO lives
         self._livesUFO = UFO_LIVES
 
+        # The bot that plays in place of the keyboard, if enabled
+        self._autopilot = None
+        if AUTOPILOT:
+            from autopilot import Autopilot
+            self._autopilot = Autopilot()
+
+        # Watch the frame time and lower the quality when over budget
+        self._governor = Governor(FRAME_BUDGET)
+        self._updateTime = 0.0
+
+        # Catch the stack of any frame that runs past the hitch budget
+        self._watchdog = None
+        if WATCHDOG:
+            from watchdog import Watchdog
+            self._watchdog = Watchdog()
+            self._watchdog.start()
+
+        # Track allocations per phase, printing a summary when the game exits
+        self._tracker = None
+        if MEMTRACK:
+            from memtrack import AllocationTracker
+            self._tracker = AllocationTracker()
+            self._tracker.start()
+            atexit.register(self._tracker.report)
+
+        # Keep full garbage collections out of active play
+        self._collector = None
+        if GC_CONTROL:
+            from gcpolicy import CollectorPolicy
+            self._collector = CollectorPolicy()
+            if GC_REPORT:
+                atexit.register(self._collector.report)
+
+        # Serve frame times and counts to Prometheus on localhost
+        self._metrics = None
+        if METRICS:
+            from metrics import Metrics
+            self._metrics = Metrics()
+            self._metrics.start()
+
+        # Record every frame for offline analysis, writing the rest at exit
+        self._telemetry = None
+        if TELEMETRY:
+            from telemetry import TelemetryWriter
+            self._telemetry = TelemetryWriter()
+            self._telemetry.start()
+            atexit.register(self._telemetry.close)
+
+        # Import the game and load its assets while the title screen is up
+        self._warmup = Warmup()
+        self._warmup.start()
+        if self._startup is not None:
+            self._startup.mark('start')
+
 
     def update(self, dt):
-    """
-    Animates a single frame in the game.
+        """
+        Animates a single frame in the game.
 
-    This method determines the current state of the game and performs the
-    corresponding actions for each state. The primary states are described
-    in the docstring. Helper methods are called for specific tasks such as
-    loading the game, transitioning states, or handling specific game logic.
+        This method determines the current state of the game and performs the
+        corresponding actions for each state. The primary states are described
+        in the docstring. Helper methods are called for specific tasks such as
+        loading the game, transitioning states, or handling specific game logic.
 
-    Parameter dt: The time in seconds since last update
-    Precondition: dt is a number (int or float)
-    """
-    # Check if 's' key is pressed and handle state transitions
-    if self.input.is_key_pressed('s'):
-        # Transition from inactive to welcome state
-        if self._state == STATE_INACTIVE:
-            self._state = STATE_WELCOME
-            self.welcome()
-        # Resume game from paused state
-        elif self._paused:
-            self._state = STATE_CONTINUE
-            self._message = None
-            self._paused = False
-        # Handle welcome state logic
-        elif self._state == STATE_WELCOME:
-            self.welcome_state()
-
-    # Toggle sound on/off with 'n' key in welcome state
-    if self.input.is_key_pressed('n') and self._state == STATE_WELCOME:
-        self._sound = not self._sound  # Toggle sound boolean
-        self._soundLabel = None       # Clear sound label
-        self.welcome()                # Update welcome screen
-
-    # Exit early if game is complete or paused
-    if self._state in {STATE_COMPLETE, STATE_PAUSED}:
-        return
-
-    # Transition from continue to active state
-    if self._state == STATE_CONTINUE:
-        self._state = STATE_ACTIVE
-
-    # Handle loading state: initialize a new wave
-    if self._state == STATE_LOADING:
-        json = self.load_json(DEFAULT_WAVE)  # Load wave data from JSON
-        self._wave = Wave(json)             # Create new Wave object
-        self._state = STATE_ACTIVE          # Transition to active state
-
-    # Update wave if it exists
-    if self._wave is not None:
-        self._wave.update(self.input, dt, self._sound)  # Update game logic
-        # Check if all asteroids and UFOs are destroyed
-        if not self._wave.checkAsteroids() and not self._wave.checkUFO():
-            self.inactive_ast()
-        # Check if the ship is destroyed
-        elif not self._wave.checkShip():
-            self.inactive_ship()
-
-def draw(self):
-    """
-    Draws the game objects to the view.
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        if self._watchdog is not None:
+            self._watchdog.frame_start()
+        if self._profiler is not None:
+            self._profiler.switch(self._state)
+        start = time.perf_counter()
+        if not self._warmup.isDone():
+            self._warmup.step()
+        self.update_state(dt)
+        if self._collector is not None:
+            self._collector.update(self._state)
+        self._updateTime = time.perf_counter() - start
+        if self._metrics is not None:
+            self._metrics.observe('app_update', self._updateTime)
+
+    def update_state(self, dt):
+        """
+        Changes the state and updates the wave for a single frame.
 
-    This method iterates through all game elements and draws them on the screen.
-    The objects drawn depend on the current game state.
-    """
-    # Draw the main message if present
-    if self._message is not None:
-        self._message.draw(self.view)
-
-    # Draw the title if present
-    if self._title is not None:
-        self._title.draw(self.view)
-
-    # Draw the wave and related labels
-    if self._wave is not None:
-        self._wave.draw(self.view)
-        self._lives = self._wave.getLives()            # Update player lives
-        self._livesUFO = self._wave.getUFOLives()      # Update UFO lives
-        self._labelLives.text = "Lives: " + str(self._lives)
-        self._labelLives.draw(self.view)              # Draw lives label
-
-    # Draw paused message if applicable
-    if self._state == STATE_PAUSED and self._message is not None:
-        self._message.draw(self.view)
-
-    # Draw instructions, sound label, and "how to play" text if present
-    if self._instructions is not None:
-        self._instructions.draw(self.view)
-    if self._soundLabel is not None:
-        self._soundLabel.draw(self.view)
-    if self._howto is not None:
-        self._howto.draw(self.view)
-
-def inactive_ast(self):
-    """
-    Handle winning state when all asteroids and UFOs are destroyed.
+        This is the body of update, which times it for the governor.
 
-    Updates the title and message to reflect the win and transitions the state
-    to STATE_COMPLETE.
-    """
-    self._state = STATE_COMPLETE
-    self._wave = None  # Clear the wave
-    # Set winning title
-    self._title = GLabel(text="Congratulations!",
-                         font_name=TITLE_FONT, font_size=TITLE_SIZE - 45)
-    self._title.x = GAME_WIDTH / 2
-    self._title.y = GAME_HEIGHT / 2 + TITLE_OFFSET
-    # Set winning message
-    self._message = GLabel(text="Wave Complete!",
-                           font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 15)
-    self._message.x = GAME_WIDTH / 2
-    self._message.y = GAME_HEIGHT / 2 + MESSAGE_OFFSET
-
-def inactive_ship(self):
-    """
-    Handle state transition when the ship is destroyed.
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        # Check if 's' key is pressed and handle state transitions
+        if self.input.is_key_pressed('s'):
+            # Transition from inactive to welcome state
+            if self._state == STATE_INACTIVE:
+                self._state = STATE_WELCOME
+                self.welcome()
+            # Resume game from paused state
+            elif self._paused:
+                self._state = STATE_CONTINUE
+                self._message = None
+                self._paused = False
+            # Handle welcome state logic
+            elif self._state == STATE_WELCOME:
+                self.welcome_state()
+
+        # Toggle sound on/off with 'n' key in welcome state
+        if self.input.is_key_pressed('n') and self._state == STATE_WELCOME:
+            self._sound = not self._sound  # Toggle sound boolean
+            self._soundLabel = None       # Clear sound label
+            self.welcome()                # Update welcome screen
+
+        # Exit early if game is complete or paused
+        if self._state in {STATE_COMPLETE, STATE_PAUSED}:
+            return
+
+        # Transition from continue to active state
+        if self._state == STATE_CONTINUE:
+            self._state = STATE_ACTIVE
+
+        # Handle loading state: initialize a new wave
+        if self._state == STATE_LOADING:
+            self._warmup.finish()               # Load any assets still waiting
+            from wave import Wave
+            json = self.load_json(self._wavefile)  # Load wave data from JSON
+            self._wave = Wave(json)             # Create new Wave object
+            self._wave.setGovernor(self._governor)
+            if self._tracker is not None:
+                self._wave.addTracker(self._tracker)
+            if self._metrics is not None:
+                self._wave.addTracker(self._metrics)
+            self._wave.setTelemetry(self._telemetry)
+            if self._collector is not None:
+                self._collector.wave_loaded()
+            self._state = STATE_ACTIVE          # Transition to active state
+
+        # Update wave if it exists
+        if self._wave is not None:
+            if self._autopilot is None:
+                self._wave.update(self.input, dt, self._sound)  # Update game logic
+            else:
+                self._autopilot.think(self._wave)  # Let the bot pick the keys
+                self._wave.update(self._autopilot, dt, self._sound)
+            # Check if all asteroids and UFOs are destroyed
+            if not self._wave.checkAsteroids() and not self._wave.checkUFO():
+                self.inactive_ast()
+            # Check if the ship is destroyed
+            elif not self._wave.checkShip():
+                self.inactive_ship()
+
+    def draw(self):
+        """
+        Draws the game objects to the view.
 
-    If lives are left, pauses the game and deducts one life. Otherwise,
-    ends the game and transitions to STATE_COMPLETE.
-    """
-    if self._lives <= 1:  # No lives left
+        This method iterates through all game elements and draws them on the screen.
+        The objects drawn depend on the current game state. The time it takes,
+        with the time of the last update, is reported to the governor.
+        """
+        if self._profiler is not None:
+            self._profiler.switch(self._state)
+        start = time.perf_counter()
+        # Draw the main message if present
+        if self._message is not None:
+            self._message.draw(self.view)
+
+        # Draw the title if present
+        if self._title is not None:
+            self._title.draw(self.view)
+
+        # Draw the wave and related labels
+        if self._wave is not None:
+            self._wave.draw(self.view)
+            self._lives = self._wave.getLives()            # Update player lives
+            self._livesUFO = self._wave.getUFOLives()      # Update UFO lives
+            if self._governor.isCosmeticFrame():           # Refresh label text
+                self._labelLives.text = "Lives: " + str(self._lives)
+            self._labelLives.draw(self.view)              # Draw lives label
+
+        # Draw paused message if applicable
+        if self._state == STATE_PAUSED and self._message is not None:
+            self._message.draw(self.view)
+
+        # Draw instructions, sound label, and "how to play" text if present
+        if self._instructions is not None:
+            self._instructions.draw(self.view)
+        if self._soundLabel is not None:
+            self._soundLabel.draw(self.view)
+        if self._howto is not None:
+            self._howto.draw(self.view)
+
+        drawTime = time.perf_counter() - start
+        self._governor.measure(self._updateTime, drawTime)
+        if self._metrics is not None:
+            self._metrics.observe('app_draw', drawTime)
+            self._metrics.sample(self._state, self._wave)
+        if self._watchdog is not None:
+            self._watchdog.frame_end()
+        if self._profiler is not None:
+            self._profiler.switch(None)
+        if self._startup is not None and not self._startup.isReported():
+            self.startup_report()
+
+    def startup_report(self):
+        """
+        Marks the first frame and the end of the warm-up on the startup clock,
+        printing the report once both have happened.
+        """
+        if not self._startup.isMarked('first frame'):
+            self._startup.mark('first frame')
+        if self._warmup.isDone():
+            self._startup.mark('warm-up')
+            self._startup.report()
+
+    def inactive_ast(self):
+        """
+        Handle winning state when all asteroids and UFOs are destroyed.
+
+        Updates the title and message to reflect the win and transitions the state
+        to STATE_COMPLETE.
+        """
         self._state = STATE_COMPLETE
         self._wave = None  # Clear the wave
-        # Set game over title and message
-        self._title = GLabel(text="Game Over",
-                             font_name=TITLE_FONT, font_size=TITLE_SIZE)
+        # Set winning title
+        self._title = GLabel(text="Congratulations!",
+                             font_name=TITLE_FONT, font_size=TITLE_SIZE - 45)
         self._title.x = GAME_WIDTH / 2
         self._title.y = GAME_HEIGHT / 2 + TITLE_OFFSET
-        self._message = GLabel(text="Try again next time!",
-                               font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE)
+        # Set winning message
+        self._message = GLabel(text="Wave Complete!",
+                               font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 15)
         self._message.x = GAME_WIDTH / 2
         self._message.y = GAME_HEIGHT / 2 + MESSAGE_OFFSET
-    else:  # Lives left, pause game
-        self._lives = self._wave.getLives()  # Update lives
-        self._state = STATE_PAUSED
-        self._paused = True
-        self._wave._ship = self._wave.newShip()  # Create new ship
-        self._message = self._startmessage  # Display start message
-        self.draw()  # Refresh screen
-
-def welcome(self):
-    """
-    Display the welcome screen with instructions and sound toggle.
 
-    This method sets up the labels and messages for the welcome screen.
-    """
-    # Set title and instructions
-    self._title = GLabel(text="Welcome to Planetoids!",
-                         font_name=TITLE_FONT, font_size=TITLE_SIZE - 73)
-    self._title.x = GAME_WIDTH / 2
-    self._title.y = GAME_HEIGHT - 80
-    self._howto = GLabel(text="How to play:",
-                         font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 5)
-    self._howto.x = GAME_WIDTH / 4 + 20
-    self._howto.y = GAME_HEIGHT - 160
-    self._instructions = GLabel(
-        text="Press the up arrow to move forward.\n"
-             "Press the left and right arrows to turn.\n"
-             "Press the spacebar to shoot bullets.",
-        font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 22)
-    self._instructions.x = GAME_WIDTH / 2
-    self._instructions.y = GAME_HEIGHT - 265
-
-    # Set sound toggle label
-    sound_text = "Press N to turn sound OFF" if self._sound else "Press N to turn sound ON"
-    self._soundLabel = GLabel(text=sound_text,
-                              font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 5)
-    self._soundLabel.x = GAME_WIDTH / 2
-    self._soundLabel.y = GAME_HEIGHT / 2 - 30
-
-    # Set start message
-    self._message = self._startmessage
-    self._message.y = GAME_HEIGHT / 2 - 100
-
-def welcome_state(self):
-    """
-    Transition from the welcome state to the loading state.
+    def inactive_ship(self):
+        """
+        Handle state transition when the ship is destroyed.
 
-    This method clears all welcome screen labels and transitions the game
-    to the STATE_LOADING state to initialize the first wave.
-    """
-    self._state = STATE_LOADING
-    self._title = None
-    self._howto = None
-    self._instructions = None
-    self._soundLabel = None
-    self._message = None
+        If lives are left, pauses the game and deducts one life. Otherwise,
+        ends the game and transitions to STATE_COMPLETE.
+        """
+        if self._lives <= 1:  # No lives left
+            self._state = STATE_COMPLETE
+            self._wave = None  # Clear the wave
+            # Set game over title and message
+            self._title = GLabel(text="Game Over",
+                                 font_name=TITLE_FONT, font_size=TITLE_SIZE)
+            self._title.x = GAME_WIDTH / 2
+            self._title.y = GAME_HEIGHT / 2 + TITLE_OFFSET
+            self._message = GLabel(text="Try again next time!",
+                                   font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE)
+            self._message.x = GAME_WIDTH / 2
+            self._message.y = GAME_HEIGHT / 2 + MESSAGE_OFFSET
+        else:  # Lives left, pause game
+            self._lives = self._wave.getLives()  # Update lives
+            self._state = STATE_PAUSED
+            self._paused = True
+            self._wave.respawn()  # Create new ship
+            self._message = self._startmessage  # Display start message
+
+    def welcome(self):
+        """
+        Display the welcome screen with instructions and sound toggle.
+
+        This method sets up the labels and messages for the welcome screen.
+        """
+        # Set title and instructions
+        self._title = GLabel(text="Welcome to Planetoids!",
+                             font_name=TITLE_FONT, font_size=TITLE_SIZE - 73)
+        self._title.x = GAME_WIDTH / 2
+        self._title.y = GAME_HEIGHT - 80
+        self._howto = GLabel(text="How to play:",
+                             font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 5)
+        self._howto.x = GAME_WIDTH / 4 + 20
+        self._howto.y = GAME_HEIGHT - 160
+        self._instructions = GLabel(
+            text="Press the up arrow to move forward.\n"
+                 "Press the left and right arrows to turn.\n"
+                 "Press the spacebar to shoot bullets.\n"
+                 "Press the down arrow to raise your shield.",
+            font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 22)
+        self._instructions.x = GAME_WIDTH / 2
+        self._instructions.y = GAME_HEIGHT - 265
+
+        # Set sound toggle label
+        sound_text = "Press N to turn sound OFF" if self._sound else "Press N to turn sound ON"
+        self._soundLabel = GLabel(text=sound_text,
+                                  font_name=MESSAGE_FONT, font_size=MESSAGE_SIZE - 5)
+        self._soundLabel.x = GAME_WIDTH / 2
+        self._soundLabel.y = GAME_HEIGHT / 2 - 30
+
+        # Set start message
+        self._message = self._startmessage
+        self._message.y = GAME_HEIGHT / 2 - 100
+
+    def welcome_state(self):
+        """
+        Transition from the welcome state to the loading state.
+
+        This method clears all welcome screen labels and transitions the game
+        to the STATE_LOADING state to initialize the first wave.
+        """
+        self._state = STATE_LOADING
+        self._title = None
+        self._howto = None
+        self._instructions = None
+        self._soundLabel = None
+        self._message = None
@@ -0,0 +1,182 @@
+"""
+Autopilot module for Planetoids
+
+This module contains a bot that plays a Wave without a human, for soak
+testing. The bot stands in for the keyboard: Wave.update only asks its input
+which keys are down, so an Autopilot can be passed in place of GInput. Call
+think once per frame, before Wave.update, to decide which keys to hold.
+
+The bot turns toward and shoots the most dangerous target (the asteroid or UFO
+that will reach the ship soonest, or else the nearest one) and thrusts away
+from anything about to hit the ship. Every target is checked in one numpy
+pass per frame, with wrap-aware distances and time-to-collision, so the cost
+of a decision stays small even with hundreds of asteroids.
+"""
+import math
+import numpy as np
+from consts import *
+from vecmath import *
+
+# The size of the wrapping play area, including the dead zone
+_PERIOD_X = GAME_WIDTH + 2 * DEAD_ZONE
+_PERIOD_Y = GAME_HEIGHT + 2 * DEAD_ZONE
+
+
+def threats(wave):
+    """
+    Returns the position, velocity and danger of every target in the wave.
+
+    The result is a tuple (dx, dy, ttc). dx and dy are the wrap-aware offsets
+    from the ship to each asteroid and UFO, and ttc is the number of frames
+    until each one touches the ship (infinity if it never will). All three
+    are numpy arrays with one entry per target. They are empty if there is no
+    ship or no targets.
+
+    Parameter wave: the wave being played
+    Precondition: wave is a Wave object
+    """
+    ship = wave.getShip()
+    state = wave.getThreats()
+    if ship is None or len(state) == 0:
+        empty = np.zeros(0)
+        return (empty, empty, empty)
+
+    dx = wrapped_delta(state[:, 0] - ship.x, _PERIOD_X)
+    dy = wrapped_delta(state[:, 1] - ship.y, _PERIOD_Y)
+    ttc = time_to_contact(dx, dy,
+                          state[:, 2] - ship.getShipVel_x(),
+                          state[:, 3] - ship.getShipVel_y(),
+                          state[:, 4] + ship.getRadius())
+    return (dx, dy, ttc)
+
+
+class Autopilot(object):
+    """
+    A class to represent a bot that plays the game through the keyboard.
+
+    An Autopilot has the same is_key_down and is_key_pressed methods as
+    GInput, so it can be passed to Wave.update as the input.
+    """
+    # Attribute _keys: the keys the bot is holding this frame
+    # Invariant: _keys is a set of key names ('left', 'right', 'up', 'spacebar')
+
+    def is_key_down(self, key):
+        """
+        Returns True if the bot is holding the given key this frame.
+
+        Parameter key: the name of the key
+        Precondition: key is a string
+        """
+        return key in self._keys
+
+    def is_key_pressed(self, key):
+        """
+        Returns False; the bot only holds keys.
+
+        Parameter key: the name of the key
+        Precondition: key is a string
+        """
+        return False
+
+    def __init__(self):
+        """
+        Initializes an autopilot that is not holding any keys.
+        """
+        self._keys = set()
+
+    def think(self, wave):
+        """
+        Decides which keys to hold for the next frame of the wave.
+
+        Parameter wave: the wave being played
+        Precondition: wave is a Wave object
+        """
+        self._keys = set()
+        ship = wave.getShip()
+        dx, dy, ttc = threats(wave)
+        if ship is None or len(dx) == 0:
+            return
+
+        facing = math.degrees(math.atan2(ship.getFacing_y(), ship.getFacing_x()))
+        soonest = int(np.argmin(ttc))
+        if ttc[soonest] < AUTOPILOT_PANIC:
+            # Escape: turn away from the threat and thrust once roughly aligned
+            away = math.degrees(math.atan2(-dy[soonest], -dx[soonest]))
+            if abs(self._steer(facing, away)) < AUTOPILOT_ESCAPE:
+                self._keys.add('up')
+            self._keys.add('spacebar')
+            return
+
+        # Aim at the most dangerous target, or the nearest if none is closing
+        if math.isinf(ttc[soonest]):
+            target = int(np.argmin(dx*dx + dy*dy))
+        else:
+            target = soonest
+        aim = math.degrees(math.atan2(dy[target], dx[target]))
+        if abs(self._steer(facing, aim)) < AUTOPILOT_AIM:
+            self._keys.add('spacebar')
+
+    def _steer(self, facing, goal):
+        """
+        Holds the turn key toward goal and returns the heading error.
+
+        The error is the signed number of degrees from facing to goal, in the
+        range [-180, 180).
+
+        Parameter facing: the heading of the ship in degrees
+        Precondition: facing is a float
+
+        Parameter goal: the heading to turn toward in degrees
+        Precondition: goal is a float
+        """
+        error = (goal - facing + 180) % 360 - 180
+        if error > SHIP_TURN_RATE / 2:
+            self._keys.add('left')
+        elif error < -SHIP_TURN_RATE / 2:
+            self._keys.add('right')
+        return error
+
+
+def soak(wave, frames, pilot=None, profiler=None, endless=False):
+    """
+    Plays a wave headless with the autopilot and returns the frames played.
+
+    The wave is updated once per frame with the autopilot as its input and
+    sound off; nothing is drawn. When the ship is destroyed it respawns, as
+    in the windowed game, until the player runs out of lives. Play stops
+    early if the wave is won or lost.
+
+    Parameter wave: the wave to play
+    Precondition: wave is a Wave object
+
+    Parameter frames: the largest number of frames to play
+    Precondition: frames is an int >= 0
+
+    Parameter pilot: the bot to play with (a new one if None)
+    Precondition: pilot is an Autopilot or None (or any input with a think method)
+
+    Parameter profiler: the profiler told when play pauses for a respawn, if any
+    Precondition: profiler is a StateProfiler or None
+
+    Parameter endless: whether the ship keeps respawning after the last life
+    (so a benchmark plays every frame)
+    Precondition: endless is a bool
+    """
+    if pilot is None:
+        pilot = Autopilot()
+    if profiler is not None:
+        profiler.switch(STATE_ACTIVE)
+    for frame in range(frames):
+        pilot.think(wave)
+        wave.update(pilot, 1/60, False)
+        if not wave.checkAsteroids() and not wave.checkUFO():
+            return frame + 1
+        if not wave.checkShip():
+            if wave.getLives() < 1 and not endless:
+                return frame + 1
+            if profiler is not None:
+                profiler.switch(STATE_PAUSED)
+            wave.respawn()
+            if profiler is not None:
+                profiler.switch(STATE_ACTIVE)
+    return frames
@@ -0,0 +1,98 @@
+"""
+Broadphase module for Planetoids
+
+This module contains the sort-and-sweep broadphase that Wave uses to find
+asteroids that might be touching each other. Objects are kept sorted by the
+left edge of their bounding box. Only objects whose x ranges overlap can
+touch, so the pairs are found by sweeping the sorted list from left to right.
+
+Objects move only a little between frames, so last frame's order is almost
+sorted. The order is kept from frame to frame and fixed with an insertion
+sort, which is close to linear time on nearly sorted lists.
+
+The sweep does not look across the wrapping seam at the edge of the dead
+zone. Objects there are off screen, so a missed bounce cannot be seen.
+"""
+
+
+class SortAndSweep(object):
+    """
+    A class to represent an incremental sort-and-sweep along the x axis.
+
+    The objects must have x and y attributes and a getRadius method.
+    """
+    # Attribute _order: the objects, sorted by left edge as of the last update
+    # Invariant: _order is a list of objects
+    #
+    # Attribute _tests: the number of candidate pairs found by the last update
+    # Invariant: _tests is an int >= 0
+
+    def getTests(self):
+        """
+        Returns the number of candidate pairs found by the last update.
+        """
+        return self._tests
+
+    def __init__(self):
+        """
+        Initializes a broadphase with no objects.
+        """
+        self._order = []
+        self._tests = 0
+
+    def update(self, objects):
+        """
+        Returns the pairs of objects whose bounding boxes overlap.
+
+        The kept order is first brought up to date with objects: removed
+        objects are dropped and new ones are added at the end. The order is
+        then re-sorted and swept. The result is a list of (a, b) tuples.
+
+        Parameter objects: the objects this frame
+        Precondition: objects is a list of objects with x, y and getRadius
+        """
+        current = {}
+        for obj in objects:
+            current[id(obj)] = obj
+        order = [obj for obj in self._order if id(obj) in current]
+        if len(order) < len(current):
+            for obj in order:
+                del current[id(obj)]
+            order.extend(current.values())
+
+        # Insertion sort on the left edges, which were nearly sorted already
+        radii = [obj.getRadius() for obj in order]
+        lefts = [obj.x - r for obj, r in zip(order, radii)]
+        for i in range(1, len(order)):
+            left = lefts[i]
+            if lefts[i-1] <= left:
+                continue
+            obj = order[i]
+            radius = radii[i]
+            j = i - 1
+            while j >= 0 and lefts[j] > left:
+                lefts[j+1] = lefts[j]
+                order[j+1] = order[j]
+                radii[j+1] = radii[j]
+                j -= 1
+            lefts[j+1] = left
+            order[j+1] = obj
+            radii[j+1] = radius
+        self._order = order
+
+        # Sweep: each object can only touch the ones that start before it ends
+        pairs = []
+        count = len(order)
+        for i in range(count):
+            a = order[i]
+            right = lefts[i] + 2 * radii[i]
+            low = a.y - radii[i]
+            high = a.y + radii[i]
+            j = i + 1
+            while j < count and lefts[j] < right:
+                b = order[j]
+                if b.y - radii[j] < high and b.y + radii[j] > low:
+                    pairs.append((a, b))
+                j += 1
+        self._tests = len(pairs)
+        return pairs
@@ -0,0 +1,690 @@
+"""
+Command line module for Planetoids
+
+This module contains the command line for the package entry point:
+
+    python planetoids [play] [WAVE]           play a wave in the window
+    python planetoids headless [WAVE] -n N    let the autopilot play N frames
+    python planetoids replay FILE             replay a recording headless
+    python planetoids bench [SCENARIO ...]    time the benchmark scenarios
+    python planetoids swarm -n N -w W         time a huge field on W processes
+    python planetoids kernels [--check]       list the array kernel backends
+    python planetoids duel [WAVE] -n N        two peers play a duel over loopback
+    python planetoids serve [WAVE] -w W       host headless sessions for clients
+    python planetoids spectate [WAVE] -n N    stream a headless wave to a spectator
+
+The wave is named as in the original game: 'hard' means 'hard.json' in the
+JSON folder (a path to a file also works). A headless run can save its keys
+with --record, and replay plays the recording back. Any command can be run
+under cProfile with --profile FILE, which writes one pstats file per game
+state as well as FILE itself, and with --backend NAME, which picks the
+backend for the array kernels (see kernels.py).
+
+The window and the game modules are only imported by the commands that use
+them, so asking for help starts quickly.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from consts import *
+
+# The benchmark scenarios: name -> (description, frames)
+SCENARIOS = {
+    'field':  ('150 medium asteroids, no UFOs', 600),
+    'bounce': ('150 medium asteroids bouncing off each other', 600),
+    'fleet':  ('20 asteroids and 12 alien UFOs firing at the ship', 600),
+    'debris': ('60 small asteroids to shoot, for debris and splits', 600),
+    'world':  ('16000 asteroids in a scrolling world of 20 x 20 screens', 600),
+}
+
+# The seed used by the benchmark scenarios
+BENCH_SEED = 1
+
+# When this module was imported, the start of the startup report
+STARTED = time.perf_counter()
+
+
+def wave_file(name):
+    """
+    Returns the wave file for a wave name, adding '.json' if it is missing.
+
+    Parameter name: the wave name or file
+    Precondition: name is a str
+    """
+    if name[-5:].lower() == '.json':
+        return name
+    return name + '.json'
+
+
+def load_wave(name):
+    """
+    Returns the wave data for a wave name.
+
+    The name is tried as a path first, then in the JSON folder next to this
+    module.
+
+    Parameter name: the wave name or file
+    Precondition: name is a str
+    """
+    path = wave_file(name)
+    if not os.path.exists(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), WAVE_FOLDER, path)
+    with open(path) as file:
+        return json.load(file)
+
+
+def scenario(name, seed=BENCH_SEED):
+    """
+    Returns the wave data for a benchmark scenario.
+
+    Parameter name: the scenario name
+    Precondition: name is a key of SCENARIOS
+
+    Parameter seed: the random seed for the asteroid layout
+    Precondition: seed is an int
+    """
+    rng = random.Random(seed)
+
+    def asteroids(count, size, width=GAME_WIDTH, height=GAME_HEIGHT):
+        return [{'size': size,
+                 'position': [rng.randrange(width), rng.randrange(height)],
+                 'direction': [rng.uniform(-1, 1), rng.uniform(-1, 1)]}
+                for i in range(count)]
+
+    data = {'ship': {'position': [GAME_WIDTH / 2, GAME_HEIGHT / 2], 'angle': 90}}
+    if name == 'field' or name == 'bounce':
+        data['asteroids'] = asteroids(150, 'medium')
+        data['bounce'] = name == 'bounce'
+    elif name == 'fleet':
+        data['asteroids'] = asteroids(20, 'medium')
+        data['UFOs'] = [{'alien': True, 'lives': 5, 'spawn': 10 * i} for i in range(12)]
+    elif name == 'debris':
+        data['asteroids'] = asteroids(60, 'small')
+    elif name == 'world':
+        width, height = 20 * GAME_WIDTH, 20 * GAME_HEIGHT
+        data['world'] = [width, height]
+        data['ship']['position'] = [width / 2, height / 2]
+        data['asteroids'] = (asteroids(4000, 'large', width, height) +
+                             asteroids(6000, 'medium', width, height) +
+                             asteroids(6000, 'small', width, height))
+    return data
+
+
+def summary(wave, frames, seconds):
+    """
+    Returns a one line summary of a headless run.
+
+    Parameter wave: the wave that was played
+    Precondition: wave is a Wave object
+
+    Parameter frames: the number of frames played
+    Precondition: frames is an int >= 0
+
+    Parameter seconds: the time taken
+    Precondition: seconds is a float >= 0
+    """
+    ship = wave.getShip()
+    where = 'none' if ship is None else '(%.2f, %.2f)' % (ship.x, ship.y)
+    rate = frames / seconds if seconds > 0 else 0
+    return ('frames %d, lives %d, asteroids %d, UFO lives %d, ship %s, %.1f frames/s' %
+            (frames, wave.getLives(), len(wave.getAsteroids()), wave.getUFOLives(),
+             where, rate))
+
+
+def run(data, frames, pilot, profiler=None, endless=False):
+    """
+    Plays a wave headless and returns (wave, frames played, seconds).
+
+    Parameter data: the wave data
+    Precondition: data is a dict in the wave JSON format
+
+    Parameter frames: the largest number of frames to play
+    Precondition: frames is an int >= 0
+
+    Parameter pilot: the input to play with
+    Precondition: pilot has methods think, is_key_down and is_key_pressed
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+
+    Parameter endless: whether the ship keeps respawning after the last life
+    Precondition: endless is a bool
+    """
+    from wave import Wave
+    from autopilot import soak
+    if profiler is not None:
+        profiler.switch(STATE_LOADING)
+    wave = Wave(data)
+    start = time.perf_counter()
+    played = soak(wave, frames, pilot, profiler, endless)
+    seconds = time.perf_counter() - start
+    if profiler is not None:
+        profiler.switch(None)
+    return (wave, played, seconds)
+
+
+def play(args, profiler):
+    """
+    Plays a wave in the window.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to give the game, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    from warmup import StartupClock
+    startup = None
+    if args.startup:
+        startup = StartupClock(STARTED)
+    from app import Planetoids
+    if startup is not None:
+        startup.mark('imports')
+    game = Planetoids(width=GAME_WIDTH, height=GAME_HEIGHT)
+    game.setWaveFile(wave_file(args.wave))
+    game.setProfiler(profiler)
+    game.setStartup(startup)
+    game.run()
+
+
+def headless(args, profiler):
+    """
+    Lets the autopilot play a wave headless, recording the keys if asked.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    from autopilot import Autopilot
+    from recording import Recorder
+    random.seed(args.seed)
+    pilot = Recorder(Autopilot())
+    wave, frames, seconds = run(load_wave(args.wave), args.frames, pilot, profiler)
+    print(summary(wave, frames, seconds))
+    if args.record is not None:
+        pilot.save(args.record, wave_file(args.wave), args.seed)
+        print('recorded %d frames to %s' % (frames, args.record))
+
+
+def replay(args, profiler):
+    """
+    Replays a recording headless.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    from recording import Playback
+    playback = Playback(args.recording)
+    random.seed(playback.getSeed())
+    data = load_wave(playback.getWave())
+    wave, frames, seconds = run(data, len(playback), playback, profiler)
+    print(summary(wave, frames, seconds))
+
+
+def bench(args, profiler):
+    """
+    Times the benchmark scenarios with the autopilot playing.
+
+    The ship always respawns, so each scenario plays all of its frames
+    unless the wave is won.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    from autopilot import Autopilot
+    names = args.scenarios if len(args.scenarios) > 0 else list(SCENARIOS)
+    for name in names:
+        description, frames = SCENARIOS[name]
+        random.seed(BENCH_SEED)
+        wave, played, seconds = run(scenario(name), frames, Autopilot(), profiler, True)
+        print('%-7s %7.3f ms/frame over %4d frames  (%s)' %
+              (name, seconds * 1000 / max(played, 1), played, description))
+
+
+def swarm(args, profiler):
+    """
+    Times a huge asteroid field, optionally checking it against one process.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    import numpy as np
+    from swarm import AsteroidSwarm, SharedSwarm
+    if args.workers > 1:
+        field = SharedSwarm(args.count, seed=args.seed, workers=args.workers)
+    else:
+        field = AsteroidSwarm(args.count, seed=args.seed)
+    check = AsteroidSwarm(args.count, seed=args.seed) if args.check else None
+    try:
+        if profiler is not None:
+            profiler.switch(STATE_ACTIVE)
+        seconds = 0.0
+        pairs = 0
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            found = field.step()
+            seconds += time.perf_counter() - start
+            pairs += len(found)
+            if check is not None:
+                if (not np.array_equal(found, check.step()) or
+                        not np.array_equal(field.getState(), check.getState())):
+                    print('frame %d differs from the single process field' % frame)
+                    return
+        if profiler is not None:
+            profiler.switch(None)
+    finally:
+        field.close()
+    print('%d asteroids on %d process(es): %.2f ms/frame, %.1f touching pairs/frame%s' %
+          (args.count, args.workers, seconds * 1000 / max(args.frames, 1),
+           pairs / max(args.frames, 1), ', same as one process' if args.check else ''))
+
+
+def duel(args, profiler):
+    """
+    Plays a two-ship duel between two lockstep peers over loopback UDP.
+
+    Both peers run in this process, each with its own socket, and press keys
+    at random. The packets can be held back, reordered and dropped, so the
+    peers have to predict and roll back. The report gives the rollbacks, the
+    frames played again, the slowest tick and whether the states matched.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    from duel import new_duel
+    from lockstep import LockstepPeer
+    start = new_duel(load_wave(args.wave))
+    peers = [LockstepPeer(start, 0), LockstepPeer(start, 1)]
+    peers[0].setAddress(peers[1].getAddress())
+    peers[1].setAddress(peers[0].getAddress())
+    for player in range(2):
+        peers[player].setLink(args.lag, args.jitter, args.loss, args.seed + player)
+    if args.desync is not None:
+        peers[1].inject_desync(args.desync)
+    keys = [random.Random(args.seed * 2 + player) for player in range(2)]
+    bits = [0, 0]
+    times = []
+    try:
+        if profiler is not None:
+            profiler.switch(STATE_ACTIVE)
+        for tick in range(args.frames):
+            for player in range(2):
+                if keys[player].random() < 0.1:
+                    bits[player] = keys[player].randrange(32)
+                begin = time.perf_counter()
+                peers[player].tick(bits[player])
+                times.append(time.perf_counter() - begin)
+        if profiler is not None:
+            profiler.switch(None)
+
+        # Let the last inputs and digests through
+        for peer in peers:
+            peer.setLink()
+        for tick in range(args.lag + args.jitter + 2 * LOCKSTEP_WINDOW):
+            for peer in peers:
+                peer.tick(0)
+
+        for peer in peers:
+            desync = peer.getDesync()
+            print('peer %d: frame %d, %d rollbacks, %d frames played again, %d stalls, '
+                  'digests compared to frame %d, %s' %
+                  (peer.getPlayer(), peer.getFrame(), peer.getRollbacks(), peer.getReplayed(),
+                   peer.getStalls(), peer.getCompared(),
+                   'in sync' if desync is None else 'DESYNC at frame %d' % desync))
+        times.sort()
+        print('tick %.3f ms mean, %.3f ms slowest (budget %.1f ms)' %
+              (sum(times) * 1000 / len(times), times[-1] * 1000, FRAME_BUDGET * 1000))
+    finally:
+        for peer in peers:
+            peer.close()
+
+
+def serve(args, profiler):
+    """
+    Hosts headless sessions for clients on loopback, optionally with bots.
+
+    With --bots the server runs for --seconds while that many bots (in a
+    process of their own) play a session each, and then reports the frame
+    time of the sessions and what the bots got. Otherwise it runs for
+    --seconds, or until interrupted if that is 0.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler (unused; the sessions run in the workers)
+    Precondition: profiler is a StateProfiler or None
+    """
+    import multiprocessing
+    from server import SessionServer, run_bots, percentile
+    server = SessionServer(load_wave(args.wave), args.workers, args.rate,
+                           port=args.port, seed=args.seed)
+    print('serving %s on %s:%d with %d worker(s)' %
+          ((wave_file(args.wave),) + tuple(server.getAddress()) + (args.workers,)))
+    bots = None
+    try:
+        if args.bots > 0:
+            mine, theirs = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_bots, daemon=True,
+                args=(server.getAddress(), args.bots, args.slow, args.seconds,
+                      args.seed, theirs))
+            process.start()
+            theirs.close()
+            server.serve(args.seconds)
+            bots = mine.recv()
+            process.join()
+        else:
+            server.serve(args.seconds if args.seconds > 0 else None)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reports = server.close()
+
+    sessions = []
+    for shard in range(len(reports)):
+        report = reports[shard]
+        served = report['sessions']
+        sessions.extend(served)
+        frames = sum(session[1] for session in served)
+        print('worker %d: %d sessions, %d ticks (%d late), %d frames, frame %.3f ms mean, '
+              '99%% under %.1f ms, %d states sent (%.1f MB)' %
+              (shard, len(served), report['ticks'], report['late'], frames,
+               sum(session[2] * session[1] for session in served) * 1000 / max(frames, 1),
+               percentile(report['latency'], 0.99) * 1000, report['sent'],
+               report['bytes'] / 1e6))
+    sessions.sort(key=lambda session: -session[2])
+    for session in sessions[:3]:
+        print('  session %d: %d frames, %.3f ms mean, %.3f ms slowest, %d states skipped%s' %
+              (session[0], session[1], session[2] * 1000, session[3] * 1000, session[4],
+               ', dropped' if session[6] else ''))
+    print('%d sessions skipped states, %d were dropped for falling behind' %
+          (len([session for session in sessions if session[4] > 0]),
+           len([session for session in sessions if session[6]])))
+    if bots is not None:
+        states = sum(result[0] for result in bots)
+        size = sum(result[1] for result in bots)
+        print('bots: %d connected, %d states (%.0f per bot per second), %.1f kB/s each, '
+              '%d waves over' %
+              (len(bots), states, states / max(len(bots), 1) / args.seconds,
+               size / 1000 / max(len(bots), 1) / args.seconds,
+               len([result for result in bots if result[2]])))
+
+
+def spectate(args, profiler):
+    """
+    Streams a wave the autopilot plays to a spectator over a local socket.
+
+    The spectator reads each message --lag frames after it was sent and then
+    acknowledges it, so the messages are diffs against a frame that old. Its
+    view is checked against the encoder's every frame, and the report gives
+    the bytes per frame against a full state every frame.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler to switch between states, if any
+    Precondition: profiler is a StateProfiler or None
+    """
+    import select
+    import socket
+    from wave import Wave
+    from autopilot import Autopilot
+    from spectator import StateEncoder, StateDecoder, STREAM_LENGTH, send, receive
+    random.seed(args.seed)
+    wave = Wave(load_wave(args.wave))
+    pilot = Autopilot()
+    encoder = StateEncoder()
+    decoder = StateDecoder()
+    game, spectator = socket.socketpair()
+    acked = None
+    sent = 0
+    full = 0
+    frames = 0
+    wrong = None
+    try:
+        if profiler is not None:
+            profiler.switch(STATE_ACTIVE)
+        for frame in range(args.frames + args.lag):
+            if frame < args.frames:
+                pilot.think(wave)
+                wave.update(pilot, FRAME_BUDGET, False)
+                if not wave.checkShip():
+                    wave.respawn()
+                encoder.capture(wave)
+                message = encoder.encode(acked)
+                send(game, message)
+                sent += len(message)
+                full += len(encoder.encode())
+                frames += 1
+
+            if frame >= args.lag:
+                seen = decoder.decode(receive(spectator))
+                send(spectator, STREAM_LENGTH.pack(seen))
+                if wrong is None and decoder.getView() != encoder.view(seen):
+                    wrong = seen
+            while len(select.select([game], [], [], 0)[0]) > 0:
+                acked = STREAM_LENGTH.unpack(receive(game))[0]
+        if profiler is not None:
+            profiler.switch(None)
+    finally:
+        game.close()
+        spectator.close()
+
+    print('%d frames, %.1f bytes/frame (%.1f bytes/frame as full states, %.1fx smaller)' %
+          (frames, sent / max(frames, 1), full / max(frames, 1), full / max(sent, 1)))
+    print('spectator view within %.3f px of the wave, %s' %
+          (encoder.getError(), 'same as the encoder every frame' if wrong is None
+           else 'DIFFERS from the encoder at frame %d' % wrong))
+    if wrong is not None:
+        sys.exit(1)
+
+
+def backends(args, profiler):
+    """
+    Lists the array kernel backends, optionally checking them against the
+    python backend and timing them.
+
+    Parameter args: the parsed command line
+    Precondition: args is an argparse.Namespace
+
+    Parameter profiler: the profiler (unused)
+    Precondition: profiler is a StateProfiler or None
+    """
+    import numpy as np
+    import kernels
+    names = kernels.available()
+    print('in use: %s' % kernels.current().getName())
+    for name in kernels.BACKENDS:
+        print('%-7s %s' % (name, 'available' if name in names else 'not installed'))
+    if not args.check:
+        return
+
+    same = kernels.check(args.count, args.frames)
+    rng = np.random.default_rng(0)
+    pos = rng.uniform(0, GAME_WIDTH, (args.count, 2))
+    vel = rng.uniform(-5, 5, (args.count, 2))
+    low = (-DEAD_ZONE, -DEAD_ZONE)
+    high = (GAME_WIDTH + DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE)
+    for name in names:
+        backend = kernels.make(name)
+        start = time.perf_counter()
+        for frame in range(args.frames):
+            backend.move_wrap(pos, vel, low, high)
+            backend.first_hit(pos, GAME_WIDTH / 2, GAME_HEIGHT / 2, UFO_RADIUS)
+        seconds = time.perf_counter() - start
+        print('%-7s %s  %8.3f ms/frame for %d objects' %
+              (name, 'same as python' if same[name] else 'DIFFERS from python',
+               seconds * 1000 / max(args.frames, 1), args.count))
+    if not all(same.values()):
+        sys.exit(1)
+
+
+def global_options(result):
+    """
+    Adds the options that go before the command to a parser.
+
+    Parameter result: the parser
+    Precondition: result is an argparse.ArgumentParser
+    """
+    result.add_argument('--profile', metavar='FILE', default=None,
+                        help='run under cProfile, writing pstats per game state')
+    result.add_argument('--backend', default=KERNEL_BACKEND,
+                        choices=['auto', 'python', 'numpy', 'numba'],
+                        help='the backend for the array kernels (default %(default)s)')
+
+
+def parser():
+    """
+    Returns the parser for the command line.
+    """
+    result = argparse.ArgumentParser(prog='planetoids', description='Play Planetoids.')
+    global_options(result)
+    commands = result.add_subparsers(dest='command')
+
+    command = commands.add_parser('play', help='play a wave in the window')
+    command.add_argument('wave', nargs='?', default=DEFAULT_WAVE)
+    command.add_argument('--startup', action='store_true',
+                         help='report the import time and time to first frame')
+
+    command = commands.add_parser('headless', help='let the autopilot play headless')
+    command.add_argument('wave', nargs='?', default=DEFAULT_WAVE)
+    command.add_argument('-n', '--frames', type=int, default=3600,
+                         help='the most frames to play')
+    command.add_argument('--seed', type=int, default=0, help='the random seed')
+    command.add_argument('--record', metavar='FILE', default=None,
+                         help='save the keys played to FILE')
+
+    command = commands.add_parser('replay', help='replay a recording headless')
+    command.add_argument('recording')
+
+    command = commands.add_parser('bench', help='time the benchmark scenarios')
+    command.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                         help='any of ' + ', '.join(SCENARIOS) + ' (default all)')
+
+    command = commands.add_parser('swarm', help='time a huge asteroid field')
+    command.add_argument('-n', '--count', type=int, default=100000,
+                         help='the number of asteroids')
+    command.add_argument('-w', '--workers', type=int, default=1,
+                         help='the number of worker processes (1 for none)')
+    command.add_argument('-f', '--frames', type=int, default=60,
+                         help='the number of frames to time')
+    command.add_argument('--seed', type=int, default=0, help='the random seed')
+    command.add_argument('--check', action='store_true',
+                         help='compare every frame with a single process field')
+
+    command = commands.add_parser('duel', help='play a lockstep duel over loopback')
+    command.add_argument('wave', nargs='?', default=DEFAULT_WAVE)
+    command.add_argument('-n', '--frames', type=int, default=3600,
+                         help='the number of render frames')
+    command.add_argument('--lag', type=int, default=3, help='frames each packet is held back')
+    command.add_argument('--jitter', type=int, default=3,
+                         help='the most extra frames a packet is held back')
+    command.add_argument('--loss', type=float, default=0.05, help='the share of packets dropped')
+    command.add_argument('--seed', type=int, default=0, help='the random seed')
+    command.add_argument('--desync', type=int, metavar='FRAME', default=None,
+                         help='make peer 1 nudge an asteroid when it plays FRAME '
+                              '(caught on FRAME + 1, the first state that differs)')
+
+    command = commands.add_parser('serve', help='host headless sessions for clients')
+    command.add_argument('wave', nargs='?', default=DEFAULT_WAVE)
+    command.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                         help='the number of worker processes (default one per core)')
+    command.add_argument('--port', type=int, default=SERVER_PORT,
+                         help='the port to listen on (0 for any free port)')
+    command.add_argument('--rate', type=float, default=60,
+                         help='the ticks per second (0 for as fast as possible)')
+    command.add_argument('-t', '--seconds', type=float, default=0,
+                         help='how long to serve (0 for until interrupted)')
+    command.add_argument('--bots', type=int, default=0,
+                         help='the number of bots to play a session each')
+    command.add_argument('--slow', type=int, default=0,
+                         help='how many of the bots read too slowly to keep up')
+    command.add_argument('--seed', type=int, default=0, help='the random seed')
+
+    command = commands.add_parser('spectate', help='stream a headless wave to a spectator')
+    command.add_argument('wave', nargs='?', default=DEFAULT_WAVE)
+    command.add_argument('-n', '--frames', type=int, default=3600,
+                         help='the number of frames to play')
+    command.add_argument('--lag', type=int, default=4,
+                         help='the frames before the spectator reads each message')
+    command.add_argument('--seed', type=int, default=0, help='the random seed')
+
+    command = commands.add_parser('kernels', help='list the array kernel backends')
+    command.add_argument('--check', action='store_true',
+                         help='check every backend against python and time it')
+    command.add_argument('-n', '--count', type=int, default=1000,
+                         help='the number of objects to check and time')
+    command.add_argument('-f', '--frames', type=int, default=200,
+                         help='the number of frames to check and time')
+    return result
+
+
+def main(argv=None):
+    """
+    Runs the command line.
+
+    For compatibility with the original game, a lone wave name with no
+    command plays that wave, even after the options that go before the
+    command.
+
+    Parameter argv: the command line arguments, without the program name
+    Precondition: argv is a list of str, or None for sys.argv[1:]
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    # The first word after the options before the command is the command or a wave
+    options = argparse.ArgumentParser(add_help=False)
+    global_options(options)
+    known, rest = options.parse_known_args(argv)
+    first = len(argv) - len(rest)
+    if (len(rest) > 0 and argv[first:] == rest and not rest[0].startswith('-') and
+            rest[0] not in COMMANDS):
+        argv = argv[:first] + ['play'] + rest
+    commands = parser()
+    args = commands.parse_args(argv)
+    if args.command is None:
+        args.command = 'play'
+        args.wave = DEFAULT_WAVE
+        args.startup = False
+    if args.command == 'bench':
+        for name in args.scenarios:
+            if name not in SCENARIOS:
+                commands.error('unknown scenario %r (choose from %s)' %
+                               (name, ', '.join(SCENARIOS)))
+
+    if args.backend != KERNEL_BACKEND:
+        import kernels
+        kernels.use(args.backend)
+
+    profiler = None
+    if args.profile is not None:
+        from profiling import StateProfiler
+        profiler = StateProfiler()
+
+    COMMANDS[args.command](args, profiler)
+
+    if profiler is not None:
+        for name, seconds, path in profiler.dump(args.profile):
+            print('%-9s %8.3f s  %s' % (name, seconds, path))
+
+
+# The commands, by name
+COMMANDS = {'play': play, 'headless': headless, 'replay': replay, 'bench': bench,
+            'swarm': swarm, 'kernels': backends, 'duel': duel, 'serve': serve,
+            'spectate': spectate}
@@ -9,8 +9,6 @@ all modules to access them.
 # MUSKAN GUPTA AND RENEE GOWDA
 # DATE COMPLETED HERE
 """
-import introcs
-import sys
 
 ### WINDOW CONSTANTS (all coordinates are in pixels) ###
 
@@ -53,12 +51,18 @@ SHIP_MAX_SPEED = 3.0
 SHIP_IMPULSE   = 0.1
 # The number of degrees to turn the ship
 SHIP_TURN_RATE = 2
+# The spacing in pixels of the grid searched for a safe respawn spot
+RESPAWN_GRID   = 32
+# The number of frames a respawn spot must stay clear to be safe
+RESPAWN_SAFE_TIME = 120
+# The number of respawn spots scored together, nearest first
+RESPAWN_BLOCK  = 64
 
 # The image file to use for the shield
 SHIELD_IMAGE    = 'ship.png'
 # The size of the shield in proportion to the ship
 SHIELD_SCALE = 78/58
-# The number of seconds to deploy the shield
+# The number of frames the shield stays up
 SHIELD_TIME  = 300
 
 ### PLANETOID CONSTANTS ###
@@ -101,6 +105,76 @@ BULLET_SPEED  = 10
 BULLET_RATE   = 30
 # The color of a bullet
 BULLET_COLOR   = 'red'
+# The most bullet sounds that may play at once
+SOUND_VOICES   = 4
+# The sound file to play when a bullet is fired
+BULLET_SOUND   = 'pew1.wav'
+
+### PARTICLE CONSTANTS ###
+
+# The most debris particles alive at once
+PARTICLE_CAP   = 1024
+# The number of frames a debris particle lasts
+PARTICLE_LIFE  = 30
+# The number of particles when an asteroid is destroyed
+DEBRIS_COUNT   = 16
+# The largest speed of a debris particle
+DEBRIS_SPEED   = 3.0
+
+### LARGE WORLD CONSTANTS (see world.py) ###
+
+# The side of a square chunk of dormant asteroids
+CHUNK_SIZE     = 1024
+# The distance from the middle of the screen within which asteroids are in play
+STREAM_ACTIVE  = 700
+# The distance from the middle of the screen beyond which asteroids go dormant
+STREAM_DORMANT = 800
+# The number of frames in which every dormant chunk is brought up to date
+STREAM_PERIOD  = 60
+
+### DUEL CONSTANTS (see duel.py and lockstep.py) ###
+
+# The number of frames a bullet lasts in a duel (bullets wrap in a duel)
+DUEL_BULLET_LIFE = 60
+# The number of frames before a destroyed ship comes back in a duel
+DUEL_RESPAWN     = 120
+# The number of frames between pressing a key and its input being played
+LOCKSTEP_DELAY   = 2
+# The most frames a peer runs ahead of the other player's last input
+LOCKSTEP_WINDOW  = 8
+# The most state digests sent in one packet
+LOCKSTEP_HASHES  = 64
+
+### SESSION SERVER CONSTANTS (see server.py) ###
+
+# The address the session server binds to (only ever a loopback address)
+SERVER_HOST   = '127.0.0.1'
+# The port the session server listens on
+SERVER_PORT   = 9470
+# The number of sessions a worker ticks before letting its clients be served
+SERVER_SLICE  = 16
+# The most bytes waiting to go to a client before its states are skipped
+SERVER_BUFFER = 65536
+# The number of ticks in a row a client may stay over SERVER_BUFFER before it is dropped
+SERVER_STALL  = 300
+# The most input bytes read from a client at once
+SERVER_READ   = 256
+# The share of states after which a test bot changes keys
+BOT_CHANGE    = 0.1
+# The time between reads of a slow test bot, in seconds
+BOT_SLOW      = 0.25
+# The bytes a slow test bot reads at once (also its receive buffer, so the
+# kernel does not hide how far behind it is)
+BOT_SLOW_READ = 1024
+
+### SPECTATOR CONSTANTS (see spectator.py) ###
+
+# The steps per pixel that spectator positions and velocities are sent in
+SPECTATOR_SCALE   = 1024
+# The most a spectator's view of an object may be off before it is corrected, in pixels
+SPECTATOR_ERROR   = 0.5
+# The number of past frames the encoder keeps to diff against
+SPECTATOR_HISTORY = 120
 
 ### GAME CONSTANTS ###
 
@@ -118,6 +192,33 @@ STATE_CONTINUE = 4
 STATE_COMPLETE = 5
 # state when the welcome screen is up
 STATE_WELCOME = 6
+# The name of each state, for reports
+STATE_NAMES = {
+    STATE_INACTIVE: 'inactive', STATE_LOADING: 'loading', STATE_ACTIVE: 'active',
+    STATE_PAUSED: 'paused', STATE_CONTINUE: 'continue', STATE_COMPLETE: 'complete',
+    STATE_WELCOME: 'welcome',
+}
+# The time for one frame at 60 frames per second, in seconds
+FRAME_BUDGET = 1/60
+
+### QUALITY GOVERNOR CONSTANTS (see governor.py) ###
+
+# The quality levels, best first: (bullet cap, draw pips, voices, cosmetic interval)
+QUALITY_LEVELS = (
+    (None, True,  SOUND_VOICES, 1),
+    (12,   True,  2, 2),
+    (8,    False, 1, 4),
+    (4,    False, 1, 8),
+)
+# Step down a level when the average frame uses more than this share of the budget
+GOVERNOR_HIGH = 0.9
+# Step up a level when the average frame uses less than this share of the budget
+GOVERNOR_LOW = 0.6
+# The weight of the newest frame in the moving average of frame times
+GOVERNOR_SMOOTHING = 0.1
+# The number of frames to wait after a change before changing level again
+GOVERNOR_HOLD = 60
+
 ### FONT CONSTANTS ###
 
 # The font choice for the title
@@ -134,29 +235,84 @@ MESSAGE_SIZE = 60
 # The y-offset for the message (the value to add to the center y value)
 MESSAGE_OFFSET = -70
 
+### TESTING CONSTANTS ###
+
+# Whether the autopilot plays the game instead of the keyboard (for soak tests)
+AUTOPILOT = False
+# A collision closer than this many frames is treated as imminent by the autopilot
+AUTOPILOT_PANIC = 40
+# The autopilot fires when its aim is within this many degrees of the target
+AUTOPILOT_AIM = 6
+# The autopilot thrusts away when facing within this many degrees of the escape route
+AUTOPILOT_ESCAPE = 60
+
+# The backend for the array kernels: 'auto', 'python', 'numpy' or 'numba' (see kernels.py)
+KERNEL_BACKEND = 'auto'
+
+# Whether full garbage collections are moved out of play (see gcpolicy.py)
+GC_CONTROL = True
+# Whether the timing of the explicit collections is printed at exit
+GC_REPORT = False
+# The generation 2 collection threshold while the game is active
+GC_ACTIVE_THRESHOLD = 1000000
+# The growth in live memory blocks during play that forces a collection
+GC_CEILING = 500000
+
+# Whether allocations and garbage collections are tracked per phase of a frame
+MEMTRACK = False
+# The number of frames of tracemalloc traceback to keep
+MEMTRACK_FRAMES = 1
+# The number of allocation sites to show in the memory report
+MEMTRACK_TOP = 10
+# Whether metrics are served for Prometheus (see metrics.py)
+METRICS = False
+# The address the metrics server binds to (only ever a loopback address)
+METRICS_HOST = '127.0.0.1'
+# The port the metrics server listens on
+METRICS_PORT = 9464
+# The number of frames between snapshots of the metrics
+METRICS_PUBLISH = 30
+# The upper bounds of the frame time histogram buckets, in seconds
+METRICS_BUCKETS = (0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.1)
+
+# Whether every frame is recorded to a SQLite database (see telemetry.py)
+TELEMETRY = False
+# The database the frame records are written to
+TELEMETRY_FILE = 'telemetry.db'
+# The most frame records waiting to be written before new ones are dropped
+TELEMETRY_RING = 4096
+# The most frame records written in one transaction
+TELEMETRY_BATCH = 512
+# The time the writer waits between batches, in seconds
+TELEMETRY_INTERVAL = 0.5
+
+# Whether the hitch watchdog samples the stack during slow frames
+WATCHDOG = False
+# The frame time that counts as a hitch, in seconds
+WATCHDOG_BUDGET = 0.05
+# The time between stack samples during a hitch, in seconds
+WATCHDOG_INTERVAL = 0.005
+# The file the watchdog writes collapsed stacks to
+WATCHDOG_FILE = 'hitches.log'
+# The size in bytes at which the watchdog file is rotated
+WATCHDOG_FILE_SIZE = 1000000
+# The number of rotated watchdog files to keep
+WATCHDOG_FILE_COUNT = 3
+
 ### JSON FILES ###
 
-# The default wave
+# The default wave (the command line can pick another; see cli.py)
 DEFAULT_WAVE  = 'easy1UFO.json'
+# The folder, next to this module, that holds the wave files
+WAVE_FOLDER   = 'JSON'
 
-### USE COMMAND LINE ARGUMENTS TO CHANGE DEFAULT LEVEL FILE
-"""
-sys.argv is a list of the command line arguments when you run python. These
-arguments are everything after the word python. So if you start the game typing
+### ASSET FILES ###
 
-    python planetoids default.json
-
-Python puts ['planetoids', 'default.json'] into sys.argv. Below, we take
-advantage of this fact to change the constant DEFAULT_LEVEL. This is the level
-file to be used when you start the game.
-"""
-try:
-    file = sys.argv[1]
-    if file[-5:].lower() == '.json':
-        DEFAULT_WAVE = file
-    else:
-        DEFAULT_WAVE = file+'.json'
-except:
-    pass # Use original value
+# The folders, next to this module, that hold the images, sounds and fonts
+IMAGE_FOLDER  = 'Images'
+SOUND_FOLDER  = 'Sounds'
+FONT_FOLDER   = 'Fonts'
+# The number of threads reading asset files while the title screen is up
+WARMUP_WORKERS = 4
 
 ### ADD MORE CONSTANTS (PROPERLY COMMENTED) AS NECESSARY ###
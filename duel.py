@@ -0,0 +1,369 @@
+"""
+Duel module for Planetoids
+
+This module contains the simulation for a two-ship wave, written for
+lockstep play (see lockstep.py). Two peers only stay in step if every frame
+comes out exactly the same on both from the same inputs, so a duel uses none
+of the game's images, timers or random numbers. A DuelState is only numbers
+in tuples, and step returns the next state from the current one and each
+player's input for the frame. States are never changed, so rolling back is
+keeping an old one, and the digest of a state is cheap to compare between
+peers.
+
+The rules follow Wave. Ships turn, thrust and wrap like Ship, and may raise
+the shield once per life. Asteroids split like in Wave.split_asteroids. A
+bullet hits asteroids and the other ship, and a ship hit without its shield
+loses a life and comes back at its start DUEL_RESPAWN frames later.
+"""
+from consts import *
+from vecmath import *
+
+# The keys of a player's input, one bit each in this order
+DUEL_KEYS = ('left', 'right', 'up', 'down', 'spacebar')
+
+# The asteroid sizes, in the order of their codes
+DUEL_SIZES = ('small', 'medium', 'large')
+# The radius and speed of each asteroid size code
+DUEL_RADII = (SMALL_RADIUS, MEDIUM_RADIUS, LARGE_RADIUS)
+DUEL_SPEEDS = (SMALL_SPEED, MEDIUM_SPEED, LARGE_SPEED)
+
+# The fields of a ship tuple
+SHIP_X, SHIP_Y, SHIP_VX, SHIP_VY, SHIP_HEADING = range(5)
+SHIP_LIVES_LEFT, SHIP_RELOAD, SHIP_SHIELD, SHIP_USED, SHIP_RESPAWN, SHIP_SCORE = range(5, 11)
+
+
+def encode(input):
+    """
+    Returns the keys held down as the bits of an int, in the order of DUEL_KEYS.
+
+    Parameter input: the keyboard (or anything that plays it)
+    Precondition: input has a method is_key_down(key)
+    """
+    bits = 0
+    for i in range(len(DUEL_KEYS)):
+        if input.is_key_down(DUEL_KEYS[i]):
+            bits |= 1 << i
+    return bits
+
+
+def new_duel(data):
+    """
+    Returns the first state of a duel on a wave.
+
+    The asteroids come from the wave data, each moving in its own direction.
+    The ships start a quarter of the way in from each side, facing each other.
+
+    Parameter data: the wave data
+    Precondition: data is a dict in the wave JSON format
+    """
+    starts = ((GAME_WIDTH / 4, GAME_HEIGHT / 2, 0), (3 * GAME_WIDTH / 4, GAME_HEIGHT / 2, 180))
+    ships = tuple(_spawn(start, SHIP_LIVES, 0) for start in starts)
+    asteroids = []
+    for entry in data['asteroids']:
+        size = DUEL_SIZES.index(entry['size'])
+        vel_x, vel_y = scaled(entry['direction'][0], entry['direction'][1], DUEL_SPEEDS[size])
+        asteroids.append((float(entry['position'][0]), float(entry['position'][1]),
+                          vel_x, vel_y, size))
+    return DuelState(0, starts, ships, tuple(asteroids), ())
+
+
+def _spawn(start, lives, score):
+    """
+    Returns a ship tuple for a ship at its start.
+
+    Parameter start: where the ship starts, as (x, y, heading)
+    Precondition: start is a tuple of two floats and an int 0..359
+
+    Parameter lives: the lives the ship has left
+    Precondition: lives is an int > 0
+
+    Parameter score: the ship's score so far
+    Precondition: score is an int >= 0
+    """
+    return (start[0], start[1], 0.0, 0.0, start[2], lives, 0, 0, False, 0, score)
+
+
+class DuelState(object):
+    """
+    A class to represent the state of a duel at the start of a frame.
+
+    A state never changes; step returns a new one. A ship is the tuple
+    (x, y, vel_x, vel_y, heading, lives, reload, shield, used, respawn, score)
+    indexed by the SHIP constants; it is out of play while respawn is not 0
+    (-1 once it has no lives left). An asteroid is (x, y, vel_x, vel_y, size)
+    with size an index into DUEL_SIZES, and a bullet is (x, y, vel_x, vel_y,
+    owner, life).
+    """
+    # Attribute _frame: the frame this state is the start of
+    # Invariant: _frame is an int >= 0
+    #
+    # Attribute _starts: where each ship starts, as (x, y, heading)
+    # Invariant: _starts is a tuple of two tuples
+    #
+    # Attribute _ships: the two ships
+    # Invariant: _ships is a tuple of two ship tuples
+    #
+    # Attribute _asteroids: the asteroids
+    # Invariant: _asteroids is a tuple of asteroid tuples
+    #
+    # Attribute _bullets: the bullets of both ships
+    # Invariant: _bullets is a tuple of bullet tuples
+    __slots__ = ('_frame', '_starts', '_ships', '_asteroids', '_bullets')
+
+    def getFrame(self):
+        """
+        Returns the frame this state is the start of.
+        """
+        return self._frame
+
+    def getShips(self):
+        """
+        Returns the two ship tuples.
+        """
+        return self._ships
+
+    def getAsteroids(self):
+        """
+        Returns the asteroid tuples.
+        """
+        return self._asteroids
+
+    def getBullets(self):
+        """
+        Returns the bullet tuples.
+        """
+        return self._bullets
+
+    def isOver(self):
+        """
+        Returns True if a ship has no lives left.
+        """
+        return self._ships[0][SHIP_RESPAWN] < 0 or self._ships[1][SHIP_RESPAWN] < 0
+
+    def __init__(self, frame, starts, ships, asteroids, bullets):
+        """
+        Initializes a state.
+
+        Parameter frame: the frame this state is the start of
+        Precondition: frame is an int >= 0
+
+        Parameter starts: where each ship starts, as (x, y, heading)
+        Precondition: starts is a tuple of two tuples
+
+        Parameter ships: the two ships
+        Precondition: ships is a tuple of two ship tuples
+
+        Parameter asteroids: the asteroids
+        Precondition: asteroids is a tuple of asteroid tuples
+
+        Parameter bullets: the bullets
+        Precondition: bullets is a tuple of bullet tuples
+        """
+        self._frame = frame
+        self._starts = starts
+        self._ships = ships
+        self._asteroids = asteroids
+        self._bullets = bullets
+
+    def digest(self):
+        """
+        Returns a 32-bit digest of this state.
+
+        Python hashes numbers and tuples the same way in every process (only
+        strings and bytes are salted), so two peers on the same Python get
+        the same digest for the same state.
+        """
+        return hash((self._frame, self._ships, self._asteroids, self._bullets)) & 0xFFFFFFFF
+
+    def nudged(self):
+        """
+        Returns a copy of this state with the first asteroid one pixel to the
+        right, to test that the peers notice when their states differ.
+        """
+        asteroids = self._asteroids
+        if len(asteroids) > 0:
+            asteroids = ((asteroids[0][0] + 1,) + asteroids[0][1:],) + asteroids[1:]
+        return DuelState(self._frame, self._starts, self._ships, asteroids, self._bullets)
+
+    def step(self, inputs):
+        """
+        Returns the state at the start of the next frame.
+
+        Parameter inputs: the input bits of each player for this frame
+        Precondition: inputs is a tuple of two ints (see encode)
+        """
+        low_x, high_x = -DEAD_ZONE, GAME_WIDTH + DEAD_ZONE
+        low_y, high_y = -DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE
+        ships = [list(ship) for ship in self._ships]
+        bullets = []
+        for bullet in self._bullets:
+            if bullet[5] > 1:
+                bullets.append((wrapped(bullet[0] + bullet[2], low_x, high_x),
+                                wrapped(bullet[1] + bullet[3], low_y, high_y),
+                                bullet[2], bullet[3], bullet[4], bullet[5] - 1))
+        for i in range(2):
+            self._fly(i, ships[i], inputs[i], bullets)
+        asteroids = [(wrapped(x + vx, low_x, high_x), wrapped(y + vy, low_y, high_y),
+                      vx, vy, size) for x, y, vx, vy, size in self._asteroids]
+
+        # Bullets hit the first asteroid they touch, or the other ship
+        breaks = []
+        left = []
+        for bullet in bullets:
+            hit = self._first_hit(asteroids, bullet[0], bullet[1], BULLET_RADIUS)
+            if hit is not None:
+                breaks.append((asteroids.pop(hit), bullet[2], bullet[3]))
+                ships[bullet[4]][SHIP_SCORE] += 1
+                continue
+            other = ships[1 - bullet[4]]
+            if other[SHIP_RESPAWN] == 0 and overlaps(bullet[0], bullet[1],
+                    other[SHIP_X], other[SHIP_Y], BULLET_RADIUS + self._radius(other)):
+                if other[SHIP_SHIELD] == 0:
+                    self._destroy(other)
+                    ships[bullet[4]][SHIP_SCORE] += 5
+                continue
+            left.append(bullet)
+
+        # Ships hit the first asteroid they touch, breaking it
+        for ship in ships:
+            if ship[SHIP_RESPAWN] != 0:
+                continue
+            hit = self._first_hit(asteroids, ship[SHIP_X], ship[SHIP_Y], self._radius(ship))
+            if hit is not None:
+                vel_x, vel_y = ship[SHIP_VX], ship[SHIP_VY]
+                if vel_x == 0 and vel_y == 0:
+                    vel_x, vel_y = COS_DEG[ship[SHIP_HEADING]], SIN_DEG[ship[SHIP_HEADING]]
+                breaks.append((asteroids.pop(hit), vel_x, vel_y))
+                if ship[SHIP_SHIELD] == 0:
+                    self._destroy(ship)
+
+        for asteroid, vel_x, vel_y in breaks:
+            self._split(asteroids, asteroid, vel_x, vel_y)
+        return DuelState(self._frame + 1, self._starts, (tuple(ships[0]), tuple(ships[1])),
+                         tuple(asteroids), tuple(left))
+
+    # HELPER METHODS
+    def _fly(self, i, ship, bits, bullets):
+        """
+        Moves one ship by its input for the frame, firing if it can.
+
+        Parameter i: the player
+        Precondition: i is 0 or 1
+
+        Parameter ship: the ship, changed in place
+        Precondition: ship is a ship tuple as a list
+
+        Parameter bits: the player's input bits
+        Precondition: bits is an int
+
+        Parameter bullets: the bullets, to add a new one to
+        Precondition: bullets is a list of bullet tuples
+        """
+        if ship[SHIP_RESPAWN] > 0:
+            ship[SHIP_RESPAWN] -= 1
+            if ship[SHIP_RESPAWN] == 0:
+                ship[:] = _spawn(self._starts[i], ship[SHIP_LIVES_LEFT], ship[SHIP_SCORE])
+            return
+        if ship[SHIP_RESPAWN] < 0:
+            return
+
+        if bits & 1:
+            ship[SHIP_HEADING] = (ship[SHIP_HEADING] + SHIP_TURN_RATE) % 360
+        if bits & 2:
+            ship[SHIP_HEADING] = (ship[SHIP_HEADING] - SHIP_TURN_RATE) % 360
+        facing_x = COS_DEG[ship[SHIP_HEADING]]
+        facing_y = SIN_DEG[ship[SHIP_HEADING]]
+        if bits & 4:
+            ship[SHIP_VX], ship[SHIP_VY] = clamped(ship[SHIP_VX] + facing_x * SHIP_IMPULSE,
+                ship[SHIP_VY] + facing_y * SHIP_IMPULSE, SHIP_MAX_SPEED)
+        if ship[SHIP_SHIELD] > 0:
+            ship[SHIP_SHIELD] -= 1
+        if bits & 8 and not ship[SHIP_USED]:
+            ship[SHIP_SHIELD] = SHIELD_TIME
+            ship[SHIP_USED] = True
+        ship[SHIP_X] = wrapped(ship[SHIP_X] + ship[SHIP_VX], -DEAD_ZONE, GAME_WIDTH + DEAD_ZONE)
+        ship[SHIP_Y] = wrapped(ship[SHIP_Y] + ship[SHIP_VY], -DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE)
+
+        if ship[SHIP_RELOAD] > 0:
+            ship[SHIP_RELOAD] -= 1
+        elif bits & 16:
+            ship[SHIP_RELOAD] = BULLET_RATE
+            bullets.append((ship[SHIP_X] + facing_x * SHIP_RADIUS,
+                            ship[SHIP_Y] + facing_y * SHIP_RADIUS,
+                            facing_x * BULLET_SPEED, facing_y * BULLET_SPEED,
+                            i, DUEL_BULLET_LIFE))
+
+    def _radius(self, ship):
+        """
+        Returns the collision radius of a ship, which is larger with the shield up.
+
+        Parameter ship: the ship
+        Precondition: ship is a ship tuple or list
+        """
+        if ship[SHIP_SHIELD] > 0:
+            return SHIP_RADIUS * SHIELD_SCALE
+        return SHIP_RADIUS
+
+    def _first_hit(self, asteroids, x, y, radius):
+        """
+        Returns the index of the first asteroid touching a circle, or None.
+
+        Parameter asteroids: the asteroids
+        Precondition: asteroids is a list of asteroid tuples
+
+        Parameter x: x coordinate of the circle's center
+        Precondition: x is a float
+
+        Parameter y: y coordinate of the circle's center
+        Precondition: y is a float
+
+        Parameter radius: radius of the circle
+        Precondition: radius is a number >= 0
+        """
+        for k in range(len(asteroids)):
+            asteroid = asteroids[k]
+            if overlaps(asteroid[0], asteroid[1], x, y, DUEL_RADII[asteroid[4]] + radius):
+                return k
+        return None
+
+    def _destroy(self, ship):
+        """
+        Takes a life from a ship and takes it out of play.
+
+        Parameter ship: the ship, changed in place
+        Precondition: ship is a ship tuple as a list, in play
+        """
+        ship[SHIP_LIVES_LEFT] -= 1
+        ship[SHIP_RESPAWN] = DUEL_RESPAWN if ship[SHIP_LIVES_LEFT] > 0 else -1
+        ship[SHIP_VX] = 0.0
+        ship[SHIP_VY] = 0.0
+        ship[SHIP_SHIELD] = 0
+
+    def _split(self, asteroids, asteroid, vel_x, vel_y):
+        """
+        Adds the three smaller asteroids a broken asteroid splits into.
+
+        Small asteroids do not split. The pieces leave along the collision
+        vector rotated by 0, 120 and 240 degrees, as in Wave.
+
+        Parameter asteroids: the asteroids, to add the pieces to
+        Precondition: asteroids is a list of asteroid tuples
+
+        Parameter asteroid: the asteroid that broke
+        Precondition: asteroid is an asteroid tuple
+
+        Parameter vel_x: x component of the collision vector
+        Precondition: vel_x is a float
+
+        Parameter vel_y: y component of the collision vector
+        Precondition: vel_y is a float
+        """
+        size = asteroid[4] - 1
+        if size < 0:
+            return
+        dir_x, dir_y = unit(vel_x, vel_y)
+        for k in range(3):
+            x, y = rotated(dir_x, dir_y, SPLIT_COS[k], SPLIT_SIN[k])
+            asteroids.append((asteroid[0] + x * DUEL_RADII[size],
+                              asteroid[1] + y * DUEL_RADII[size],
+                              x * DUEL_SPEEDS[size], y * DUEL_SPEEDS[size], size))
@@ -0,0 +1,106 @@
+"""
+Collision event module for Planetoids
+
+This module contains the per-frame event bus that Wave uses for collisions.
+The collision loops only record what hit what, as small tuples in a buffer.
+At the end of the frame the whole buffer is handed to each consumer (splitting
+asteroids, lives, counters and so on) in one call. The inner loops stay short,
+and adding a consumer does not slow them down.
+
+An event is a tuple (kind, subject, other). The kinds and what subject and
+other are for each kind are listed below.
+"""
+
+# A ship bullet hit an asteroid: (BULLET_ASTEROID, bullet, asteroid)
+BULLET_ASTEROID = 0
+# The ship hit an asteroid: (SHIP_ASTEROID, ship, asteroid)
+SHIP_ASTEROID = 1
+# A ship bullet hit a UFO: (BULLET_UFO, bullet, ufo)
+BULLET_UFO = 2
+# The ship hit a UFO: (SHIP_UFO, ship, ufo)
+SHIP_UFO = 3
+# An alien bullet hit the ship: (ALIEN_SHIP, bullet, ship)
+ALIEN_SHIP = 4
+
+# The number of event kinds
+EVENT_KINDS = 5
+
+
+class EventBus(object):
+    """
+    A class to represent a per-frame buffer of collision events.
+
+    Collision code calls emit while it runs. Once per frame, flush passes the
+    buffered events to every consumer, in the order they subscribed, and
+    starts a new buffer.
+    """
+    # Attribute _events: the events emitted so far this frame
+    # Invariant: _events is a list of (kind, subject, other) tuples
+    #
+    # Attribute _consumers: the functions that receive each batch
+    # Invariant: _consumers is a list of (consumer, kinds) pairs, where
+    #           consumer is callable and kinds is a frozenset of event kinds
+    #           or None for every kind
+
+    def getEvents(self):
+        """
+        Returns the events emitted so far this frame.
+        """
+        return self._events
+
+    def __init__(self):
+        """
+        Initializes an event bus with no events and no consumers.
+        """
+        self._events = []
+        self._consumers = []
+
+    def subscribe(self, consumer, kinds=None):
+        """
+        Adds a consumer for the events of each frame.
+
+        The consumer is called once per flush with a list of events. If kinds
+        is given, the list only holds events of those kinds, and the consumer
+        is not called when there are none.
+
+        Parameter consumer: the function to call with each batch
+        Precondition: consumer is callable with one argument
+
+        Parameter kinds: the event kinds the consumer wants
+        Precondition: kinds is an iterable of event kinds, or None
+        """
+        if kinds is not None:
+            kinds = frozenset(kinds)
+        self._consumers.append((consumer, kinds))
+
+    def emit(self, kind, subject, other):
+        """
+        Adds an event to this frame's buffer.
+
+        Parameter kind: the kind of event
+        Precondition: kind is one of the event kinds in this module
+
+        Parameter subject: the first object in the collision
+        Precondition: subject is the object named first by kind
+
+        Parameter other: the second object in the collision
+        Precondition: other is the object named second by kind
+        """
+        self._events.append((kind, subject, other))
+
+    def flush(self):
+        """
+        Passes this frame's events to every consumer and clears the buffer.
+
+        Consumers that want every kind are called even if there were no events,
+        so per-frame counters can reset.
+        """
+        batch = self._events
+        self._events = []
+        for consumer, kinds in self._consumers:
+            if kinds is None:
+                consumer(batch)
+            else:
+                events = [event for event in batch if event[0] in kinds]
+                if len(events) > 0:
+                    consumer(events)
@@ -0,0 +1,119 @@
+"""
+Garbage collection policy module for Planetoids
+
+Python's cyclic garbage collector runs whenever enough objects have been
+allocated, which can be in the middle of a busy frame. This module contains
+a policy that moves the full (generation 2) collections out of play.
+
+When a wave has loaded, everything alive is collected once and then frozen,
+so later collections do not scan the wave's long-lived objects. While the
+game is active the generation 2 threshold is raised so that full
+collections do not run on their own. They run instead at the natural
+breaks: when the game pauses after a death, when it is complete, and when a
+wave loads. If the number of live memory blocks grows past a ceiling during
+play, a collection is forced anyway so garbage cannot grow without bound.
+Every explicit collection is timed and recorded.
+"""
+import gc
+import sys
+import time
+from consts import *
+
+
+class CollectorPolicy(object):
+    """
+    A class to represent the garbage collection policy.
+
+    Call update once per frame with the game state, and wave_loaded after
+    each new wave is created.
+    """
+    # Attribute _state: the game state last frame
+    # Invariant: _state is one of the STATE constants in consts.py, or None at first
+    #
+    # Attribute _thresholds: the collector thresholds to restore outside of play
+    # Invariant: _thresholds is a tuple of three ints
+    #
+    # Attribute _baseline: the number of live memory blocks after the last collection
+    # Invariant: _baseline is an int >= 0
+    #
+    # Attribute _history: every explicit collection, as
+    #            (reason, generation, seconds, collected) tuples
+    # Invariant: _history is a list of tuples
+
+    def getHistory(self):
+        """
+        Returns every explicit collection as (reason, generation, seconds,
+        collected) tuples.
+        """
+        return self._history
+
+    def __init__(self):
+        """
+        Initializes a policy using the collector's current thresholds outside of play.
+        """
+        self._state = None
+        self._thresholds = gc.get_threshold()
+        self._baseline = sys.getallocatedblocks()
+        self._history = []
+
+    def update(self, state):
+        """
+        Adjusts the collector for the game state, collecting at natural breaks.
+
+        Parameter state: the current game state
+        Precondition: state is one of the STATE constants in consts.py
+        """
+        if state != self._state:
+            if state == STATE_ACTIVE:
+                gc.set_threshold(self._thresholds[0], self._thresholds[1],
+                                 GC_ACTIVE_THRESHOLD)
+            elif self._state == STATE_ACTIVE:
+                gc.set_threshold(*self._thresholds)
+                if state == STATE_COMPLETE:
+                    # The wave is over, so its frozen objects may be garbage now
+                    gc.unfreeze()
+                    self.collect('complete')
+                elif state == STATE_PAUSED:
+                    self.collect('paused')
+            self._state = state
+        elif state == STATE_ACTIVE:
+            if sys.getallocatedblocks() - self._baseline > GC_CEILING:
+                self.collect('ceiling')
+
+    def wave_loaded(self):
+        """
+        Collects the previous wave and freezes everything alive in the new one.
+        """
+        gc.unfreeze()
+        self.collect('wave')
+        gc.freeze()
+
+    def collect(self, reason, generation=2):
+        """
+        Runs a timed collection and records it.
+
+        Parameter reason: why the collection was run
+        Precondition: reason is a str
+
+        Parameter generation: the oldest generation to collect
+        Precondition: generation is 0, 1 or 2
+        """
+        start = time.perf_counter()
+        collected = gc.collect(generation)
+        self._history.append((reason, generation, time.perf_counter() - start,
+                              collected))
+        self._baseline = sys.getallocatedblocks()
+
+    def report(self, out=None):
+        """
+        Prints the timing of the explicit collections.
+
+        Parameter out: the file to print to
+        Precondition: out is a writable text file, or None for standard output
+        """
+        if out is None:
+            out = sys.stdout
+        print('Explicit collections: %d' % len(self._history), file=out)
+        for reason, generation, seconds, collected in self._history:
+            print('  %-9s gen %d: %.3f ms, %d collected' %
+                  (reason, generation, seconds * 1000, collected), file=out)
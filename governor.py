@@ -0,0 +1,137 @@
+"""
+Quality governor module for Planetoids
+
+Movement in Planetoids is tied to frames, so when a frame takes longer than
+the frame budget the whole game slows down. This module contains a governor
+that watches how long update and draw take and, when frames run over budget,
+steps down through quality levels that make frames cheaper. When there is
+headroom again it steps back up.
+
+Each level sets four knobs, read by Wave and Planetoids through getters:
+the most live bullets the ship may have, whether the UFO lives pips are
+drawn, how many sound voices may play at once, and how often (in frames)
+cosmetic updates such as the lives label are refreshed. Every level change
+is recorded with the frame and timing that caused it.
+"""
+from consts import *
+
+
+class Governor(object):
+    """
+    A class to represent a frame-budget quality governor.
+
+    Call measure once per frame with the time spent in update and draw.
+    """
+    # Attribute _budget: the time allowed for one frame, in seconds
+    # Invariant: _budget is a float > 0
+    #
+    # Attribute _level: the current quality level
+    # Invariant: _level is an int, 0 <= _level < len(QUALITY_LEVELS)
+    #
+    # Attribute _average: moving average of update plus draw time, in seconds
+    # Invariant: _average is a float >= 0
+    #
+    # Attribute _frame: the number of frames measured
+    # Invariant: _frame is an int >= 0
+    #
+    # Attribute _hold: frames left before the level may change again
+    # Invariant: _hold is an int >= 0
+    #
+    # Attribute _history: every level change, as (frame, old, new, average) tuples
+    # Invariant: _history is a list of tuples
+
+    def getLevel(self):
+        """
+        Returns the current quality level (0 is the best quality).
+        """
+        return self._level
+
+    def getAverage(self):
+        """
+        Returns the moving average of update plus draw time, in seconds.
+        """
+        return self._average
+
+    def getHistory(self):
+        """
+        Returns every level change as (frame, old level, new level, average) tuples.
+        """
+        return self._history
+
+    def getBulletCap(self):
+        """
+        Returns the most live bullets the ship may have, or None for no cap.
+        """
+        return QUALITY_LEVELS[self._level][0]
+
+    def getDrawPips(self):
+        """
+        Returns True if the UFO lives pips should be drawn.
+        """
+        return QUALITY_LEVELS[self._level][1]
+
+    def getVoices(self):
+        """
+        Returns the number of sound voices that may play at once.
+        """
+        return QUALITY_LEVELS[self._level][2]
+
+    def getCosmeticInterval(self):
+        """
+        Returns how many frames apart cosmetic updates should be.
+        """
+        return QUALITY_LEVELS[self._level][3]
+
+    def isCosmeticFrame(self):
+        """
+        Returns True if cosmetic updates should run this frame.
+        """
+        return self._frame % QUALITY_LEVELS[self._level][3] == 0
+
+    def __init__(self, budget=FRAME_BUDGET):
+        """
+        Initializes a governor at the best quality level.
+
+        Parameter budget: the time allowed for one frame, in seconds
+        Precondition: budget is a float > 0
+        """
+        self._budget = budget
+        self._level = 0
+        self._average = 0.0
+        self._frame = 0
+        self._hold = 0
+        self._history = []
+
+    def measure(self, update_time, draw_time):
+        """
+        Records the time of one frame and changes the quality level if needed.
+
+        Parameter update_time: the time spent in update this frame, in seconds
+        Precondition: update_time is a float >= 0
+
+        Parameter draw_time: the time spent in draw this frame, in seconds
+        Precondition: draw_time is a float >= 0
+        """
+        self._frame += 1
+        self._average += GOVERNOR_SMOOTHING * (update_time + draw_time - self._average)
+        if self._hold > 0:
+            self._hold -= 1
+            return
+
+        if self._average > GOVERNOR_HIGH * self._budget:
+            if self._level < len(QUALITY_LEVELS) - 1:
+                self._change(self._level + 1)
+        elif self._average < GOVERNOR_LOW * self._budget:
+            if self._level > 0:
+                self._change(self._level - 1)
+
+    def _change(self, level):
+        """
+        Moves to the given quality level and records the change.
+
+        Parameter level: the new quality level
+        Precondition: level is an int, 0 <= level < len(QUALITY_LEVELS)
+        """
+        self._history.append((self._frame, self._level, level, self._average))
+        self._level = level
+        self._hold = GOVERNOR_HOLD
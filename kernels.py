@@ -0,0 +1,407 @@
+"""
+Physics kernel module for Planetoids
+
+This module contains the kernels that move, wrap and collision test whole
+arrays of objects at once (the UFO fleet uses them every frame), with one
+backend per way of running them:
+
+    python  plain Python loops, the reference the others are checked against
+    numpy   vectorized array operations
+    numba   the Python loops compiled by Numba, if Numba is installed
+
+Every backend has the same methods and gives the same results, bit for bit.
+The backend is KERNEL_BACKEND when the module is imported, and can be changed
+at run time with use; 'auto' picks Numba when it is installed and NumPy
+otherwise, and asking for Numba without it installed falls back to NumPy with
+a warning. Numba compiles the kernels when it is picked, so the game (which
+imports this module during the warm-up) never compiles during play. The
+function check runs every available backend on the same random data and
+compares them with the reference.
+
+Single objects (the ship and each asteroid) still wrap with plain Python,
+which is faster than calling into any backend for one value.
+"""
+import warnings
+import numpy as np
+from consts import *
+from vecmath import wrap_array as _wrap_array
+
+
+# THE KERNELS AS PYTHON LOOPS (the python backend, and the source for numba)
+def _move_wrap_loop(pos, vel, low_x, low_y, high_x, high_y):
+    """
+    Moves every row of pos by its velocity and wraps it, in place.
+
+    Parameter pos: the positions
+    Precondition: pos is an (n, 2) numpy float array
+
+    Parameter vel: the velocities
+    Precondition: vel is an (n, 2) numpy float array
+
+    Parameter low_x: the left edge
+    Precondition: low_x is a float
+
+    Parameter low_y: the bottom edge
+    Precondition: low_y is a float
+
+    Parameter high_x: the right edge
+    Precondition: high_x is a float > low_x
+
+    Parameter high_y: the top edge
+    Precondition: high_y is a float > low_y
+    """
+    for i in range(pos.shape[0]):
+        x = pos[i, 0] + vel[i, 0]
+        y = pos[i, 1] + vel[i, 1]
+        if x < low_x:
+            x += high_x - low_x
+        if x > high_x:
+            x -= high_x - low_x
+        if y < low_y:
+            y += high_y - low_y
+        if y > high_y:
+            y -= high_y - low_y
+        pos[i, 0] = x
+        pos[i, 1] = y
+
+
+def _wrap_loop(values, low, high):
+    """
+    Wraps every value into the range [low, high], in place.
+
+    Parameter values: the coordinates
+    Precondition: values is a 1-dimensional numpy float array
+
+    Parameter low: the low edge
+    Precondition: low is a float
+
+    Parameter high: the high edge
+    Precondition: high is a float > low
+    """
+    for i in range(values.shape[0]):
+        v = values[i]
+        if v < low:
+            v += high - low
+        if v > high:
+            v -= high - low
+        values[i] = v
+
+
+def _first_hit_loop(pos, x, y, reach):
+    """
+    Returns the first row of pos closer than reach to (x, y), or -1 if none is.
+
+    Parameter pos: the positions
+    Precondition: pos is an (n, 2) numpy float array
+
+    Parameter x: the x coordinate of the point
+    Precondition: x is a float
+
+    Parameter y: the y coordinate of the point
+    Precondition: y is a float
+
+    Parameter reach: the distance
+    Precondition: reach is a float >= 0
+    """
+    for i in range(pos.shape[0]):
+        dx = pos[i, 0] - x
+        dy = pos[i, 1] - y
+        if dx * dx + dy * dy < reach * reach:
+            return i
+    return -1
+
+
+class PythonBackend(object):
+    """
+    A class to represent the reference backend, written as plain Python loops.
+    """
+
+    def getName(self):
+        """
+        Returns the name of the backend.
+        """
+        return 'python'
+
+    def move_wrap(self, pos, vel, low, high):
+        """
+        Moves every position by its velocity and wraps it, in place.
+
+        Parameter pos: the positions
+        Precondition: pos is an (n, 2) numpy float array
+
+        Parameter vel: the velocities
+        Precondition: vel is an (n, 2) numpy float array
+
+        Parameter low: the bottom left corner of the wrapping area, as (x, y)
+        Precondition: low is a tuple of two numbers
+
+        Parameter high: the top right corner of the wrapping area, as (x, y)
+        Precondition: high is a tuple of two numbers greater than low
+        """
+        _move_wrap_loop(pos, vel, float(low[0]), float(low[1]),
+                        float(high[0]), float(high[1]))
+
+    def wrap_array(self, values, low, high):
+        """
+        Wraps every value into the range [low, high], in place.
+
+        Parameter values: the coordinates
+        Precondition: values is a 1-dimensional numpy float array
+
+        Parameter low: the low edge
+        Precondition: low is a number
+
+        Parameter high: the high edge
+        Precondition: high is a number > low
+        """
+        _wrap_loop(values, float(low), float(high))
+
+    def first_hit(self, pos, x, y, reach):
+        """
+        Returns the index of the first position closer than reach to (x, y),
+        or None if there is none.
+
+        Parameter pos: the positions
+        Precondition: pos is an (n, 2) numpy float array
+
+        Parameter x: the x coordinate of the point
+        Precondition: x is a number
+
+        Parameter y: the y coordinate of the point
+        Precondition: y is a number
+
+        Parameter reach: the distance
+        Precondition: reach is a number >= 0
+        """
+        i = _first_hit_loop(pos, float(x), float(y), float(reach))
+        return None if i < 0 else int(i)
+
+
+class NumpyBackend(PythonBackend):
+    """
+    A class to represent the backend using vectorized NumPy operations.
+    """
+
+    def getName(self):
+        """
+        Returns the name of the backend.
+        """
+        return 'numpy'
+
+    def move_wrap(self, pos, vel, low, high):
+        """
+        Moves every position by its velocity and wraps it, in place.
+
+        See PythonBackend.move_wrap.
+        """
+        pos += vel
+        _wrap_array(pos[:, 0], float(low[0]), float(high[0]))
+        _wrap_array(pos[:, 1], float(low[1]), float(high[1]))
+
+    def wrap_array(self, values, low, high):
+        """
+        Wraps every value into the range [low, high], in place.
+
+        See PythonBackend.wrap_array.
+        """
+        _wrap_array(values, float(low), float(high))
+
+    def first_hit(self, pos, x, y, reach):
+        """
+        Returns the index of the first position closer than reach to (x, y),
+        or None if there is none.
+
+        See PythonBackend.first_hit.
+        """
+        dx = pos[:, 0] - x
+        dy = pos[:, 1] - y
+        hits = np.flatnonzero(dx * dx + dy * dy < reach * reach)
+        if len(hits) == 0:
+            return None
+        return int(hits[0])
+
+
+class NumbaBackend(PythonBackend):
+    """
+    A class to represent the backend running the Python loops compiled by Numba.
+
+    The kernels are compiled when the backend is made, so no frame pays for it.
+    """
+    # Attribute _move_wrap: the compiled _move_wrap_loop
+    # Invariant: _move_wrap is a Numba dispatcher
+    #
+    # Attribute _wrap: the compiled _wrap_loop
+    # Invariant: _wrap is a Numba dispatcher
+    #
+    # Attribute _first_hit: the compiled _first_hit_loop
+    # Invariant: _first_hit is a Numba dispatcher
+
+    def getName(self):
+        """
+        Returns the name of the backend.
+        """
+        return 'numba'
+
+    def __init__(self):
+        """
+        Initializes the backend, compiling the kernels.
+
+        This raises ImportError if Numba is not installed.
+        """
+        import numba
+        # Compile eagerly for the only types the game uses; fastmath stays off
+        # so the results match the other backends exactly
+        self._move_wrap = numba.njit('void(f8[:,:], f8[:,:], f8, f8, f8, f8)',
+                                     cache=True)(_move_wrap_loop)
+        self._wrap = numba.njit('void(f8[:], f8, f8)', cache=True)(_wrap_loop)
+        self._first_hit = numba.njit('i8(f8[:,:], f8, f8, f8)',
+                                     cache=True)(_first_hit_loop)
+
+    def move_wrap(self, pos, vel, low, high):
+        """
+        Moves every position by its velocity and wraps it, in place.
+
+        See PythonBackend.move_wrap.
+        """
+        self._move_wrap(pos, vel, float(low[0]), float(low[1]),
+                        float(high[0]), float(high[1]))
+
+    def wrap_array(self, values, low, high):
+        """
+        Wraps every value into the range [low, high], in place.
+
+        See PythonBackend.wrap_array.
+        """
+        self._wrap(values, float(low), float(high))
+
+    def first_hit(self, pos, x, y, reach):
+        """
+        Returns the index of the first position closer than reach to (x, y),
+        or None if there is none.
+
+        See PythonBackend.first_hit.
+        """
+        i = self._first_hit(pos, float(x), float(y), float(reach))
+        return None if i < 0 else int(i)
+
+
+# The backend classes, by name
+BACKENDS = {'python': PythonBackend, 'numpy': NumpyBackend, 'numba': NumbaBackend}
+
+# The backends made so far, by name (None for one that cannot run here)
+_made = {}
+
+# The backend in use (see use at the end of the module)
+_current = None
+
+
+def current():
+    """
+    Returns the backend in use.
+    """
+    return _current
+
+
+def make(name):
+    """
+    Returns the backend with this name, or None if it cannot run here.
+
+    Each backend is made once and kept, so Numba compiles (and an import
+    that fails is tried) only the first time.
+
+    Parameter name: the backend name
+    Precondition: name is a key of BACKENDS
+    """
+    if not name in _made:
+        try:
+            _made[name] = BACKENDS[name]()
+        except ImportError:
+            _made[name] = None
+    return _made[name]
+
+
+def available():
+    """
+    Returns the names of the backends that can run here.
+    """
+    return [name for name in BACKENDS if make(name) is not None]
+
+
+def use(name):
+    """
+    Switches to a backend and returns it.
+
+    'auto' picks Numba if it is installed and NumPy otherwise. Asking for a
+    backend that cannot run here falls back to NumPy with a warning.
+
+    Parameter name: the backend name
+    Precondition: name is 'auto' or a key of BACKENDS
+    """
+    global _current
+    if name == 'auto':
+        backend = make('numba')
+        if backend is None:
+            backend = make('numpy')
+    elif not name in BACKENDS:
+        raise ValueError('unknown backend %r (choose from auto, %s)' %
+                         (name, ', '.join(BACKENDS)))
+    else:
+        backend = make(name)
+        if backend is None:
+            warnings.warn('the %s backend is not available; using numpy' % name)
+            backend = make('numpy')
+    _current = backend
+    return backend
+
+
+def check(count=500, frames=60, seed=0):
+    """
+    Returns whether each available backend matches the python backend.
+
+    Every backend moves and wraps the same random objects for a number of
+    frames, wraps the same values and collision tests the same points; the
+    results must be identical to the reference. The objects wrap at the edges
+    of the game, like the UFO fleet. The result is a dict from backend name to
+    True or False.
+
+    Parameter count: the number of objects
+    Precondition: count is an int > 0
+
+    Parameter frames: the number of frames to move them
+    Precondition: frames is an int >= 0
+
+    Parameter seed: the random seed
+    Precondition: seed is an int
+    """
+    rng = np.random.default_rng(seed)
+    low = (float(-DEAD_ZONE), float(-DEAD_ZONE))
+    high = (float(GAME_WIDTH + DEAD_ZONE), float(GAME_HEIGHT + DEAD_ZONE))
+    speed = UFO_SPEED + LARGE_SPEED
+    start = np.column_stack((rng.uniform(low[0] - speed, high[0] + speed, count),
+                             rng.uniform(low[1] - speed, high[1] + speed, count)))
+    vel = rng.uniform(-speed, speed, (count, 2))
+    values = rng.uniform(low[0] - GAME_WIDTH / 2, high[0] + GAME_WIDTH / 2, count)
+    points = np.column_stack((rng.uniform(low[0], high[0], frames),
+                              rng.uniform(low[1], high[1], frames)))
+    reach = float(UFO_RADIUS + SHIP_RADIUS)
+
+    def run(backend):
+        pos = start.copy()
+        hits = []
+        for frame in range(frames):
+            backend.move_wrap(pos, vel, low, high)
+            hits.append(backend.first_hit(pos, points[frame, 0], points[frame, 1], reach))
+        wrapped = values.copy()
+        backend.wrap_array(wrapped, low[0], high[0])
+        return (pos, hits, wrapped)
+
+    reference = run(make('python'))
+    result = {}
+    for name in available():
+        pos, hits, wrapped = run(make(name))
+        result[name] = (np.array_equal(pos, reference[0]) and hits == reference[1] and
+                        np.array_equal(wrapped, reference[2]))
+    return result
+
+
+use(KERNEL_BACKEND)
@@ -0,0 +1,435 @@
+"""
+Lockstep module for Planetoids
+
+This module contains a peer for a two-player duel (see duel.py) played in
+lockstep over UDP. The peers only send their inputs, one byte a frame, and
+each runs the whole simulation.
+
+A peer does not wait for the other player's input. It plays its own input
+LOCKSTEP_DELAY frames after the key was pressed, and predicts that the other
+player is still holding the keys of their last input that arrived. When an
+input arrives that differs from the prediction, the peer rolls back to the
+state at the start of that frame (states never change, so the old one is
+just kept) and plays the frames since again with the real input. A peer never
+runs more than LOCKSTEP_WINDOW frames past the last input it has, so a
+rollback never plays more than that many frames again.
+
+Once both inputs of every frame before a state are known, the state is final,
+and the peers send each other its digest. If the digests for a frame differ,
+the simulations went apart on that frame, and getDesync reports it.
+
+Each packet carries every input and digest (up to LOCKSTEP_HASHES of them)
+the other peer has not acknowledged, so lost or reordered packets only delay
+the game and the check. For testing on loopback, setLink holds packets back,
+reorders them and drops them, counted in frames so a run can be repeated
+exactly.
+"""
+import random
+import socket
+import struct
+from consts import *
+
+# The packet header: input ack, digest ack, first input frame, first digest
+# frame, number of inputs, number of digests
+PACKET_HEADER = struct.Struct('<IIIIBB')
+
+
+class LockstepPeer(object):
+    """
+    A class to represent one player's side of a lockstep duel.
+
+    Call tick once per render frame with the keys held down; it receives the
+    other player's packets, rolls back if a prediction was wrong, plays the
+    next frame (unless it has to wait) and sends this player's inputs.
+    """
+    # Attribute _player: which ship this peer plays
+    # Invariant: _player is 0 or 1
+    #
+    # Attribute _socket: the UDP socket, bound and non-blocking
+    # Invariant: _socket is a socket.socket
+    #
+    # Attribute _address: the other peer's address
+    # Invariant: _address is a (host, port) tuple
+    #
+    # Attribute _state: the state at the start of the frame to play next
+    # Invariant: _state is a DuelState
+    #
+    # Attribute _states: the state at the start of every frame that may be rolled back to
+    # Invariant: _states is a dict of frame to DuelState, for frames >= _confirmed
+    #
+    # Attribute _local: this player's inputs, by frame
+    # Invariant: _local is a dict of int to int, with every frame up to the last key sent
+    #
+    # Attribute _remote: the other player's inputs that have arrived, by frame
+    # Invariant: _remote is a dict of int to int
+    #
+    # Attribute _used: the other player's input each frame was played with
+    # Invariant: _used is a dict of int to int, for the frames played since _confirmed
+    #
+    # Attribute _confirmed: the first frame whose other player's input has not arrived
+    # Invariant: _confirmed is an int >= 0
+    #
+    # Attribute _acked: the first frame of this player's input the other peer lacks
+    # Invariant: _acked is an int >= 0
+    #
+    # Attribute _hashAcked: the first frame whose digest the other peer has not compared
+    # Invariant: _hashAcked is an int >= 0
+    #
+    # Attribute _verified: the first frame whose state has not been digested
+    # Invariant: _verified is an int >= 0
+    #
+    # Attribute _hashes: the digest of each final state, by frame
+    # Invariant: _hashes is a dict of int to int
+    #
+    # Attribute _theirs: the other peer's digests not yet compared, by frame
+    # Invariant: _theirs is a dict of int to int
+    #
+    # Attribute _compared: the first frame whose digests have not been compared
+    # Invariant: _compared is an int >= 0
+    #
+    # Attribute _desync: the first frame whose digests differed, or None
+    # Invariant: _desync is an int or None
+    #
+    # Attribute _rollbacks: the number of rollbacks
+    # Invariant: _rollbacks is an int >= 0
+    #
+    # Attribute _replayed: the number of frames played again after rollbacks
+    # Invariant: _replayed is an int >= 0
+    #
+    # Attribute _stalls: the number of ticks spent waiting for the other player
+    # Invariant: _stalls is an int >= 0
+    #
+    # Attribute _clock: the number of ticks so far
+    # Invariant: _clock is an int >= 0
+    #
+    # Attribute _lag: the frames each packet is held back, for testing
+    # Invariant: _lag is an int >= 0
+    #
+    # Attribute _jitter: the most extra frames a packet is held back, for testing
+    # Invariant: _jitter is an int >= 0
+    #
+    # Attribute _loss: the share of packets dropped, for testing
+    # Invariant: _loss is a float between 0 and 1
+    #
+    # Attribute _random: the random numbers for the test link
+    # Invariant: _random is a random.Random
+    #
+    # Attribute _outbox: the packets held back, as (tick due, packet)
+    # Invariant: _outbox is a list of tuples
+    #
+    # Attribute _nudge: the frame to put a desync in, for testing
+    # Invariant: _nudge is an int or None
+
+    def getPlayer(self):
+        """
+        Returns which ship this peer plays (0 or 1).
+        """
+        return self._player
+
+    def getState(self):
+        """
+        Returns the state at the start of the frame to play next.
+        """
+        return self._state
+
+    def getFrame(self):
+        """
+        Returns the frame to play next.
+        """
+        return self._state.getFrame()
+
+    def getConfirmed(self):
+        """
+        Returns the first frame whose other player's input has not arrived.
+        """
+        return self._confirmed
+
+    def getAddress(self):
+        """
+        Returns the address this peer receives on, as (host, port).
+        """
+        return self._socket.getsockname()
+
+    def getDesync(self):
+        """
+        Returns the first frame whose state differed between the peers, or None.
+        """
+        return self._desync
+
+    def getCompared(self):
+        """
+        Returns the first frame whose digests have not been compared.
+        """
+        return self._compared
+
+    def getRollbacks(self):
+        """
+        Returns the number of rollbacks so far.
+        """
+        return self._rollbacks
+
+    def getReplayed(self):
+        """
+        Returns the number of frames played again after rollbacks.
+        """
+        return self._replayed
+
+    def getStalls(self):
+        """
+        Returns the number of ticks spent waiting for the other player.
+        """
+        return self._stalls
+
+    def setAddress(self, address):
+        """
+        Sets the other peer's address.
+
+        Parameter address: the address the other peer receives on
+        Precondition: address is a (host, port) tuple
+        """
+        self._address = address
+
+    def setLink(self, lag=0, jitter=0, loss=0.0, seed=0):
+        """
+        Sets the delay and loss of the packets this peer sends, for testing.
+
+        Parameter lag: the frames each packet is held back
+        Precondition: lag is an int >= 0
+
+        Parameter jitter: the most extra frames a packet is held back
+        Precondition: jitter is an int >= 0
+
+        Parameter loss: the share of packets dropped
+        Precondition: loss is a float between 0 and 1
+
+        Parameter seed: the seed for the delays and drops
+        Precondition: seed is an int
+        """
+        self._lag = lag
+        self._jitter = jitter
+        self._loss = loss
+        self._random = random.Random(seed)
+
+    def __init__(self, state, player, host='127.0.0.1', port=0, address=None):
+        """
+        Initializes a peer at the start of a duel.
+
+        Parameter state: the first state of the duel (the same for both peers)
+        Precondition: state is a DuelState
+
+        Parameter player: which ship this peer plays
+        Precondition: player is 0 or 1
+
+        Parameter host: the address to receive on
+        Precondition: host is a str
+
+        Parameter port: the port to receive on
+        Precondition: port is an int >= 0 (0 picks a free port)
+
+        Parameter address: the other peer's address
+        Precondition: address is a (host, port) tuple, or None to set it later
+        """
+        self._player = player
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((host, port))
+        self._socket.setblocking(False)
+        self._address = address
+        self._state = state
+        self._states = {}
+        # Nothing is pressed in the frames before the first key can be played
+        first = state.getFrame()
+        self._local = {frame: 0 for frame in range(first, first + LOCKSTEP_DELAY)}
+        self._remote = {}
+        self._used = {}
+        self._confirmed = first
+        self._acked = first
+        self._hashAcked = first
+        self._verified = first
+        self._hashes = {}
+        self._theirs = {}
+        self._compared = first
+        self._desync = None
+        self._rollbacks = 0
+        self._replayed = 0
+        self._stalls = 0
+        self._clock = 0
+        self._outbox = []
+        self._nudge = None
+        self.setLink()
+
+    def tick(self, bits):
+        """
+        Plays the next frame with this player's keys, and returns True if a
+        frame was played (False if the peer is waiting for the other player).
+
+        Parameter bits: the keys held down (see duel.encode)
+        Precondition: bits is an int 0..255
+        """
+        self._clock += 1
+        self._receive()
+        frame = self._state.getFrame()
+        if frame - self._confirmed >= LOCKSTEP_WINDOW:
+            self._stalls += 1
+            self._send()
+            return False
+
+        if not frame + LOCKSTEP_DELAY in self._local:
+            self._local[frame + LOCKSTEP_DELAY] = bits
+        self._states[frame] = self._state
+        self._state = self._play(self._state)
+        self._verify()
+        self._send()
+        return True
+
+    def inject_desync(self, frame):
+        """
+        Makes this peer nudge the first asteroid by one pixel whenever it plays
+        a frame, for testing.
+
+        This is what a bug in only one peer's simulation would do. The nudge
+        happens again if the frame is played again after a rollback, and the
+        digests differ from the state at the start of the next frame on.
+
+        Parameter frame: the frame to nudge the asteroid on
+        Precondition: frame is an int >= 0
+        """
+        self._nudge = frame
+
+    def close(self):
+        """
+        Closes the socket.
+        """
+        self._socket.close()
+
+    # HELPER METHODS
+    def _play(self, state):
+        """
+        Returns the state after playing one frame from the given state.
+
+        The other player's input is the one that arrived, or a prediction
+        (their last input that arrived) if it has not.
+
+        Parameter state: the state at the start of the frame
+        Precondition: state is a DuelState
+        """
+        frame = state.getFrame()
+        remote = self._remote.get(frame)
+        if remote is None:
+            remote = self._remote.get(self._confirmed - 1, 0)
+        self._used[frame] = remote
+        local = self._local.get(frame, 0)
+        inputs = (local, remote) if self._player == 0 else (remote, local)
+        if frame == self._nudge:
+            return state.step(inputs).nudged()
+        return state.step(inputs)
+
+    def _receive(self):
+        """
+        Reads every packet that has arrived, rolling back if a prediction was wrong.
+        """
+        self._flush()
+        rollback = None
+        while True:
+            try:
+                packet = self._socket.recv(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionError:
+                continue
+            ack, hashAck, first, hashed, count, digests = PACKET_HEADER.unpack_from(packet)
+            self._acked = max(self._acked, ack)
+            self._hashAcked = max(self._hashAcked, hashAck)
+            inputs = packet[PACKET_HEADER.size:PACKET_HEADER.size + count]
+            for k in range(count):
+                frame = first + k
+                if frame < self._confirmed or frame in self._remote:
+                    continue
+                self._remote[frame] = inputs[k]
+                if frame in self._used and self._used[frame] != inputs[k]:
+                    if rollback is None or frame < rollback:
+                        rollback = frame
+            values = struct.unpack_from('<%dI' % digests, packet, PACKET_HEADER.size + count)
+            for k in range(digests):
+                if hashed + k >= self._compared and not hashed + k in self._theirs:
+                    self._theirs[hashed + k] = values[k]
+
+        while self._confirmed in self._remote:
+            self._confirmed += 1
+        if rollback is not None:
+            self._rollback(rollback)
+
+    def _rollback(self, frame):
+        """
+        Goes back to the start of a frame and plays the frames since again.
+
+        Parameter frame: the first frame played with a wrong prediction
+        Precondition: frame is an int, a key of _states
+        """
+        self._rollbacks += 1
+        state = self._states[frame]
+        while state.getFrame() < self._state.getFrame():
+            self._states[state.getFrame()] = state
+            state = self._play(state)
+            self._replayed += 1
+        self._state = state
+
+    def _verify(self):
+        """
+        Digests every state that has become final and compares the digests.
+
+        Old states, inputs and digests that can no longer be needed are dropped.
+        """
+        last = min(self._confirmed, self._state.getFrame())
+        while self._verified <= last:
+            frame = self._verified
+            state = self._state if frame == self._state.getFrame() else self._states[frame]
+            self._hashes[frame] = state.digest()
+            self._verified += 1
+        while self._compared in self._hashes and self._compared in self._theirs:
+            if self._hashes[self._compared] != self._theirs.pop(self._compared):
+                if self._desync is None:
+                    self._desync = self._compared
+            self._compared += 1
+
+        # Inputs are kept until they are played and, for this player's, sent
+        played = min(self._confirmed, self._state.getFrame())
+        for frame in [frame for frame in self._states if frame < self._confirmed]:
+            del self._states[frame]
+            del self._used[frame]
+        for frame in [frame for frame in self._remote if frame < played - 1]:
+            del self._remote[frame]
+        for frame in [frame for frame in self._local if frame < min(self._acked, played)]:
+            del self._local[frame]
+        for frame in [frame for frame in self._hashes
+                      if frame < min(self._compared, self._hashAcked)]:
+            del self._hashes[frame]
+
+    def _send(self):
+        """
+        Sends every input the other peer lacks and the latest digests.
+        """
+        last = max(self._local)
+        first = max(self._acked, last - 254)
+        inputs = bytes(self._local[frame] for frame in range(first, last + 1))
+        hashed = self._hashAcked
+        digests = [self._hashes[frame] for frame in
+                   range(hashed, min(self._verified, hashed + LOCKSTEP_HASHES))]
+        packet = (PACKET_HEADER.pack(self._confirmed, self._compared, first, hashed,
+                                     len(inputs), len(digests)) +
+                  inputs + struct.pack('<%dI' % len(digests), *digests))
+
+        if self._lag == 0 and self._jitter == 0 and self._loss == 0:
+            self._socket.sendto(packet, self._address)
+        elif self._random.random() >= self._loss:
+            due = self._clock + self._lag + self._random.randint(0, self._jitter)
+            self._outbox.append((due, packet))
+
+    def _flush(self):
+        """
+        Sends the held back packets that are due.
+        """
+        due = [packet for packet in self._outbox if packet[0] <= self._clock]
+        if len(due) > 0:
+            self._outbox = [packet for packet in self._outbox if packet[0] > self._clock]
+            for packet in due:
+                self._socket.sendto(packet[1], self._address)
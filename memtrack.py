@@ -0,0 +1,186 @@
+"""
+Allocation tracking module for Planetoids
+
+This module contains a diagnostics tracker that finds where each frame
+allocates memory and when the garbage collector pauses the game. Wave marks
+the start of each phase of a frame (ship, asteroids, bullet_update, UFO,
+events and draw). The tracker charges every phase with the bytes it
+allocated (from tracemalloc) and the change in the number of live memory
+blocks, which is close to the number of objects created minus those freed.
+
+A gc callback records every collection with its generation, duration, the
+number of objects collected and the phase it interrupted. Snapshots taken
+when tracking starts and when the report is made show which source lines
+hold the most new memory.
+
+Tracking slows the game a lot, so it is only for finding problems.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from consts import *
+
+
+class AllocationTracker(object):
+    """
+    A class to represent the allocation and garbage collection tracker.
+
+    Call start once, then frame at the start of every frame and phase at the
+    start of every phase (with None at the end of the last one).
+    """
+    # Attribute _phases: the totals for each phase, as name -> [frames, bytes, peak, blocks]
+    # Invariant: _phases is a dict of str to lists of 4 numbers
+    #
+    # Attribute _current: the phase running now
+    # Invariant: _current is a str, or None between phases
+    #
+    # Attribute _entered: (traced bytes, blocks) when the current phase started
+    # Invariant: _entered is a tuple of two ints
+    #
+    # Attribute _frames: the number of frames tracked
+    # Invariant: _frames is an int >= 0
+    #
+    # Attribute _pauses: every garbage collection, as
+    #            (frame, phase, generation, seconds, collected) tuples
+    # Invariant: _pauses is a list of tuples
+    #
+    # Attribute _gcstart: when the running collection started, or None
+    # Invariant: _gcstart is a float or None
+    #
+    # Attribute _snapshot: the tracemalloc snapshot taken at start
+    # Invariant: _snapshot is a tracemalloc.Snapshot, or None before start
+
+    def getFrames(self):
+        """
+        Returns the number of frames tracked.
+        """
+        return self._frames
+
+    def getPauses(self):
+        """
+        Returns every garbage collection as (frame, phase, generation, seconds,
+        collected) tuples.
+        """
+        return self._pauses
+
+    def getPhase(self, name):
+        """
+        Returns the totals of a phase as (frames, bytes, peak bytes, blocks).
+
+        Parameter name: the phase name
+        Precondition: name is a str
+        """
+        return tuple(self._phases.get(name, (0, 0, 0, 0)))
+
+    def __init__(self):
+        """
+        Initializes a tracker that has not started yet.
+        """
+        self._phases = {}
+        self._current = None
+        self._entered = (0, 0)
+        self._frames = 0
+        self._pauses = []
+        self._gcstart = None
+        self._snapshot = None
+
+    def start(self):
+        """
+        Starts tracing allocations and watching the garbage collector.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMTRACK_FRAMES)
+        gc.callbacks.append(self._on_gc)
+        self._snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """
+        Stops watching the garbage collector and tracing allocations.
+        """
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        tracemalloc.stop()
+
+    def frame(self):
+        """
+        Marks the start of a frame.
+        """
+        self._frames += 1
+
+    def phase(self, name):
+        """
+        Ends the current phase and starts the next one.
+
+        Parameter name: the phase starting now
+        Precondition: name is a str, or None if no phase follows
+        """
+        if self._current is not None:
+            size, peak = tracemalloc.get_traced_memory()
+            totals = self._phases.get(self._current)
+            if totals is None:
+                totals = [0, 0, 0, 0]
+                self._phases[self._current] = totals
+            totals[0] += 1
+            totals[1] += size - self._entered[0]
+            totals[2] += peak - self._entered[0]
+            totals[3] += sys.getallocatedblocks() - self._entered[1]
+        self._current = name
+        if name is not None:
+            tracemalloc.reset_peak()
+            self._entered = (tracemalloc.get_traced_memory()[0],
+                             sys.getallocatedblocks())
+
+    def report(self, out=None):
+        """
+        Prints a summary of the allocations and garbage collections.
+
+        Parameter out: the file to print to
+        Precondition: out is a writable text file, or None for standard output
+        """
+        if out is None:
+            out = sys.stdout
+        frames = max(self._frames, 1)
+        print('Allocations over %d frames (per frame):' % self._frames, file=out)
+        print('  %-14s %12s %12s %10s' % ('phase', 'net bytes', 'peak bytes', 'blocks'),
+              file=out)
+        for name, totals in self._phases.items():
+            print('  %-14s %12.1f %12.1f %10.2f' %
+                  (name, totals[1] / frames, totals[2] / frames, totals[3] / frames),
+                  file=out)
+
+        print('Garbage collections: %d' % len(self._pauses), file=out)
+        for generation in range(3):
+            times = [p[3] for p in self._pauses if p[2] == generation]
+            if len(times) > 0:
+                print('  gen %d: %d pauses, %.3f ms total, %.3f ms longest' %
+                      (generation, len(times), sum(times) * 1000, max(times) * 1000),
+                      file=out)
+        for name in self._phases:
+            count = len([p for p in self._pauses if p[1] == name])
+            if count > 0:
+                print('  during %s: %d' % (name, count), file=out)
+
+        if self._snapshot is not None and tracemalloc.is_tracing():
+            print('Largest growth by line:', file=out)
+            stats = tracemalloc.take_snapshot().compare_to(self._snapshot, 'lineno')
+            for stat in stats[:MEMTRACK_TOP]:
+                print('  ' + str(stat), file=out)
+
+    def _on_gc(self, phase, info):
+        """
+        Records a garbage collection (the gc module calls this).
+
+        Parameter phase: 'start' or 'stop'
+        Precondition: phase is a str
+
+        Parameter info: the generation, and for 'stop' the objects collected
+        Precondition: info is a dict
+        """
+        if phase == 'start':
+            self._gcstart = time.perf_counter()
+        elif self._gcstart is not None:
+            self._pauses.append((self._frames, self._current, info['generation'],
+                                 time.perf_counter() - self._gcstart,
+                                 info['collected']))
+            self._gcstart = None
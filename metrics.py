@@ -0,0 +1,360 @@
+"""
+Metrics endpoint module for Planetoids
+
+This module contains a recorder for frame timings and game counts, and a
+small HTTP server that serves them as Prometheus text. The server is bound
+to localhost and runs on its own thread.
+
+The game never waits on the server. The recorder adds to its own counters
+on the game thread, and every few frames it copies them into a new snapshot
+and swaps that in with a single assignment. The server thread only reads
+the latest published snapshot, which is never changed after it is swapped
+in, so there is no lock to wait on.
+"""
+import gc
+import http.server
+import threading
+import time
+from consts import *
+
+# The names of the collision event kinds, in the order of events.py
+COLLISION_NAMES = ('bullet_asteroid', 'ship_asteroid', 'bullet_ufo', 'ship_ufo',
+                   'alien_ship')
+
+
+class Histogram(object):
+    """
+    A class to represent a Prometheus histogram with the METRICS_BUCKETS bounds.
+    """
+    # Attribute _counts: the number of observations in each bucket (the last is +Inf)
+    # Invariant: _counts is a list of len(METRICS_BUCKETS) + 1 ints >= 0
+    #
+    # Attribute _sum: the sum of all observations
+    # Invariant: _sum is a float >= 0
+
+    def getCounts(self):
+        """
+        Returns the number of observations in each bucket (not cumulative).
+        """
+        return self._counts
+
+    def getSum(self):
+        """
+        Returns the sum of all observations.
+        """
+        return self._sum
+
+    def __init__(self):
+        """
+        Initializes an empty histogram.
+        """
+        self._counts = [0] * (len(METRICS_BUCKETS) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        """
+        Adds an observation.
+
+        Parameter value: the value observed
+        Precondition: value is a number >= 0
+        """
+        i = 0
+        while i < len(METRICS_BUCKETS) and value > METRICS_BUCKETS[i]:
+            i += 1
+        self._counts[i] += 1
+        self._sum += value
+
+    def copy(self):
+        """
+        Returns a copy of this histogram.
+        """
+        result = Histogram()
+        result._counts = self._counts[:]
+        result._sum = self._sum
+        return result
+
+
+class Metrics(object):
+    """
+    A class to represent the metrics recorder and its HTTP server.
+
+    It is a Wave tracker, so Wave tells it when each phase of a frame starts.
+    Planetoids reports the update and draw times and samples the wave once
+    per frame.
+    """
+    # Attribute _phases: the time histogram of each phase, by phase name
+    # Invariant: _phases is a dict of str to Histogram
+    #
+    # Attribute _current: the phase running now, or None between phases
+    # Invariant: _current is a str or None
+    #
+    # Attribute _entered: when the current phase started (time.perf_counter)
+    # Invariant: _entered is a float
+    #
+    # Attribute _gauges: the latest counts, by metric name and label
+    # Invariant: _gauges is a dict of (str, str) tuples to numbers
+    #
+    # Attribute _collisions: the total collisions of each kind
+    # Invariant: _collisions is a list of ints, one per kind in COLLISION_NAMES
+    #
+    # Attribute _pauses: the garbage collection pause histogram of each generation
+    # Invariant: _pauses is a list of 3 Histograms
+    #
+    # Attribute _gcstart: when the running collection started, or None
+    # Invariant: _gcstart is a float or None
+    #
+    # Attribute _frames: the number of frames recorded
+    # Invariant: _frames is an int >= 0
+    #
+    # Attribute _updated: whether the wave has played a frame since the last sample
+    # Invariant: _updated is a bool
+    #
+    # Attribute _snapshot: the latest published copy of the metrics, read by scrapes
+    # Invariant: _snapshot is a tuple (phases, gauges, collisions, pauses, frames)
+    #
+    # Attribute _server: the HTTP server, or None if it is not running
+    # Invariant: _server is a http.server.ThreadingHTTPServer or None
+
+    def getSnapshot(self):
+        """
+        Returns the latest published snapshot as (phases, gauges, collisions,
+        pauses, frames).
+        """
+        return self._snapshot
+
+    def getPort(self):
+        """
+        Returns the port the server is listening on, or None if it is not running.
+        """
+        if self._server is None:
+            return None
+        return self._server.server_address[1]
+
+    def __init__(self):
+        """
+        Initializes a recorder with nothing recorded and no server running.
+        """
+        self._phases = {}
+        self._current = None
+        self._entered = 0.0
+        self._gauges = {}
+        self._collisions = [0] * len(COLLISION_NAMES)
+        self._pauses = [Histogram(), Histogram(), Histogram()]
+        self._gcstart = None
+        self._frames = 0
+        self._updated = False
+        self._server = None
+        self.publish()
+
+    def start(self, host=METRICS_HOST, port=METRICS_PORT):
+        """
+        Starts the HTTP server on a background thread.
+
+        Parameter host: the address to bind to
+        Precondition: host is a str (keep it a loopback address)
+
+        Parameter port: the port to listen on
+        Precondition: port is an int >= 0 (0 picks a free port)
+        """
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        thread = threading.Thread(target=self._server.serve_forever,
+                                  name='planetoids-metrics', daemon=True)
+        thread.start()
+        gc.callbacks.append(self._on_gc)
+
+    def stop(self):
+        """
+        Stops the HTTP server and stops watching the garbage collector.
+        """
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # RECORDING, ON THE GAME THREAD
+    def frame(self):
+        """
+        Marks the start of a wave frame.
+        """
+        self._updated = True
+
+    def phase(self, name):
+        """
+        Ends the current phase and starts the next one.
+
+        Parameter name: the phase starting now
+        Precondition: name is a str, or None if no phase follows
+        """
+        now = time.perf_counter()
+        if self._current is not None:
+            self.observe(self._current, now - self._entered)
+        self._current = name
+        self._entered = now
+
+    def observe(self, name, seconds):
+        """
+        Adds the time a phase took to its histogram.
+
+        Parameter name: the phase name
+        Precondition: name is a str
+
+        Parameter seconds: the time the phase took
+        Precondition: seconds is a float >= 0
+        """
+        histogram = self._phases.get(name)
+        if histogram is None:
+            histogram = Histogram()
+            self._phases[name] = histogram
+        histogram.observe(seconds)
+
+    def sample(self, state, wave):
+        """
+        Records the counts at the end of a frame, publishing every few frames.
+
+        The collision counts are only added if the wave played a frame since
+        the last sample, so frames drawn while paused do not count them again.
+
+        Parameter state: the current game state
+        Precondition: state is one of the STATE constants in consts.py
+
+        Parameter wave: the current wave
+        Precondition: wave is a Wave, or None if there is no wave
+        """
+        self._frames += 1
+        self._gauges[('planetoids_state', STATE_NAMES.get(state, str(state)))] = 1
+        for other in STATE_NAMES.values():
+            if other != STATE_NAMES.get(state):
+                self._gauges[('planetoids_state', other)] = 0
+        if wave is not None:
+            self._gauges[('planetoids_objects', 'asteroids')] = len(wave.getAsteroids())
+            self._gauges[('planetoids_objects', 'bullets')] = len(wave.getBullets())
+            self._gauges[('planetoids_objects', 'ufos')] = len(wave.getUFOs())
+            self._gauges[('planetoids_collision_tests', '')] = wave.getCollisionTests()
+            if self._updated:
+                counts = wave.getCollisionCounts()
+                for kind in range(len(self._collisions)):
+                    self._collisions[kind] += counts[kind]
+        self._updated = False
+        if self._frames % METRICS_PUBLISH == 0:
+            self.publish()
+
+    def publish(self):
+        """
+        Copies the metrics into a new snapshot and swaps it in for the scrapes.
+        """
+        phases = {}
+        for name, histogram in self._phases.items():
+            phases[name] = histogram.copy()
+        pauses = [histogram.copy() for histogram in self._pauses]
+        # A single assignment, so a scrape sees either the old or the new snapshot
+        self._snapshot = (phases, dict(self._gauges), self._collisions[:], pauses,
+                          self._frames)
+
+    # READING, ON THE SERVER THREAD
+    def render(self):
+        """
+        Returns the latest snapshot in the Prometheus text format.
+        """
+        phases, gauges, collisions, pauses, frames = self._snapshot
+        lines = []
+        lines.append('# HELP planetoids_frames_total Frames recorded.')
+        lines.append('# TYPE planetoids_frames_total counter')
+        lines.append('planetoids_frames_total %d' % frames)
+
+        lines.append('# HELP planetoids_phase_seconds Time spent in each phase of a frame.')
+        lines.append('# TYPE planetoids_phase_seconds histogram')
+        for name, histogram in sorted(phases.items()):
+            self._render_histogram(lines, 'planetoids_phase_seconds',
+                                   'phase="%s"' % name, histogram)
+
+        for metric, help in (('planetoids_objects', 'Objects in play.'),
+                             ('planetoids_collision_tests',
+                              'Collision tests made in the last frame.'),
+                             ('planetoids_state', 'The current game state (1 if current).')):
+            lines.append('# HELP %s %s' % (metric, help))
+            lines.append('# TYPE %s gauge' % metric)
+            for (name, label), value in sorted(gauges.items()):
+                if name != metric:
+                    continue
+                if metric == 'planetoids_objects':
+                    lines.append('%s{kind="%s"} %d' % (name, label, value))
+                elif metric == 'planetoids_state':
+                    lines.append('%s{state="%s"} %d' % (name, label, value))
+                else:
+                    lines.append('%s %d' % (name, value))
+
+        lines.append('# HELP planetoids_collisions_total Collisions of each kind.')
+        lines.append('# TYPE planetoids_collisions_total counter')
+        for kind in range(len(collisions)):
+            lines.append('planetoids_collisions_total{kind="%s"} %d' %
+                         (COLLISION_NAMES[kind], collisions[kind]))
+
+        lines.append('# HELP planetoids_gc_pause_seconds Garbage collection pauses.')
+        lines.append('# TYPE planetoids_gc_pause_seconds histogram')
+        for generation in range(len(pauses)):
+            self._render_histogram(lines, 'planetoids_gc_pause_seconds',
+                                   'generation="%d"' % generation, pauses[generation])
+        return '\n'.join(lines) + '\n'
+
+    # HELPER METHODS
+    def _render_histogram(self, lines, name, label, histogram):
+        """
+        Adds the lines for one labelled histogram.
+
+        Parameter lines: the lines to add to
+        Precondition: lines is a list of str
+
+        Parameter name: the metric name
+        Precondition: name is a str
+
+        Parameter label: the label, as name="value"
+        Precondition: label is a str
+
+        Parameter histogram: the histogram to render
+        Precondition: histogram is a Histogram
+        """
+        total = 0
+        counts = histogram.getCounts()
+        for i in range(len(METRICS_BUCKETS)):
+            total += counts[i]
+            lines.append('%s_bucket{%s,le="%g"} %d' % (name, label, METRICS_BUCKETS[i], total))
+        total += counts[-1]
+        lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, label, total))
+        lines.append('%s_sum{%s} %g' % (name, label, histogram.getSum()))
+        lines.append('%s_count{%s} %d' % (name, label, total))
+
+    def _on_gc(self, phase, info):
+        """
+        Records a garbage collection pause (the gc module calls this).
+
+        Parameter phase: 'start' or 'stop'
+        Precondition: phase is a str
+
+        Parameter info: the generation of the collection
+        Precondition: info is a dict
+        """
+        if phase == 'start':
+            self._gcstart = time.perf_counter()
+        elif self._gcstart is not None:
+            self._pauses[info['generation']].observe(time.perf_counter() - self._gcstart)
+            self._gcstart = None
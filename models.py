@@ -11,13 +11,282 @@ planetoids.
 from consts import *
 from game2d import *
 from introcs import *
+import introcs
 import random
 import math
+import numpy as np
+from vecmath import *
+import kernels
 
 # PRIMARY RULE: Models are not allowed to access anything in any module other than
-# consts.py. If you need extra information from Gameplay, then it should be a
-# parameter in your method, and Wave should pass it as an argument when it calls
-# the method.
+# consts.py (and the game-independent math kernels in vecmath.py and kernels.py).
+# If you need extra information from Gameplay, then it should be a parameter in
+# your method, and Wave should pass it as an argument when it calls the method.
+
+# Sprites shared between models, keyed by (source, width, height)
+_SPRITES = {}
+
+
+def getSprite(source, width, height):
+    """
+    Returns the shared sprite for the given image and size.
+
+    The sprite is created the first time it is asked for and reused after
+    that, so its image is only loaded once. Because the same object is
+    returned to every caller, set its position right before drawing it.
+
+    Parameter source: The image name for the sprite
+    Precondition: source is a string naming an image file
+
+    Parameter width: width of the sprite
+    Precondition: width is an int or float > 0
+
+    Parameter height: height of the sprite
+    Precondition: height is an int or float > 0
+    """
+    key = (source, width, height)
+    if not key in _SPRITES:
+        _SPRITES[key] = GImage(x = 0, y = 0, width = width, height = height,
+                               source = source)
+    return _SPRITES[key]
+
+
+# Sounds shared between waves, keyed by (source, voice)
+_SOUNDS = {}
+
+
+def getSound(source, voice):
+    """
+    Returns the shared sound for the given file and voice.
+
+    Each voice is its own Sound object, so different voices can play the
+    same file at once. The sound is loaded the first time it is asked for
+    and reused after that.
+
+    Parameter source: The sound file
+    Precondition: source is a string naming a sound file
+
+    Parameter voice: The voice number
+    Precondition: voice is an int >= 0
+    """
+    key = (source, voice)
+    if not key in _SOUNDS:
+        _SOUNDS[key] = Sound(source)
+    return _SOUNDS[key]
+
+
+class Ship(GImage):
+    """
+    A class to represent the game ship.
+
+    The ship is represented by an image. We MUST subclass GImage, because we
+    need extra attributes for the velocity and the facing of the ship.
+
+    The ship can turn, apply thrust along its facing and wrap around the
+    screen. It can also deploy a shield once per life. While the shield is up,
+    the ship has a larger collision radius and absorbs any hit it takes. The
+    ship does not time the shield itself; Wave lowers it after SHIELD_TIME
+    frames.
+    """
+    # Attribute _vel_x: x component of the velocity of the Ship
+    # Invariant: _vel_x is a float
+    #
+    # Attribute _vel_y: y component of the velocity of the Ship
+    # Invariant: _vel_y is a float; (_vel_x, _vel_y) has length <= SHIP_MAX_SPEED
+    #
+    # Attribute _heading: whole-degree direction the Ship is facing
+    # Invariant: _heading is an int between 0 and 359 matching the angle of the Ship
+    #
+    # Attribute _shield: whether the shield is up
+    # Invariant: _shield is a boolean
+    #
+    # Attribute _shieldUsed: whether the shield has been deployed this life
+    # Invariant: _shieldUsed is a boolean
+
+    def getShipVel_x(self):
+        """
+        Returns the x component of the Ship's velocity
+        """
+        return self._vel_x
+
+    def getShipVel_y(self):
+        """
+        Returns the y component of the Ship's velocity
+        """
+        return self._vel_y
+
+    def getShipVel(self):
+        """
+        Returns a copy of the Ship's velocity
+
+        Velocity is a Vector2 object.
+        """
+        return introcs.Vector2(self._vel_x, self._vel_y)
+
+    def getFacing_x(self):
+        """
+        Returns the x component of the direction the Ship is facing
+        """
+        return COS_DEG[self._heading]
+
+    def getFacing_y(self):
+        """
+        Returns the y component of the direction the Ship is facing
+        """
+        return SIN_DEG[self._heading]
+
+    def getFacing(self):
+        """
+        Returns a copy of the direction the Ship is facing
+
+        Facing is a unit Vector2 object.
+        """
+        return introcs.Vector2(COS_DEG[self._heading], SIN_DEG[self._heading])
+
+    def getRadius(self):
+        """
+        Returns the collision radius of the Ship.
+
+        The radius is larger while the shield is up.
+        """
+        if self._shield:
+            return SHIP_RADIUS * SHIELD_SCALE
+        return SHIP_RADIUS
+
+    def isShielded(self):
+        """
+        Returns True if the shield is up, and the Ship absorbs hits.
+        """
+        return self._shield
+
+    def __init__(self, x, y, angle, width, height, source):
+        """
+        Initializes the Ship object.
+
+        Parameter x: x coordinate of the Ship's starting position
+        Precondition: x is an int or float
+
+        Parameter y: y coordinate of the Ship's starting position
+        Precondition: y is an int or float
+
+        Parameter angle: the angle the Ship is facing
+        Precondition: angle is an int or float in radians (it is rounded
+        to a whole degree)
+
+        Parameter width: width of the image of the Ship
+        Precondition: width is an int or float
+
+        Parameter height: height of the image of the Ship
+        Precondition: height is an int or float
+
+        Parameter source: The image name for the Ship
+        Precondition: source is a string
+        """
+        # GImage angles are in degrees
+        self._heading = heading(math.degrees(angle))
+        super().__init__(x = x, y = y, width = width, height = height,
+                         angle = self._heading, source = source)
+        self._vel_x = 0.0
+        self._vel_y = 0.0
+        self._shield = False
+        self._shieldUsed = False
+
+    def turn_left(self):
+        """
+        Turns the Ship SHIP_TURN_RATE degrees counterclockwise.
+        """
+        self._turn(SHIP_TURN_RATE)
+
+    def turn_right(self):
+        """
+        Turns the Ship SHIP_TURN_RATE degrees clockwise.
+        """
+        self._turn(-SHIP_TURN_RATE)
+
+    def apply_thrust(self):
+        """
+        Adds SHIP_IMPULSE along the facing to the velocity.
+
+        The speed of the Ship never goes past SHIP_MAX_SPEED.
+        """
+        self._vel_x, self._vel_y = clamped(
+            self._vel_x + COS_DEG[self._heading] * SHIP_IMPULSE,
+            self._vel_y + SIN_DEG[self._heading] * SHIP_IMPULSE,
+            SHIP_MAX_SPEED)
+
+    def deploy_shield(self):
+        """
+        Raises the shield and returns True if it was raised.
+
+        The shield can only be deployed once per Ship. Nothing happens (and
+        this returns False) if it has already been used.
+        """
+        if self._shieldUsed:
+            return False
+        self._shieldUsed = True
+        self._shield = True
+        return True
+
+    def lower_shield(self):
+        """
+        Lowers the shield.
+        """
+        self._shield = False
+
+    def x_wrap(self):
+        """
+        Method to wrap the x component of the Ship so it stays onscreen.
+
+        When the Ship goes offscreen, it should be wrapped back around to the
+        other side. For example, when going offscreen to the left, it should
+        come back around on the right.
+        """
+        if self.x < -DEAD_ZONE:
+            self.x += GAME_WIDTH + 2 * DEAD_ZONE
+        elif self.x > GAME_WIDTH + DEAD_ZONE:
+            self.x -= GAME_WIDTH + 2 * DEAD_ZONE
+
+    def y_wrap(self):
+        """
+        Method to wrap the y component of the Ship so it stays onscreen.
+
+        When the Ship goes offscreen, it should be wrapped back around to the
+        other side. For example, when going offscreen to the top, it should come
+        back around on the bottom.
+        """
+        if self.y < -DEAD_ZONE:
+            self.y += GAME_HEIGHT + 2 * DEAD_ZONE
+        elif self.y > GAME_HEIGHT + DEAD_ZONE:
+            self.y -= GAME_HEIGHT + 2 * DEAD_ZONE
+
+    def draw(self, view):
+        """
+        Draws the Ship, and its shield if the shield is up.
+
+        Parameter view: Reference to the window
+        Precondition: an instance of GView
+        """
+        super().draw(view)
+        if self._shield:
+            size = 2 * SHIP_RADIUS * SHIELD_SCALE
+            shield = getSprite(SHIELD_IMAGE, size, size)
+            shield.x = self.x
+            shield.y = self.y
+            shield.angle = self.angle
+            shield.draw(view)
+
+    def _turn(self, degrees):
+        """
+        Turns the Ship by the given number of degrees and updates the facing.
+
+        The facing is looked up from the precomputed heading tables.
+
+        Parameter degrees: the amount to turn, counterclockwise
+        Precondition: degrees is an int
+        """
+        self._heading = (self._heading + degrees) % 360
+        self.angle = self._heading
+
 
 class Bullet(GEllipse):
     """
@@ -61,8 +330,11 @@ class Bullet(GEllipse):
     # Invariant: _fillcolor is a string representing a color. In this case,
     #           _fillcolor is BULLET_COLOR
     #
-    # Attribute _velocity: velocity of the Bullet
-    # Invariant: _velocity is a Vector2 object
+    # Attribute _vel_x: x component of the velocity of the Bullet
+    # Invariant: _vel_x is an int or float
+    #
+    # Attribute _vel_y: y component of the velocity of the Bullet
+    # Invariant: _vel_y is an int or float
 
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
 
@@ -75,7 +347,7 @@ class Bullet(GEllipse):
         Returns:
             float: The x component of the velocity.
         """
-        return self._velocity.x
+        return self._vel_x
 
     def getvel_y(self):
         """
@@ -86,16 +358,22 @@ class Bullet(GEllipse):
         Returns:
             float: The y component of the velocity.
         """
-        return self._velocity.y
+        return self._vel_y
 
     def getBulletVel(self):
         """
-        Returns the Bullet's velocity.
+        Returns a copy of the Bullet's velocity.
 
         Returns:
             Vector2: A vector containing the velocity components (x, y).
         """
-        return self._velocity
+        return introcs.Vector2(self._vel_x, self._vel_y)
+
+    def getRadius(self):
+        """
+        Returns the collision radius of the Bullet.
+        """
+        return BULLET_RADIUS
 
     # INITIALIZER TO SET THE POSITION AND VELOCITY
     def __init__(self, x, y, vel_x, vel_y, fillcolor):
@@ -119,8 +397,9 @@ class Bullet(GEllipse):
         super().__init__(x=x, y=y, width=2*BULLET_RADIUS,
                          height=2*BULLET_RADIUS, fillcolor=fillcolor)
 
-        # Initialize the velocity as a Vector2 object
-        self._velocity = introcs.Vector2(vel_x, vel_y)
+        # Keep the velocity as plain floats
+        self._vel_x = vel_x
+        self._vel_y = vel_y
 
 class Asteroid(GImage):
     """
@@ -163,8 +442,11 @@ class Asteroid(GImage):
     # Attribute _size: the size of the Asteroid
     # Invariant: _size is a str of a valid Asteroid size ('small', 'medium', 'large')
     #
-    # Attribute _velocity: velocity of the Asteroid
-    # Invariant: _velocity is a Vector2 object
+    # Attribute _vel_x: x component of the velocity of the Asteroid
+    # Invariant: _vel_x is a float
+    #
+    # Attribute _vel_y: y component of the velocity of the Asteroid
+    # Invariant: _vel_y is a float
     #
     # Attribute _direction: direction the Asteroid is moving in
     # Invariant: _direction is a list
@@ -182,7 +464,7 @@ class Asteroid(GImage):
 
         The x component can be an int or a float
         """
-        return self._velocity.x
+        return self._vel_x
 
     def getAstVel_y(self):
         """
@@ -190,13 +472,50 @@ class Asteroid(GImage):
 
         The y component can be an int or a float
         """
-        return self._velocity.y
+        return self._vel_y
 
     def getAstVel(self):
         """
-        Returns the Asteroid's velocity
+        Returns a copy of the Asteroid's velocity
+        """
+        return introcs.Vector2(self._vel_x, self._vel_y)
+
+    def setAstVel(self, vel_x, vel_y):
+        """
+        Sets the Asteroid's velocity
+
+        The velocity is scaled to the speed for the Asteroid's size, so only
+        its direction changes (asteroids bouncing off each other keep their
+        speed).
+
+        Parameter vel_x: x component of the new direction
+        Precondition: vel_x is an int or float
+
+        Parameter vel_y: y component of the new direction
+        Precondition: vel_y is an int or float
+        """
+        if vel_x != 0 or vel_y != 0:
+            self._vel_x, self._vel_y = scaled(vel_x, vel_y, self.getSpeed())
+
+    def getSpeed(self):
+        """
+        Returns the speed of the Asteroid, which depends on its size
+        """
+        if self._size == 'small':
+            return SMALL_SPEED
+        elif self._size == 'medium':
+            return MEDIUM_SPEED
+        return LARGE_SPEED
+
+    def getRadius(self):
+        """
+        Returns the collision radius of the Asteroid
         """
-        return self._velocity
+        if self._size == 'small':
+            return SMALL_RADIUS
+        elif self._size == 'medium':
+            return MEDIUM_RADIUS
+        return LARGE_RADIUS
 
     # INITIALIZER TO CREATE A NEW ASTEROID
     def __init__(self, x, y, size, width, height, direction, source):
@@ -237,23 +556,9 @@ class Asteroid(GImage):
         self._direction = direction
         self._source = source
 
-        # Initialize velocity: if no direction, set velocity to zero
-        if direction[0] == 0 and direction[1] == 0:
-            self._velocity = introcs.Vector2(0, 0)
-        else:
-            # Determine speed based on asteroid size
-            if size == 'small':
-                speed = SMALL_SPEED
-            elif size == 'medium':
-                speed = MEDIUM_SPEED
-            else:
-                speed = LARGE_SPEED
-
-            # Normalize direction vector and scale by speed
-            self._velocity = introcs.Vector2(direction[0], direction[1])
-            self._velocity = self._velocity.normalize()
-            self._velocity.x *= speed
-            self._velocity.y *= speed
+        # Normalize direction vector and scale by the speed for the size
+        # (no direction, no velocity)
+        self._vel_x, self._vel_y = scaled(direction[0], direction[1], self.getSpeed())
 
     # ADDITIONAL METHODS (MOVEMENT, COLLISIONS, ETC)
     def x_wrap(self):
@@ -289,35 +594,16 @@ class Asteroid(GImage):
         """
         Method to check whether the Asteroid collided with the object.
 
-        Calculates the distance between the Asteroid and object and compares it
-        to the sum of the radii of the Asteroid and object. If the distance is
-        smaller than the sum of the radii, then the collision occurred; this
-        returns True. Otherwise, returns False
+        Compares the squared distance between the Asteroid and object to the
+        square of the sum of their collision radii. If the distance is smaller,
+        then the collision occurred; this returns True. Otherwise, returns False
 
         Parameter object: object being checked whether it collided with the Asteroid
-        Precondition: object is a Ship or Bullet
+        Precondition: object is a Ship or Bullet (anything with getRadius)
         """
-        # Calculate the distance between the asteroid and the object
-        x_diff = self.x - object.x
-        y_diff = self.y - object.y
-        distance = math.sqrt(x_diff**2 + y_diff**2)
-
-        # Determine asteroid radius based on size
-        if self._size == 'small':
-            radius_ast = SMALL_RADIUS
-        elif self._size == 'medium':
-            radius_ast = MEDIUM_RADIUS
-        else:
-            radius_ast = LARGE_RADIUS
-
-        # Check for collision with Ship or Bullet
-        if isinstance(object, Ship):
-            return distance < (radius_ast + SHIP_RADIUS)
-        elif isinstance(object, Bullet):
-            return distance < (radius_ast + BULLET_RADIUS)
-
-        # Return False if no collision detected
-        return False
+        # Each object reports its own radius, so a shield needs no special case
+        return overlaps(self.x, self.y, object.x, object.y,
+                        self.getRadius() + object.getRadius())
 
 
 class UFO(GImage):
@@ -333,8 +619,11 @@ class UFO(GImage):
     # Attribute _y: y coordinate of the AlienUFO
     # Invariant: _y is an int or float
     #
-    # Attribute _velocity: velocity of the AlienUFO
-    # Invariant: _velocity is a Vector2 object
+    # Attribute _vel_x: x component of the velocity of the UFO
+    # Invariant: _vel_x is a float
+    #
+    # Attribute _vel_y: y component of the velocity of the UFO
+    # Invariant: _vel_y is a float
 
     def getUFOVel_x(self):
         """
@@ -342,7 +631,7 @@ class UFO(GImage):
 
         The x component can be an int or a float
         """
-        return self._velocity.x
+        return self._vel_x
 
     def getUFOVel_y(self):
         """
@@ -350,15 +639,15 @@ class UFO(GImage):
 
         The y component can be an int or a float
         """
-        return self._velocity.y
+        return self._vel_y
 
     def getUFOVel(self):
         """
-        Returns the UFO's velocity
+        Returns a copy of the UFO's velocity
 
         Velocity is a Vector2 object.
         """
-        return self._velocity
+        return introcs.Vector2(self._vel_x, self._vel_y)
 
     def getUFO_x(self):
         """
@@ -397,13 +686,8 @@ class UFO(GImage):
         x_dir = random.random()
         y_dir = random.random()
 
-        # Create a velocity vector and normalize it to get direction.
-        self._velocity = introcs.Vector2(x_dir, y_dir)
-        self._velocity = self._velocity.normalize()
-
-        # Scale the normalized vector by UFO speed.
-        self._velocity.x = self._velocity.x * UFO_SPEED
-        self._velocity.y = self._velocity.y * UFO_SPEED
+        # Normalize the direction and scale it by UFO speed.
+        self._vel_x, self._vel_y = scaled(x_dir, y_dir, UFO_SPEED)
 
     def x_wrap(self):
         """
@@ -464,19 +748,17 @@ class AlienUFO(UFO):
         x_dir = random.random()
         y_dir = random.random()
 
-        # Create and normalize a velocity vector.
-        self._velocity = introcs.Vector2(x_dir, y_dir)
-        self._velocity = self._velocity.normalize()
-
-        # Scale the normalized vector by UFO speed.
-        self._velocity.x = self._velocity.x * UFO_SPEED
-        self._velocity.y = self._velocity.y * UFO_SPEED
+        # Normalize the direction and scale it by UFO speed.
+        self._vel_x, self._vel_y = scaled(x_dir, y_dir, UFO_SPEED)
 
 class UFOLives(GEllipse):
     """
     A class to represent the objects that represent the UFO's lives.
+
+    These objects do not move on their own. They are attached to a SceneNode
+    for their UFO, which places them relative to the UFO when drawn.
     """
-    def __init__(self, x, y, vel_x, vel_y, fillcolor, width, height):
+    def __init__(self, x, y, fillcolor, width, height):
         """
         Initializes a new UFOLives object.
 
@@ -486,12 +768,6 @@ class UFOLives(GEllipse):
         Parameter y: the y coordinate of the UFOLives's starting position
         Precondition: y is an int or float
 
-        Parameter vel_x: the x component of the UFOLives's velocity
-        Precondition: vel_x is an int or float
-
-        Parameter vel_y: the y component of the UFOLives's velocity
-        Precondition: vel_y is an int or float
-
         Preconditon fillcolor: the color of the UFOLives
         Precondition: fillcolor is a string
 
@@ -504,31 +780,355 @@ class UFOLives(GEllipse):
         # Call the superclass initializer to set up the ellipse.
         super().__init__(x = x, y = y, fillcolor = fillcolor, width = width, height = height)
 
-        # Set the velocity using the provided components.
-        self._velocity = introcs.Vector2(vel_x, vel_y)
 
-    def x_wrap(self):
+class SceneNode(object):
+    """
+    A class to represent an object in a simple scene graph.
+
+    A node draws a game object. The root node of a graph is the object's own
+    position. Every child node is placed at a fixed offset from its parent,
+    and that position is only worked out when the graph is drawn. Attached
+    objects (like the UFO lives) therefore need no work at all in update, and
+    they always stay with their parent, even when the parent wraps around the
+    screen.
+    """
+    # Attribute _object: the object drawn at this node
+    # Invariant: _object is a GObject (any object with x, y and draw)
+    #
+    # Attribute _offset_x: x offset from the parent node
+    # Invariant: _offset_x is an int or float (ignored for a root node)
+    #
+    # Attribute _offset_y: y offset from the parent node
+    # Invariant: _offset_y is an int or float (ignored for a root node)
+    #
+    # Attribute _children: the nodes attached to this node
+    # Invariant: _children is a list of SceneNode objects
+
+    def getObject(self):
         """
-        Method to wrap the x component of the UFO so it stays onscreen.
+        Returns the object drawn at this node.
+        """
+        return self._object
 
-        When the UFO goes offscreen, it should be wrapped back around to the
-        other side. For example, when going offscreen to the left, it should
-        come back around on the right.
+    def getChildren(self):
         """
-        if self.x < -DEAD_ZONE:
-            self.x += GAME_WIDTH + 2 * DEAD_ZONE
-        elif self.x > GAME_WIDTH + DEAD_ZONE:
-            self.x -= GAME_WIDTH + 2 * DEAD_ZONE
+        Returns the list of nodes attached to this node.
+        """
+        return self._children
 
-    def y_wrap(self):
+    def __init__(self, object, offset_x=0, offset_y=0):
         """
-        Method to wrap the y component of the UFO so it stays onscreen.
+        Initializes a new SceneNode with no children.
 
-        When the UFO goes offscreen, it should be wrapped back around to the
-        other side. For example, when going offscreen to the top, it should come
-        back around on the bottom.
+        Parameter object: the object drawn at this node
+        Precondition: object is a GObject
+
+        Parameter offset_x: x offset from the parent node
+        Precondition: offset_x is an int or float
+
+        Parameter offset_y: y offset from the parent node
+        Precondition: offset_y is an int or float
         """
-        if self.y < -DEAD_ZONE:
-            self.y += GAME_HEIGHT + 2 * DEAD_ZONE
-        elif self.y > GAME_HEIGHT + DEAD_ZONE:
-            self.y -= GAME_HEIGHT + 2 * DEAD_ZONE
+        self._object = object
+        self._offset_x = offset_x
+        self._offset_y = offset_y
+        self._children = []
+
+    def attach(self, object, offset_x, offset_y):
+        """
+        Attaches an object to this node and returns the new child node.
+
+        Parameter object: the object to attach
+        Precondition: object is a GObject
+
+        Parameter offset_x: x offset from this node
+        Precondition: offset_x is an int or float
+
+        Parameter offset_y: y offset from this node
+        Precondition: offset_y is an int or float
+        """
+        child = SceneNode(object, offset_x, offset_y)
+        self._children.append(child)
+        return child
+
+    def detach(self, child=None):
+        """
+        Removes a child node from this node.
+
+        If child is None, the most recently attached child is removed. Nothing
+        happens if there are no children.
+
+        Parameter child: the node to remove
+        Precondition: child is a SceneNode attached to this node, or None
+        """
+        if child is None:
+            if len(self._children) > 0:
+                self._children.pop()
+        else:
+            self._children.remove(child)
+
+    def draw(self, view, children=True):
+        """
+        Draws this node and, relative to it, all of its children.
+
+        Parameter view: Reference to the window
+        Precondition: an instance of GView
+
+        Parameter children: whether to draw the children
+        Precondition: children is a boolean
+        """
+        self._object.draw(view)
+        if children:
+            self._draw_children(view, self._object.x, self._object.y)
+
+    def _draw_children(self, view, x, y):
+        """
+        Places and draws the children of a node at position (x, y).
+
+        Parameter view: Reference to the window
+        Precondition: an instance of GView
+
+        Parameter x: x coordinate of the node
+        Precondition: x is an int or float
+
+        Parameter y: y coordinate of the node
+        Precondition: y is an int or float
+        """
+        for child in self._children:
+            child_x = x + child._offset_x
+            child_y = y + child._offset_y
+            child._object.x = child_x
+            child._object.y = child_y
+            child._object.draw(view)
+            child._draw_children(view, child_x, child_y)
+
+
+class UFOFleet(object):
+    """
+    A class to represent all of the UFOs in a wave.
+
+    The UFO images are only used for drawing. The state that changes every
+    frame (positions, velocities and lives) is kept in numpy arrays, one row
+    per UFO, so the whole fleet is moved, wrapped and collision tested in a
+    single step no matter how many UFOs there are. The image positions are
+    copied from the arrays after each move.
+
+    UFOs can also wait to enter play. A UFO with a spawn frame in the future
+    is held in a pending list and only added to the arrays once that frame
+    is reached.
+    """
+    # Attribute _ufos: the UFOs currently in play
+    # Invariant: _ufos is a list of UFO objects, with _ufos[i] matching row i
+    #           of the arrays below
+    #
+    # Attribute _pos: positions of the UFOs in play
+    # Invariant: _pos is a float array of shape (len(_ufos), 2)
+    #
+    # Attribute _vel: velocities of the UFOs in play
+    # Invariant: _vel is a float array of shape (len(_ufos), 2)
+    #
+    # Attribute _lives: remaining lives of the UFOs in play
+    # Invariant: _lives is an int array of shape (len(_ufos),)
+    #
+    # Attribute _pending: UFOs that have not entered play yet
+    # Invariant: _pending is a list of [spawn, ufo, lives] lists sorted by
+    #           spawn frame
+
+    def getUFOs(self):
+        """
+        Returns the list of UFOs currently in play.
+        """
+        return self._ufos
+
+    def getUFO(self, i):
+        """
+        Returns the UFO in play at index i.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        return self._ufos[i]
+
+    def getVel_x(self, i):
+        """
+        Returns the x component of the velocity of the UFO at index i.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        return float(self._vel[i, 0])
+
+    def getVel_y(self, i):
+        """
+        Returns the y component of the velocity of the UFO at index i.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        return float(self._vel[i, 1])
+
+    def getLives(self, i):
+        """
+        Returns the remaining lives of the UFO at index i.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        return int(self._lives[i])
+
+    def getTotalLives(self):
+        """
+        Returns the lives left across the fleet, including pending UFOs.
+        """
+        pending = 0
+        for entry in self._pending:
+            pending += entry[2]
+        return int(self._lives.sum()) + pending
+
+    def size(self):
+        """
+        Returns the number of UFOs currently in play.
+        """
+        return len(self._ufos)
+
+    def isEmpty(self):
+        """
+        Returns True if there are no UFOs in play or waiting to spawn.
+        """
+        return len(self._ufos) == 0 and len(self._pending) == 0
+
+    def __init__(self):
+        """
+        Initializes an empty UFO fleet.
+        """
+        self._ufos = []
+        self._pos = np.zeros((0, 2))
+        self._vel = np.zeros((0, 2))
+        self._lives = np.zeros(0, dtype=int)
+        self._pending = []
+
+    def add(self, ufo, lives, spawn=0):
+        """
+        Adds a UFO to the fleet.
+
+        The UFO enters play at the first call to update on or after frame spawn.
+
+        Parameter ufo: the UFO to add
+        Precondition: ufo is a UFO object
+
+        Parameter lives: the number of lives the UFO starts with
+        Precondition: lives is an int > 0
+
+        Parameter spawn: the frame the UFO enters play
+        Precondition: spawn is an int >= 0
+        """
+        self._pending.append([spawn, ufo, lives])
+        self._pending.sort(key=lambda entry: entry[0])
+
+    def update(self, frame):
+        """
+        Moves every UFO in play by its velocity and wraps it around the screen.
+
+        UFOs whose spawn frame has been reached are added to play first. This
+        method returns the indices of the newly added UFOs, so the caller can
+        set up anything that belongs to them.
+
+        Parameter frame: the current frame number of the wave
+        Precondition: frame is an int >= 0
+        """
+        spawned = []
+        while len(self._pending) > 0 and self._pending[0][0] <= frame:
+            entry = self._pending.pop(0)
+            spawned.append(self._join(entry[1], entry[2]))
+
+        if len(self._ufos) == 0:
+            return spawned
+
+        # Move and wrap the whole fleet at once, with the kernel backend in use
+        kernels.current().move_wrap(self._pos, self._vel, (-DEAD_ZONE, -DEAD_ZONE),
+                                    (GAME_WIDTH + DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE))
+
+        # Copy the new positions to the images for drawing
+        for ufo, pos in zip(self._ufos, self._pos.tolist()):
+            ufo.x = pos[0]
+            ufo.y = pos[1]
+        return spawned
+
+    def shift(self, dx, dy):
+        """
+        Moves every UFO in play by the same amount (when the camera moves).
+
+        Parameter dx: the distance to move right
+        Precondition: dx is an int or float
+
+        Parameter dy: the distance to move up
+        Precondition: dy is an int or float
+        """
+        if len(self._ufos) == 0:
+            return
+        self._pos += (dx, dy)
+        for ufo, pos in zip(self._ufos, self._pos.tolist()):
+            ufo.x = pos[0]
+            ufo.y = pos[1]
+
+    def collide(self, x, y, radius):
+        """
+        Returns the index of a UFO in play that overlaps the given circle.
+
+        A UFO overlaps the circle if the distance between the centers is less
+        than the sum of the radii. Distances are compared squared, so no square
+        roots are taken. If no UFO overlaps the circle, this returns None.
+
+        Parameter x: x coordinate of the circle's center
+        Precondition: x is an int or float
+
+        Parameter y: y coordinate of the circle's center
+        Precondition: y is an int or float
+
+        Parameter radius: radius of the circle
+        Precondition: radius is an int or float >= 0
+        """
+        if len(self._ufos) == 0:
+            return None
+        return kernels.current().first_hit(self._pos, x, y, UFO_RADIUS + radius)
+
+    def hit(self, i):
+        """
+        Takes one life from the UFO at index i and returns its remaining lives.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        self._lives[i] -= 1
+        return int(self._lives[i])
+
+    def remove(self, i):
+        """
+        Removes the UFO at index i from play.
+
+        The UFOs after index i move down one index.
+
+        Parameter i: index of the UFO
+        Precondition: i is an int, 0 <= i < size()
+        """
+        del self._ufos[i]
+        self._pos = np.delete(self._pos, i, axis=0)
+        self._vel = np.delete(self._vel, i, axis=0)
+        self._lives = np.delete(self._lives, i)
+
+    def _join(self, ufo, lives):
+        """
+        Adds a UFO to the arrays and returns its index.
+
+        Parameter ufo: the UFO to add
+        Precondition: ufo is a UFO object
+
+        Parameter lives: the number of lives the UFO starts with
+        Precondition: lives is an int > 0
+        """
+        self._ufos.append(ufo)
+        self._pos = np.append(self._pos, [[ufo.x, ufo.y]], axis=0)
+        self._vel = np.append(self._vel,
+            [[ufo.getUFOVel_x(), ufo.getUFOVel_y()]], axis=0)
+        self._lives = np.append(self._lives, lives)
+        return len(self._ufos) - 1
@@ -0,0 +1,166 @@
+"""
+Particle module for Planetoids
+
+This module contains the debris particles shown when an asteroid is destroyed
+or a UFO is hit. All particles live in fixed-size numpy arrays (position,
+velocity, age and lifetime). New particles are written over the oldest ones
+in ring-buffer order, so memory never grows, and the whole system is moved,
+aged and wrapped in one array step per frame. Particles are drawn together as
+a single point mesh rather than one shape each.
+"""
+import numpy as np
+from consts import *
+import kernels
+
+# The color of debris particles, as RGBA values between 0 and 1
+PARTICLE_COLOR = (1.0, 0.85, 0.6, 1.0)
+
+
+class ParticleSystem(object):
+    """
+    A class to represent a fixed-capacity set of debris particles.
+    """
+    # Attribute _pos: positions of the particles
+    # Invariant: _pos is a float array of shape (capacity, 2)
+    #
+    # Attribute _vel: velocities of the particles
+    # Invariant: _vel is a float array of shape (capacity, 2)
+    #
+    # Attribute _age: frames since each particle was emitted
+    # Invariant: _age is a float array of shape (capacity,)
+    #
+    # Attribute _life: frames each particle lasts; a particle is alive while
+    #           its age is less than its life
+    # Invariant: _life is a float array of shape (capacity,); 0 for unused slots
+    #
+    # Attribute _next: the slot the next particle is written to
+    # Invariant: _next is an int, 0 <= _next < capacity
+    #
+    # Attribute _random: the random number generator for emission
+    # Invariant: _random is a numpy Generator
+    #
+    # Attribute _mesh: the Kivy mesh the particles are drawn with
+    # Invariant: _mesh is a Mesh, or None until the first draw
+    #
+    # Attribute _group: the Kivy instructions drawing _mesh
+    # Invariant: _group is an InstructionGroup, or None until the first draw
+
+    def getCapacity(self):
+        """
+        Returns the most particles that can be alive at once.
+        """
+        return len(self._age)
+
+    def getAlive(self):
+        """
+        Returns the number of particles currently alive.
+        """
+        return int(np.count_nonzero(self._age < self._life))
+
+    def __init__(self, capacity=PARTICLE_CAP, seed=None):
+        """
+        Initializes a particle system with no particles alive.
+
+        Parameter capacity: the most particles that can be alive at once
+        Precondition: capacity is an int > 0
+
+        Parameter seed: the seed for the random directions, or None
+        Precondition: seed is an int or None
+        """
+        self._pos = np.zeros((capacity, 2))
+        self._vel = np.zeros((capacity, 2))
+        self._age = np.zeros(capacity)
+        self._life = np.zeros(capacity)
+        self._next = 0
+        self._random = np.random.default_rng(seed)
+        self._mesh = None
+        self._group = None
+
+    def emit(self, x, y, count, speed, life=PARTICLE_LIFE):
+        """
+        Emits count particles from (x, y) in random directions.
+
+        Each particle gets a random speed up to speed. If the system is full,
+        the oldest particles are replaced.
+
+        Parameter x: x coordinate of the burst
+        Precondition: x is an int or float
+
+        Parameter y: y coordinate of the burst
+        Precondition: y is an int or float
+
+        Parameter count: the number of particles
+        Precondition: count is an int >= 0
+
+        Parameter speed: the largest particle speed
+        Precondition: speed is an int or float >= 0
+
+        Parameter life: the number of frames the particles last
+        Precondition: life is an int > 0
+        """
+        count = min(count, len(self._age))
+        slots = (self._next + np.arange(count)) % len(self._age)
+        self._next = (self._next + count) % len(self._age)
+
+        angle = self._random.uniform(0, 2 * np.pi, count)
+        size = self._random.uniform(0.2, 1.0, count) * speed
+        self._pos[slots, 0] = x
+        self._pos[slots, 1] = y
+        self._vel[slots, 0] = np.cos(angle) * size
+        self._vel[slots, 1] = np.sin(angle) * size
+        self._age[slots] = 0
+        self._life[slots] = life
+
+    def update(self, frames=1):
+        """
+        Moves, ages and wraps every particle by the given number of frames.
+
+        Dead particles are moved too; it is cheaper than picking out the live
+        ones, and they are never drawn.
+
+        Parameter frames: the number of frames to advance
+        Precondition: frames is an int >= 1
+        """
+        self._pos += self._vel * frames
+        self._age += frames
+        backend = kernels.current()
+        backend.wrap_array(self._pos[:, 0], -DEAD_ZONE, GAME_WIDTH + DEAD_ZONE)
+        backend.wrap_array(self._pos[:, 1], -DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE)
+
+    def shift(self, dx, dy):
+        """
+        Moves every particle by the same amount (when the camera moves).
+
+        Parameter dx: the distance to move right
+        Precondition: dx is an int or float
+
+        Parameter dy: the distance to move up
+        Precondition: dy is an int or float
+        """
+        self._pos += (dx, dy)
+
+    def draw(self, view):
+        """
+        Draws every live particle as one point mesh.
+
+        Parameter view: Reference to the window
+        Precondition: an instance of GView
+        """
+        alive = self._age < self._life
+        count = int(np.count_nonzero(alive))
+        if count == 0:
+            return
+
+        if self._group is None:
+            from kivy.graphics import Color, InstructionGroup, Mesh
+            self._mesh = Mesh(mode='points')
+            self._group = InstructionGroup()
+            self._group.add(Color(*PARTICLE_COLOR))
+            self._group.add(self._mesh)
+
+        # Mesh vertices are (x, y, u, v); the texture coordinates are unused
+        vertices = np.zeros((count, 4))
+        vertices[:, 0:2] = self._pos[alive]
+        self._mesh.vertices = vertices.ravel().tolist()
+        self._mesh.indices = list(range(count))
+        view.draw(self._group)
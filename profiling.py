@@ -0,0 +1,87 @@
+"""
+Profiling module for Planetoids
+
+This module contains a profiler that keeps a separate cProfile profile for
+each game state, so the cost of play can be told apart from the cost of the
+menus, loading and the pauses between lives. Call switch with the state
+whenever it may have changed; only the profile of the current state is
+collecting at any time.
+"""
+import cProfile
+import os
+import pstats
+from consts import *
+
+
+class StateProfiler(object):
+    """
+    A class to represent a profiler with one cProfile profile per game state.
+    """
+    # Attribute _profiles: the profile of each state seen so far
+    # Invariant: _profiles is a dict of STATE constants to cProfile.Profile
+    #
+    # Attribute _current: the state being profiled now
+    # Invariant: _current is a STATE constant, or None if profiling is paused
+
+    def getStates(self):
+        """
+        Returns the states that have a profile.
+        """
+        return list(self._profiles)
+
+    def __init__(self):
+        """
+        Initializes a profiler that is not collecting yet.
+        """
+        self._profiles = {}
+        self._current = None
+
+    def switch(self, state):
+        """
+        Collects into the profile of the given state from now on.
+
+        Parameter state: the current game state
+        Precondition: state is a STATE constant from consts.py, or None to pause
+        """
+        if state == self._current:
+            return
+        if self._current is not None:
+            self._profiles[self._current].disable()
+        self._current = state
+        if state is not None:
+            profile = self._profiles.get(state)
+            if profile is None:
+                profile = cProfile.Profile()
+                self._profiles[state] = profile
+            profile.enable()
+
+    def dump(self, path):
+        """
+        Stops collecting and writes the profiles as pstats files.
+
+        Every state gets its own file, named after the state (for a path of
+        'game.pstats' the active state goes to 'game.active.pstats'), and the
+        path itself gets all states together. Returns a list of
+        (state name, seconds, file) tuples, one per state.
+
+        Parameter path: the file for the combined profile
+        Precondition: path is a str
+        """
+        self.switch(None)
+        base, ext = os.path.splitext(path)
+        if ext == '':
+            ext = '.pstats'
+        result = []
+        combined = None
+        for state, profile in self._profiles.items():
+            name = STATE_NAMES.get(state, str(state))
+            stats = pstats.Stats(profile)
+            stats.dump_stats(base + '.' + name + ext)
+            result.append((name, stats.total_tt, base + '.' + name + ext))
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+        if combined is not None:
+            combined.dump_stats(path)
+        return result
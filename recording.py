@@ -0,0 +1,180 @@
+"""
+Recording module for Planetoids
+
+This module contains inputs that record and replay a game. Wave.update only
+asks its input which keys are down, so a Recorder can stand between Wave and
+another input (such as the Autopilot) and note the keys that were down each
+frame, and a Playback can later answer with exactly those keys.
+
+A recording also keeps the wave file and the random seed. Wave places UFOs
+and aims alien fire with the random module, so replaying a recording with
+the same seed on the same wave plays the same game.
+
+As with the Autopilot, call think once per frame before Wave.update.
+"""
+import json
+
+
+class Recorder(object):
+    """
+    A class to represent an input that records the keys another input holds.
+    """
+    # Attribute _input: the input being recorded
+    # Invariant: _input has methods is_key_down and is_key_pressed
+    #
+    # Attribute _frames: the keys down in each frame, as sorted lists of names
+    # Invariant: _frames is a list of lists of str
+    #
+    # Attribute _keys: the keys found down in the current frame
+    # Invariant: _keys is a set of str
+
+    def getFrames(self):
+        """
+        Returns the keys down in each recorded frame, as sorted lists of names.
+        """
+        return self._frames
+
+    def __init__(self, input):
+        """
+        Initializes a recorder for the given input.
+
+        Parameter input: the input to record
+        Precondition: input has methods is_key_down and is_key_pressed
+        """
+        self._input = input
+        self._frames = []
+        self._keys = set()
+
+    def think(self, wave):
+        """
+        Starts a new frame, letting the recorded input think first if it can.
+
+        Parameter wave: the wave being played
+        Precondition: wave is a Wave object
+        """
+        self._end_frame()
+        if hasattr(self._input, 'think'):
+            self._input.think(wave)
+
+    def is_key_down(self, key):
+        """
+        Returns True if the recorded input has the key down, noting it if so.
+
+        Parameter key: the key name
+        Precondition: key is a str
+        """
+        down = self._input.is_key_down(key)
+        if down:
+            self._keys.add(key)
+        return down
+
+    def is_key_pressed(self, key):
+        """
+        Returns True if the recorded input has just pressed the key.
+
+        Parameter key: the key name
+        Precondition: key is a str
+        """
+        return self._input.is_key_pressed(key)
+
+    def save(self, path, wave, seed):
+        """
+        Writes the recording to a JSON file.
+
+        Parameter path: the file to write
+        Precondition: path is a str
+
+        Parameter wave: the wave file that was played
+        Precondition: wave is a str
+
+        Parameter seed: the random seed the game was played with
+        Precondition: seed is an int
+        """
+        self._end_frame()
+        with open(path, 'w') as file:
+            json.dump({'wave': wave, 'seed': seed, 'frames': self._frames[1:]}, file)
+
+    def _end_frame(self):
+        """
+        Stores the keys of the current frame and starts a new one.
+        """
+        self._frames.append(sorted(self._keys))
+        self._keys = set()
+
+
+class Playback(object):
+    """
+    A class to represent an input that replays a recording.
+    """
+    # Attribute _wave: the wave file the recording was played on
+    # Invariant: _wave is a str
+    #
+    # Attribute _seed: the random seed the recording was played with
+    # Invariant: _seed is an int
+    #
+    # Attribute _frames: the keys down in each frame
+    # Invariant: _frames is a list of sets of str
+    #
+    # Attribute _frame: the index of the current frame, or -1 before the first
+    # Invariant: _frame is an int >= -1
+
+    def getWave(self):
+        """
+        Returns the wave file the recording was played on.
+        """
+        return self._wave
+
+    def getSeed(self):
+        """
+        Returns the random seed the recording was played with.
+        """
+        return self._seed
+
+    def __len__(self):
+        """
+        Returns the number of frames in the recording.
+        """
+        return len(self._frames)
+
+    def __init__(self, path):
+        """
+        Initializes a playback of the recording in the given JSON file.
+
+        Parameter path: the file to read
+        Precondition: path is a str naming a file written by Recorder.save
+        """
+        with open(path) as file:
+            data = json.load(file)
+        self._wave = data['wave']
+        self._seed = data['seed']
+        self._frames = [set(keys) for keys in data['frames']]
+        self._frame = -1
+
+    def think(self, wave):
+        """
+        Moves on to the next frame of the recording.
+
+        Parameter wave: the wave being played (unused)
+        Precondition: wave is a Wave object
+        """
+        self._frame += 1
+
+    def is_key_down(self, key):
+        """
+        Returns True if the key was down in the current frame of the recording.
+
+        Parameter key: the key name
+        Precondition: key is a str
+        """
+        if 0 <= self._frame < len(self._frames):
+            return key in self._frames[self._frame]
+        return False
+
+    def is_key_pressed(self, key):
+        """
+        Returns False; Wave only asks which keys are down.
+
+        Parameter key: the key name
+        Precondition: key is a str
+        """
+        return False
@@ -0,0 +1,773 @@
+"""
+Session server module for Planetoids
+
+This module contains a server that hosts many headless waves at once, for
+automated players. A client connects over a loopback TCP socket and gets a
+session of its own: a Wave played with no window and no sound. The client
+sends one byte whenever its keys change (the bits of duel.encode, held until
+the next byte) and gets the state of its wave after every tick.
+
+The sessions are sharded across worker processes. The main process only
+accepts connections, handing each socket to the next worker in turn. A
+worker runs one asyncio loop for all of its sessions. Every tick it plays one
+frame of each session, letting the loop serve the sockets after every
+SERVER_SLICE sessions, and then sends the states. The states of a tick are
+serialized as one batch, with a single numpy conversion for the objects of
+every session, and each client gets its slice of the batch in one write.
+
+A worker never waits for a client. A client with more than SERVER_BUFFER
+bytes of states still unsent skips states (each state is complete, so the
+next one it gets is up to date), and is dropped after SERVER_STALL ticks in a
+row. The time each session's frame took is sent with its state and kept in a
+histogram per session, and the workers report them when the server closes.
+
+A state message is STATE_HEADER, then the ship as STATE_SHIP float32 (x, y,
+x velocity, y velocity, facing x and facing y; all zero while the ship is
+destroyed), then STATE_OBJECT float32 for each asteroid and UFO, as in
+Wave.getThreats. When a wave is won or lost its last state has STATE_OVER
+set, and the connection is closed.
+"""
+import asyncio
+import random
+import signal
+import socket
+import struct
+import time
+import numpy as np
+from consts import *
+from duel import DUEL_KEYS
+from metrics import Histogram
+
+# The state header: frame, lives, flags, UFO lives, objects, frame time in microseconds
+STATE_HEADER = struct.Struct('<IBBHII')
+# The float32 values of the ship and of each asteroid or UFO in a state
+STATE_SHIP = 6
+STATE_OBJECT = 5
+# The state flags: the ship is in play, the wave is over
+STATE_ALIVE = 1
+STATE_OVER = 2
+
+
+def percentile(counts, share):
+    """
+    Returns the upper bound of the histogram bucket holding a percentile.
+
+    The result is infinity if the percentile is past the last bound, and
+    0 if the histogram is empty.
+
+    Parameter counts: the observations in each bucket, as from Histogram.getCounts
+    Precondition: counts is a list of len(METRICS_BUCKETS) + 1 ints >= 0
+
+    Parameter share: the percentile, as a share of the observations
+    Precondition: share is a float between 0 and 1
+    """
+    total = sum(counts)
+    seen = 0
+    for i in range(len(counts)):
+        seen += counts[i]
+        if total > 0 and seen >= share * total:
+            return METRICS_BUCKETS[i] if i < len(METRICS_BUCKETS) else float('inf')
+    return 0.0
+
+
+async def read_state(reader):
+    """
+    Returns the next state from the server, or None if the server closed.
+
+    The result is a tuple (header, ship, objects): the fields of STATE_HEADER,
+    the ship as a numpy array of STATE_SHIP floats, and the asteroids and UFOs
+    as an (n, STATE_OBJECT) numpy float array.
+
+    Parameter reader: the stream from the server
+    Precondition: reader is an asyncio.StreamReader
+    """
+    try:
+        header = STATE_HEADER.unpack(await reader.readexactly(STATE_HEADER.size))
+        body = await reader.readexactly(4 * (STATE_SHIP + STATE_OBJECT * header[4]))
+    except asyncio.IncompleteReadError:
+        return None
+    values = np.frombuffer(body, dtype='<f4')
+    return (header, values[:STATE_SHIP], values[STATE_SHIP:].reshape(-1, STATE_OBJECT))
+
+
+class KeyInput(object):
+    """
+    A class to represent the keys a client holds, as an input for Wave.update.
+    """
+    # Attribute _bits: the keys held, one bit each in the order of DUEL_KEYS
+    # Invariant: _bits is an int 0..255
+
+    def getBits(self):
+        """
+        Returns the keys held, as the bits of an int.
+        """
+        return self._bits
+
+    def setBits(self, bits):
+        """
+        Sets the keys held.
+
+        Parameter bits: the keys, one bit each in the order of DUEL_KEYS
+        Precondition: bits is an int 0..255
+        """
+        self._bits = bits
+
+    def __init__(self):
+        """
+        Initializes an input with no keys held.
+        """
+        self._bits = 0
+
+    def is_key_down(self, key):
+        """
+        Returns True if the client holds the key.
+
+        Parameter key: the name of the key
+        Precondition: key is a str
+        """
+        return key in DUEL_KEYS and self._bits & (1 << DUEL_KEYS.index(key)) != 0
+
+    def is_key_pressed(self, key):
+        """
+        Returns False; clients only hold keys.
+
+        Parameter key: the name of the key
+        Precondition: key is a str
+        """
+        return False
+
+
+class Session(object):
+    """
+    A class to represent one client's wave on the server.
+    """
+    # Attribute _id: the number of the session, unique across the workers
+    # Invariant: _id is an int >= 0
+    #
+    # Attribute _wave: the wave being played
+    # Invariant: _wave is a Wave
+    #
+    # Attribute _input: the keys the client holds
+    # Invariant: _input is a KeyInput
+    #
+    # Attribute _writer: the stream to the client
+    # Invariant: _writer is an asyncio.StreamWriter
+    #
+    # Attribute _frame: the number of frames played
+    # Invariant: _frame is an int >= 0
+    #
+    # Attribute _last: the time the last frame took, in seconds
+    # Invariant: _last is a float >= 0
+    #
+    # Attribute _slowest: the time the slowest frame took, in seconds
+    # Invariant: _slowest is a float >= 0
+    #
+    # Attribute _latency: the time each frame took
+    # Invariant: _latency is a Histogram
+    #
+    # Attribute _skipped: the number of states not sent because the client was behind
+    # Invariant: _skipped is an int >= 0
+    #
+    # Attribute _stalled: the number of ticks in a row the client has been behind
+    # Invariant: _stalled is an int >= 0
+    #
+    # Attribute _over: whether the wave has been won or lost
+    # Invariant: _over is a bool
+    #
+    # Attribute _closed: whether the connection has been closed
+    # Invariant: _closed is a bool
+
+    def getId(self):
+        """
+        Returns the number of the session.
+        """
+        return self._id
+
+    def getWave(self):
+        """
+        Returns the wave being played.
+        """
+        return self._wave
+
+    def getInput(self):
+        """
+        Returns the keys the client holds.
+        """
+        return self._input
+
+    def getFrame(self):
+        """
+        Returns the number of frames played.
+        """
+        return self._frame
+
+    def getLast(self):
+        """
+        Returns the time the last frame took, in seconds.
+        """
+        return self._last
+
+    def getLatency(self):
+        """
+        Returns the histogram of the time each frame took.
+        """
+        return self._latency
+
+    def isOver(self):
+        """
+        Returns True if the wave has been won or lost.
+        """
+        return self._over
+
+    def isClosed(self):
+        """
+        Returns True if the connection has been closed.
+        """
+        return self._closed
+
+    def __init__(self, id, wave, writer):
+        """
+        Initializes a session on a new wave.
+
+        Parameter id: the number of the session
+        Precondition: id is an int >= 0
+
+        Parameter wave: the wave to play
+        Precondition: wave is a Wave
+
+        Parameter writer: the stream to the client
+        Precondition: writer is an asyncio.StreamWriter
+        """
+        self._id = id
+        self._wave = wave
+        self._input = KeyInput()
+        self._writer = writer
+        self._frame = 0
+        self._last = 0.0
+        self._slowest = 0.0
+        self._latency = Histogram()
+        self._skipped = 0
+        self._stalled = 0
+        self._over = False
+        self._closed = False
+
+    def tick(self):
+        """
+        Plays one frame of the wave and returns the time it took.
+
+        As in autopilot.soak, the ship respawns as soon as it is destroyed,
+        until the player runs out of lives.
+        """
+        start = time.perf_counter()
+        wave = self._wave
+        wave.update(self._input, FRAME_BUDGET, False)
+        if not wave.checkAsteroids() and not wave.checkUFO():
+            self._over = True
+        elif not wave.checkShip():
+            if wave.getLives() < 1:
+                self._over = True
+            else:
+                wave.respawn()
+        self._frame += 1
+        self._last = time.perf_counter() - start
+        self._slowest = max(self._slowest, self._last)
+        self._latency.observe(self._last)
+        return self._last
+
+    def ready(self):
+        """
+        Returns True if a state can be sent to the client this tick.
+
+        A client is behind if more than SERVER_BUFFER bytes are waiting to
+        go to it; its state is skipped, and after SERVER_STALL ticks in a row
+        the connection is closed.
+        """
+        if self._writer.transport.get_write_buffer_size() <= SERVER_BUFFER:
+            self._stalled = 0
+            return True
+        self._skipped += 1
+        self._stalled += 1
+        if self._stalled > SERVER_STALL:
+            self.close(True)
+        return False
+
+    def header(self, count):
+        """
+        Returns the state header for this frame.
+
+        Parameter count: the number of asteroids and UFOs in the state
+        Precondition: count is an int >= 0
+        """
+        flags = 0
+        if not self._wave.getShip() is None:
+            flags |= STATE_ALIVE
+        if self._over:
+            flags |= STATE_OVER
+        return STATE_HEADER.pack(self._frame, max(0, self._wave.getLives()), flags,
+                                 self._wave.getUFOLives(), count,
+                                 min(int(self._last * 1e6), 0xFFFFFFFF))
+
+    def send(self, parts):
+        """
+        Sends a state to the client, without waiting.
+
+        Parameter parts: the pieces of the state message
+        Precondition: parts is a list of bytes-like objects
+        """
+        self._writer.writelines(parts)
+
+    def close(self, abort=False):
+        """
+        Closes the connection, sending whatever is waiting first unless aborting.
+
+        Parameter abort: whether to drop what is waiting
+        Precondition: abort is a bool
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if abort:
+            self._writer.transport.abort()
+        else:
+            self._writer.close()
+
+    def report(self):
+        """
+        Returns the figures of the session as a tuple.
+
+        The tuple is (id, frames, mean frame time, slowest frame time, states
+        skipped, whether the wave is over, whether the client was dropped for
+        being behind), with times in seconds.
+        """
+        mean = self._latency.getSum() / self._frame if self._frame > 0 else 0.0
+        return (self._id, self._frame, mean, self._slowest, self._skipped, self._over,
+                self._stalled > SERVER_STALL)
+
+
+class Shard(object):
+    """
+    A class to represent the sessions of one worker process.
+
+    Call run with the connection to the main process; it serves sessions
+    until the main process says to stop.
+    """
+    # Attribute _data: the wave data every session starts from
+    # Invariant: _data is a dict in the wave JSON format
+    #
+    # Attribute _rate: the ticks per second, or 0 to tick as fast as possible
+    # Invariant: _rate is a number >= 0
+    #
+    # Attribute _sessions: the open sessions, by id
+    # Invariant: _sessions is a dict of int to Session
+    #
+    # Attribute _finished: the reports of the sessions that have closed
+    # Invariant: _finished is a list of tuples, as from Session.report
+    #
+    # Attribute _latency: the time every frame of every session took
+    # Invariant: _latency is a Histogram
+    #
+    # Attribute _ticks: the number of ticks
+    # Invariant: _ticks is an int >= 0
+    #
+    # Attribute _late: the number of ticks that ran past their time
+    # Invariant: _late is an int >= 0
+    #
+    # Attribute _sent: the number of states sent
+    # Invariant: _sent is an int >= 0
+    #
+    # Attribute _bytes: the number of bytes of states sent
+    # Invariant: _bytes is an int >= 0
+    #
+    # Attribute _running: whether the sessions are being ticked
+    # Invariant: _running is a bool
+
+    def __init__(self, data, rate):
+        """
+        Initializes a worker with no sessions.
+
+        Parameter data: the wave data every session starts from
+        Precondition: data is a dict in the wave JSON format
+
+        Parameter rate: the ticks per second, or 0 to tick as fast as possible
+        Precondition: rate is a number >= 0
+        """
+        self._data = data
+        self._rate = rate
+        self._sessions = {}
+        self._finished = []
+        self._latency = Histogram()
+        self._ticks = 0
+        self._late = 0
+        self._sent = 0
+        self._bytes = 0
+        self._running = False
+
+    async def run(self, pipe):
+        """
+        Serves sessions until the main process sends ('stop',), then sends
+        it the report of this worker.
+
+        The main process sends ('session', id, socket) for each new client.
+
+        Parameter pipe: the connection to the main process
+        Precondition: pipe is a multiprocessing.connection.Connection
+        """
+        loop = asyncio.get_running_loop()
+        self._running = True
+        ticker = asyncio.create_task(self._play())
+        clients = set()
+        while True:
+            message = await loop.run_in_executor(None, pipe.recv)
+            if message[0] == 'stop':
+                break
+            task = asyncio.create_task(self._serve(message[1], message[2]))
+            clients.add(task)
+            task.add_done_callback(clients.discard)
+
+        self._running = False
+        await ticker
+        for session in list(self._sessions.values()):
+            self._close(session)
+        await asyncio.gather(*clients, return_exceptions=True)
+        pipe.send(self.report())
+
+    def report(self):
+        """
+        Returns the figures of this worker as a dict.
+
+        The keys are 'sessions' (a list of Session.report tuples, one per
+        session served), 'latency' (the histogram counts of every frame
+        time), 'ticks', 'late', 'sent' and 'bytes'.
+        """
+        return {'sessions': self._finished, 'latency': self._latency.getCounts(),
+                'ticks': self._ticks, 'late': self._late, 'sent': self._sent,
+                'bytes': self._bytes}
+
+    # HELPER METHODS
+    async def _serve(self, id, sock):
+        """
+        Runs the session of one client, reading its keys until it disconnects.
+
+        Parameter id: the number of the session
+        Precondition: id is an int >= 0
+
+        Parameter sock: the connected socket
+        Precondition: sock is a socket.socket
+        """
+        from wave import Wave
+        reader, writer = await asyncio.open_connection(sock=sock)
+        session = Session(id, Wave(self._data), writer)
+        self._sessions[id] = session
+        try:
+            while not session.isClosed():
+                data = await reader.read(SERVER_READ)
+                if len(data) == 0:
+                    break
+                # Only the keys held now matter
+                session.getInput().setBits(data[-1])
+        except ConnectionError:
+            pass
+        finally:
+            self._close(session)
+
+    async def _play(self):
+        """
+        Ticks every session until told to stop.
+
+        Each tick plays one frame of every session and then sends the states.
+        A tick that runs past its time is counted as late, and the next one
+        starts at once instead of trying to catch up.
+        """
+        loop = asyncio.get_running_loop()
+        period = 1 / self._rate if self._rate > 0 else 0.0
+        due = loop.time()
+        while self._running:
+            sessions = list(self._sessions.values())
+            for i in range(len(sessions)):
+                if not sessions[i].isClosed():
+                    self._latency.observe(sessions[i].tick())
+                if (i + 1) % SERVER_SLICE == 0:
+                    await asyncio.sleep(0)
+            self._publish(sessions)
+            self._ticks += 1
+
+            due += period
+            delay = due - loop.time()
+            if delay < 0:
+                if period > 0:
+                    self._late += 1
+                due = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def _publish(self, sessions):
+        """
+        Sends the state of every session whose client is keeping up.
+
+        The objects of every state are converted to float32 in one batch, and
+        each client is sent its slice of the batch.
+
+        Parameter sessions: the sessions ticked
+        Precondition: sessions is a list of Session
+        """
+        ready = [session for session in sessions
+                 if not session.isClosed() and session.ready()]
+        if len(ready) == 0:
+            return
+
+        objects = [session.getWave().getThreats() for session in ready]
+        ships = np.zeros((len(ready), STATE_SHIP))
+        for i in range(len(ready)):
+            ship = ready[i].getWave().getShip()
+            if not ship is None:
+                ships[i] = (ship.x, ship.y, ship.getShipVel_x(), ship.getShipVel_y(),
+                            ship.getFacing_x(), ship.getFacing_y())
+        ships = memoryview(ships.astype('<f4').tobytes())
+        batch = memoryview(np.concatenate(objects).astype('<f4').tobytes())
+
+        start = 0
+        for i in range(len(ready)):
+            session = ready[i]
+            stop = start + 4 * STATE_OBJECT * len(objects[i])
+            parts = [session.header(len(objects[i])),
+                     ships[4 * STATE_SHIP * i:4 * STATE_SHIP * (i + 1)], batch[start:stop]]
+            session.send(parts)
+            self._sent += 1
+            self._bytes += STATE_HEADER.size + 4 * STATE_SHIP + stop - start
+            start = stop
+            if session.isOver():
+                self._close(session)
+
+    def _close(self, session):
+        """
+        Closes a session and keeps its report.
+
+        Parameter session: the session
+        Precondition: session is a Session of this worker
+        """
+        session.close()
+        if session.getId() in self._sessions:
+            del self._sessions[session.getId()]
+            self._finished.append(session.report())
+
+
+def _work(pipe, data, rate, seed):
+    """
+    Runs a worker of a SessionServer until told to stop.
+
+    Parameter pipe: the connection to the main process
+    Precondition: pipe is a multiprocessing.connection.Connection
+
+    Parameter data: the wave data every session starts from
+    Precondition: data is a dict in the wave JSON format
+
+    Parameter rate: the ticks per second, or 0 to tick as fast as possible
+    Precondition: rate is a number >= 0
+
+    Parameter seed: the random seed for the waves of this worker
+    Precondition: seed is an int
+    """
+    # The main process is interrupted for the workers, and then stops them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    random.seed(seed)
+    asyncio.run(Shard(data, rate).run(pipe))
+
+
+class SessionServer(object):
+    """
+    A class to represent the server, as seen from the main process.
+
+    Call serve to accept clients, and close when done to stop the workers
+    and get their reports.
+    """
+    # Attribute _listener: the listening socket
+    # Invariant: _listener is a socket.socket with a timeout
+    #
+    # Attribute _workers: the worker processes
+    # Invariant: _workers is a list of multiprocessing.Process
+    #
+    # Attribute _pipes: the connection to each worker
+    # Invariant: _pipes is a list of multiprocessing.connection.Connection
+    #
+    # Attribute _accepted: the number of clients accepted
+    # Invariant: _accepted is an int >= 0
+
+    def getAddress(self):
+        """
+        Returns the address clients connect to, as (host, port).
+        """
+        return self._listener.getsockname()[:2]
+
+    def getAccepted(self):
+        """
+        Returns the number of clients accepted.
+        """
+        return self._accepted
+
+    def __init__(self, data, workers=1, rate=60, host=SERVER_HOST, port=SERVER_PORT, seed=0):
+        """
+        Initializes the server, listening and starting the workers.
+
+        Parameter data: the wave data every session starts from
+        Precondition: data is a dict in the wave JSON format
+
+        Parameter workers: the number of worker processes
+        Precondition: workers is an int > 0
+
+        Parameter rate: the ticks per second, or 0 to tick as fast as possible
+        Precondition: rate is a number >= 0
+
+        Parameter host: the address to listen on
+        Precondition: host is a str naming a loopback address
+
+        Parameter port: the port to listen on, or 0 for any free port
+        Precondition: port is an int >= 0
+
+        Parameter seed: the random seed (each worker adds its number)
+        Precondition: seed is an int
+        """
+        import multiprocessing
+        self._listener = socket.create_server((host, port))
+        self._listener.settimeout(0.1)
+        self._workers = []
+        self._pipes = []
+        self._accepted = 0
+        for shard in range(workers):
+            mine, theirs = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_work, daemon=True,
+                                             args=(theirs, data, rate, seed + shard))
+            worker.start()
+            theirs.close()
+            self._workers.append(worker)
+            self._pipes.append(mine)
+
+    def serve(self, seconds=None):
+        """
+        Accepts clients for a time, giving each to the next worker in turn.
+
+        Parameter seconds: how long to accept clients, or None for ever
+        Precondition: seconds is a number >= 0 or None
+        """
+        end = None if seconds is None else time.monotonic() + seconds
+        while end is None or time.monotonic() < end:
+            try:
+                client, address = self._listener.accept()
+            except socket.timeout:
+                continue
+            # A small kernel buffer, so a slow client shows in the write buffer
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SERVER_BUFFER)
+            self._pipes[self._accepted % len(self._pipes)].send(
+                ('session', self._accepted, client))
+            client.close()
+            self._accepted += 1
+
+    def close(self):
+        """
+        Stops the workers and returns their reports, as from Shard.report.
+        """
+        for pipe in self._pipes:
+            pipe.send(('stop',))
+        reports = [pipe.recv() for pipe in self._pipes]
+        for pipe in self._pipes:
+            pipe.close()
+        for worker in self._workers:
+            worker.join()
+        self._pipes = []
+        self._workers = []
+        self._listener.close()
+        return reports
+
+
+async def bot(host, port, seed, slow=False):
+    """
+    Plays a session with random keys until cancelled or the wave is over,
+    and returns (states, bytes, whether the wave ended).
+
+    A slow bot only reads BOT_SLOW_READ bytes every BOT_SLOW seconds, to
+    test how the server copes with a client that cannot keep up.
+
+    Parameter host: the server address
+    Precondition: host is a str
+
+    Parameter port: the server port
+    Precondition: port is an int > 0
+
+    Parameter seed: the random seed for the keys
+    Precondition: seed is an int
+
+    Parameter slow: whether the bot reads slowly
+    Precondition: slow is a bool
+    """
+    rng = random.Random(seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if slow:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BOT_SLOW_READ)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    states = 0
+    size = 0
+    over = False
+    try:
+        while True:
+            if slow:
+                data = await reader.read(BOT_SLOW_READ)
+                if len(data) == 0:
+                    break
+                size += len(data)
+                await asyncio.sleep(BOT_SLOW)
+                continue
+            state = await read_state(reader)
+            if state is None:
+                break
+            states += 1
+            size += STATE_HEADER.size + 4 * (STATE_SHIP + STATE_OBJECT * len(state[2]))
+            if state[0][2] & STATE_OVER:
+                over = True
+                break
+            if rng.random() < BOT_CHANGE:
+                writer.write(bytes([rng.randrange(1 << len(DUEL_KEYS))]))
+    except (asyncio.CancelledError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+    return (states, size, over)
+
+
+def run_bots(address, count, slow, seconds, seed, pipe):
+    """
+    Runs bots against a server for a time and sends their results down a pipe.
+
+    The result is a list of (states, bytes, whether the wave ended) tuples,
+    one per bot, as from bot.
+
+    Parameter address: the server address, as (host, port)
+    Precondition: address is a tuple of a str and an int
+
+    Parameter count: the number of bots
+    Precondition: count is an int > 0
+
+    Parameter slow: the number of those bots that read slowly
+    Precondition: slow is an int, 0 <= slow <= count
+
+    Parameter seconds: how long the bots play
+    Precondition: seconds is a number > 0
+
+    Parameter seed: the random seed
+    Precondition: seed is an int
+
+    Parameter pipe: the connection to send the results down
+    Precondition: pipe is a multiprocessing.connection.Connection
+    """
+    async def play():
+        tasks = [asyncio.create_task(bot(address[0], address[1], seed + i, i < slow))
+                 for i in range(count)]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(play())
+    pipe.send([result for result in results if isinstance(result, tuple)])
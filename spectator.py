@@ -0,0 +1,546 @@
+"""
+Spectator module for Planetoids
+
+This module contains an encoder that turns a Wave into a stream of small
+messages for spectators, and a decoder that rebuilds the view from them.
+
+Every object in play gets an id the first time it is seen. A spectator does
+not get positions each frame. It gets each object's position and velocity at
+some frame, in steps of 1/SPECTATOR_SCALE pixel, and moves it on from there
+itself. Asteroids and bullets keep their velocity, so once sent they need
+nothing more until they are destroyed. The encoder checks where the spectator
+thinks each object is, and sends a correction when that is more than
+SPECTATOR_ERROR pixels off (after a bounce or a wrap around the screen, or
+every few frames while the ship is steering), or when the ship turns.
+
+Each message is a diff against a frame the spectator has acknowledged: the
+objects spawned since then (with their kind), the ids removed, the objects
+corrected (as small differences from where the spectator has them), and the
+lives if they changed. Numbers are zigzag varints, so small differences take
+one byte. A spectator that has acknowledged nothing, or nothing in the last
+SPECTATOR_HISTORY frames, gets a full state.
+
+In a large world, positions are sent in world coordinates (the screen
+position plus the camera, without wrapping around the world), and the camera
+is an object of its own, of kind VIEW_CAMERA. Moving the camera then only
+corrects the camera, not everything on the screen.
+"""
+import struct
+from consts import *
+
+# The kinds of object in a view
+VIEW_SHIP, VIEW_SHIELDED, VIEW_SMALL, VIEW_MEDIUM, VIEW_LARGE = range(5)
+VIEW_UFO, VIEW_ALIEN, VIEW_BULLET, VIEW_ALIEN_BULLET, VIEW_CAMERA = range(5, 10)
+# The name of each kind
+VIEW_NAMES = ('ship', 'shielded ship', 'small asteroid', 'medium asteroid',
+              'large asteroid', 'UFO', 'alien UFO', 'bullet', 'alien bullet', 'camera')
+
+# The length put before each message and acknowledgement on a stream
+STREAM_LENGTH = struct.Struct('<I')
+
+# The message header: frame, baseline frame (VIEW_NONE for a full state), flags
+MESSAGE_HEADER = struct.Struct('<IIB')
+# The baseline of a full state
+VIEW_NONE = 0xFFFFFFFF
+# The header flags: the message has the lives, the message has the UFO lives
+FLAG_LIVES = 1
+FLAG_UFO_LIVES = 2
+# The record flags of a corrected object: motion, heading, kind
+CHANGE_MOTION = 1
+CHANGE_HEADING = 2
+CHANGE_KIND = 4
+
+# The fields of an object record: kind, x, y, x velocity, y velocity, the
+# frame the position is from, and heading (in steps and degrees)
+RECORD_KIND, RECORD_X, RECORD_Y, RECORD_VX, RECORD_VY, RECORD_FRAME, RECORD_HEADING = range(7)
+
+
+def position(record, frame):
+    """
+    Returns where an object is at a frame, as (x, y) in steps.
+
+    Parameter record: the object record
+    Precondition: record is a tuple with the RECORD_ fields
+
+    Parameter frame: the frame
+    Precondition: frame is an int >= 0
+    """
+    age = frame - record[RECORD_FRAME]
+    return (record[RECORD_X] + record[RECORD_VX] * age,
+            record[RECORD_Y] + record[RECORD_VY] * age)
+
+
+def _put(buffer, value):
+    """
+    Adds a signed int to a buffer as a zigzag varint.
+
+    Parameter buffer: the buffer
+    Precondition: buffer is a bytearray
+
+    Parameter value: the value
+    Precondition: value is an int
+    """
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _get(data, pos):
+    """
+    Returns the zigzag varint at pos in data and the position after it.
+
+    Parameter data: the message
+    Precondition: data is a bytes-like object
+
+    Parameter pos: where the varint starts
+    Precondition: pos is an int >= 0
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return ((value >> 1) ^ -(value & 1), pos)
+
+
+def send(sock, data):
+    """
+    Sends a message or acknowledgement down a stream socket.
+
+    Parameter sock: the socket
+    Precondition: sock is a connected, blocking stream socket.socket
+
+    Parameter data: the message
+    Precondition: data is a bytes-like object
+    """
+    sock.sendall(STREAM_LENGTH.pack(len(data)) + data)
+
+
+def receive(sock):
+    """
+    Returns the next message or acknowledgement from a stream socket, or None
+    if the other end has closed.
+
+    Parameter sock: the socket
+    Precondition: sock is a connected, blocking stream socket.socket
+    """
+    header = _read(sock, STREAM_LENGTH.size)
+    if header is None:
+        return None
+    return _read(sock, STREAM_LENGTH.unpack(header)[0])
+
+
+def _read(sock, size):
+    """
+    Returns exactly size bytes from a stream socket, or None if it closes first.
+
+    Parameter sock: the socket
+    Precondition: sock is a connected, blocking stream socket.socket
+
+    Parameter size: the number of bytes
+    Precondition: size is an int >= 0
+    """
+    data = bytearray()
+    while len(data) < size:
+        part = sock.recv(size - len(data))
+        if len(part) == 0:
+            return None
+        data += part
+    return bytes(data)
+
+
+class StateEncoder(object):
+    """
+    A class to represent the encoder of a wave's spectator stream.
+
+    Call capture once per frame after Wave.update, and then encode for each
+    spectator with the last frame it acknowledged. One encoder serves any
+    number of spectators.
+    """
+    # Attribute _frame: the number of the last frame captured
+    # Invariant: _frame is an int >= -1
+    #
+    # Attribute _ids: the id and object of everything in play last frame, by id(object)
+    # Invariant: _ids is a dict of int to (int, object)
+    #
+    # Attribute _next: the id for the next new object
+    # Invariant: _next is an int >= 0
+    #
+    # Attribute _history: the records and lives of each recent frame
+    # Invariant: _history is a dict of frame to (dict of id to record, lives, UFO lives),
+    # for the last SPECTATOR_HISTORY frames
+    #
+    # Attribute _error: the largest distance a spectator's view was from the wave
+    # Invariant: _error is a float >= 0
+
+    def getFrame(self):
+        """
+        Returns the number of the last frame captured, or -1 if none has been.
+        """
+        return self._frame
+
+    def getError(self):
+        """
+        Returns the largest distance, in pixels, that a spectator's view of an
+        object has been from the wave.
+        """
+        return self._error
+
+    def __init__(self):
+        """
+        Initializes an encoder that has captured no frames.
+        """
+        self._frame = -1
+        self._ids = {}
+        self._next = 0
+        self._history = {}
+        self._error = 0.0
+
+    def capture(self, wave):
+        """
+        Captures the next frame of a wave and returns its number.
+
+        Parameter wave: the wave
+        Precondition: wave is a Wave
+        """
+        self._frame += 1
+        frame = self._frame
+        last = self._history.get(frame - 1, ({}, 0, 0))[0]
+        limit = SPECTATOR_ERROR * SPECTATOR_SCALE
+        ids = {}
+        records = {}
+        for kind, object, x, y, vel_x, vel_y, heading in self._objects(wave):
+            entry = self._ids.get(id(object))
+            if entry is None or not entry[1] is object:
+                entry = (self._next, object)
+                self._next += 1
+            ids[id(object)] = entry
+            x = round(x * SPECTATOR_SCALE)
+            y = round(y * SPECTATOR_SCALE)
+            motion = (x, y, round(vel_x * SPECTATOR_SCALE), round(vel_y * SPECTATOR_SCALE), frame)
+
+            record = last.get(entry[0])
+            if record is None:
+                record = (kind,) + motion + (heading,)
+            else:
+                seen_x, seen_y = position(record, frame)
+                error = max(abs(x - seen_x), abs(y - seen_y))
+                if error > limit:
+                    record = (kind,) + motion + (heading,)
+                else:
+                    self._error = max(self._error, error / SPECTATOR_SCALE)
+                    if record[RECORD_KIND] != kind or record[RECORD_HEADING] != heading:
+                        record = (kind,) + record[RECORD_X:RECORD_HEADING] + (heading,)
+            records[entry[0]] = record
+
+        self._ids = ids
+        self._history[frame] = (records, max(0, wave.getLives()), wave.getUFOLives())
+        self._history.pop(frame - SPECTATOR_HISTORY, None)
+        return frame
+
+    def encode(self, acked=None):
+        """
+        Returns the message for the last frame captured, as a diff against
+        the frame the spectator acknowledged.
+
+        The message is a full state if acked is None or too old to diff against.
+
+        Parameter acked: the last frame the spectator acknowledged, or None
+        Precondition: acked is an int <= getFrame() or None
+        """
+        records, lives, ufo_lives = self._history[self._frame]
+        if acked is None or not acked in self._history:
+            base, base_lives, base_ufo = ({}, None, None)
+            acked = VIEW_NONE
+        else:
+            base, base_lives, base_ufo = self._history[acked]
+
+        flags = 0
+        body = bytearray()
+        if lives != base_lives:
+            flags |= FLAG_LIVES
+            _put(body, lives)
+        if ufo_lives != base_ufo:
+            flags |= FLAG_UFO_LIVES
+            _put(body, ufo_lives)
+
+        spawned = bytearray()
+        changed = bytearray()
+        spawns = 0
+        changes = 0
+        for id, record in records.items():
+            old = base.get(id)
+            if old is None:
+                spawns += 1
+                _put(spawned, id)
+                spawned.append(record[RECORD_KIND])
+                for value in record[RECORD_X:RECORD_FRAME]:
+                    _put(spawned, value)
+                _put(spawned, self._frame - record[RECORD_FRAME])
+                _put(spawned, record[RECORD_HEADING])
+            elif old != record:
+                changes += 1
+                self._change(changed, id, old, record)
+        removed = [id for id in base if not id in records]
+
+        _put(body, spawns)
+        _put(body, changes)
+        _put(body, len(removed))
+        body += spawned
+        body += changed
+        last = 0
+        for id in sorted(removed):
+            _put(body, id - last)
+            last = id
+        return MESSAGE_HEADER.pack(self._frame, acked, flags) + bytes(body)
+
+    def view(self, frame=None):
+        """
+        Returns what a spectator sees at a frame, as from StateDecoder.getView.
+
+        Parameter frame: the frame, or None for the last frame captured
+        Precondition: frame is None or an int in the last SPECTATOR_HISTORY frames
+        """
+        if frame is None:
+            frame = self._frame
+        return _view(self._history[frame][0], frame)
+
+    # HELPER METHODS
+    def _objects(self, wave):
+        """
+        Returns everything in play in a wave, as a list of tuples (kind,
+        object, x, y, x velocity, y velocity, heading).
+
+        In a large world the positions are in world coordinates, and the
+        camera is included, as the world object.
+
+        Parameter wave: the wave
+        Precondition: wave is a Wave
+        """
+        from models import AlienUFO
+        sizes = {SMALL_ASTEROID: VIEW_SMALL, MEDIUM_ASTEROID: VIEW_MEDIUM,
+                 LARGE_ASTEROID: VIEW_LARGE}
+        ship = wave.getShip()
+        world = wave.getWorld()
+        left, bottom = (0, 0) if world is None else world.getCamera()
+
+        result = []
+        if not world is None:
+            # The camera keeps up with the ship
+            if ship is None:
+                result.append((VIEW_CAMERA, world, left, bottom, 0, 0, 0))
+            else:
+                result.append((VIEW_CAMERA, world, left, bottom, ship.getShipVel_x(),
+                               ship.getShipVel_y(), 0))
+        if not ship is None:
+            kind = VIEW_SHIELDED if ship.isShielded() else VIEW_SHIP
+            result.append((kind, ship, ship.x + left, ship.y + bottom, ship.getShipVel_x(),
+                           ship.getShipVel_y(), int(round(ship.angle)) % 360))
+        for asteroid in wave.getAsteroids():
+            result.append((sizes[asteroid.getSize()], asteroid, asteroid.x + left,
+                           asteroid.y + bottom, asteroid.getAstVel_x(),
+                           asteroid.getAstVel_y(), 0))
+        for ufo in wave.getUFOs():
+            kind = VIEW_ALIEN if isinstance(ufo, AlienUFO) else VIEW_UFO
+            result.append((kind, ufo, ufo.x + left, ufo.y + bottom, ufo.getUFOVel_x(),
+                           ufo.getUFOVel_y(), 0))
+        for kind, bullets in ((VIEW_BULLET, wave.getBullets()),
+                              (VIEW_ALIEN_BULLET, wave.getAlienBullets())):
+            for bullet in bullets:
+                result.append((kind, bullet, bullet.x + left, bullet.y + bottom,
+                               bullet.getvel_x(), bullet.getvel_y(), 0))
+        return result
+
+    def _change(self, buffer, id, old, record):
+        """
+        Adds the record of a corrected object to a buffer.
+
+        The motion is sent as differences from the old record: the position
+        from where the old record has the object at the new record's frame.
+
+        Parameter buffer: the buffer
+        Precondition: buffer is a bytearray
+
+        Parameter id: the object id
+        Precondition: id is an int >= 0
+
+        Parameter old: the record the spectator has
+        Precondition: old is a record of the same object
+
+        Parameter record: the new record
+        Precondition: record is a record != old
+        """
+        flags = 0
+        if old[RECORD_X:RECORD_HEADING] != record[RECORD_X:RECORD_HEADING]:
+            flags |= CHANGE_MOTION
+        if old[RECORD_HEADING] != record[RECORD_HEADING]:
+            flags |= CHANGE_HEADING
+        if old[RECORD_KIND] != record[RECORD_KIND]:
+            flags |= CHANGE_KIND
+        _put(buffer, id)
+        buffer.append(flags)
+        if flags & CHANGE_MOTION:
+            seen_x, seen_y = position(old, record[RECORD_FRAME])
+            _put(buffer, self._frame - record[RECORD_FRAME])
+            _put(buffer, record[RECORD_X] - seen_x)
+            _put(buffer, record[RECORD_Y] - seen_y)
+            _put(buffer, record[RECORD_VX] - old[RECORD_VX])
+            _put(buffer, record[RECORD_VY] - old[RECORD_VY])
+        if flags & CHANGE_HEADING:
+            _put(buffer, (record[RECORD_HEADING] - old[RECORD_HEADING] + 180) % 360 - 180)
+        if flags & CHANGE_KIND:
+            buffer.append(record[RECORD_KIND])
+
+
+class StateDecoder(object):
+    """
+    A class to represent a spectator, rebuilding the view from the messages.
+
+    Call decode with each message, and acknowledge the frame it returns to
+    the encoder.
+    """
+    # Attribute _frame: the last frame decoded
+    # Invariant: _frame is an int >= -1
+    #
+    # Attribute _history: the records and lives of the frames that may be diffed against
+    # Invariant: _history is a dict of frame to (dict of id to record, lives, UFO lives)
+
+    def getFrame(self):
+        """
+        Returns the last frame decoded, or -1 if none has been.
+        """
+        return self._frame
+
+    def getLives(self):
+        """
+        Returns the player's lives at the last frame decoded.
+        """
+        return self._history[self._frame][1]
+
+    def getUFOLives(self):
+        """
+        Returns the lives of the UFO fleet at the last frame decoded.
+        """
+        return self._history[self._frame][2]
+
+    def getView(self):
+        """
+        Returns everything in play at the last frame decoded.
+
+        The result is a dict from object id to (kind, x, y, heading), with
+        the position in pixels and the kind one of the VIEW_ kinds. In a large
+        world the positions are world coordinates; subtract the position of
+        the VIEW_CAMERA object for screen coordinates.
+        """
+        return _view(self._history[self._frame][0], self._frame)
+
+    def __init__(self):
+        """
+        Initializes a spectator that has decoded nothing.
+        """
+        self._frame = -1
+        self._history = {}
+
+    def decode(self, data):
+        """
+        Applies a message and returns the frame it is for.
+
+        This raises ValueError if the message is a diff against a frame this
+        spectator does not have.
+
+        Parameter data: the message
+        Precondition: data is a bytes-like object from StateEncoder.encode
+        """
+        frame, acked, flags = MESSAGE_HEADER.unpack_from(data)
+        if acked == VIEW_NONE:
+            base, lives, ufo_lives = ({}, 0, 0)
+        elif acked in self._history:
+            base, lives, ufo_lives = self._history[acked]
+        else:
+            raise ValueError('frame %d is a diff against frame %d, which is not known' %
+                             (frame, acked))
+        records = dict(base)
+        pos = MESSAGE_HEADER.size
+        if flags & FLAG_LIVES:
+            lives, pos = _get(data, pos)
+        if flags & FLAG_UFO_LIVES:
+            ufo_lives, pos = _get(data, pos)
+        spawns, pos = _get(data, pos)
+        changes, pos = _get(data, pos)
+        removals, pos = _get(data, pos)
+
+        for i in range(spawns):
+            id, pos = _get(data, pos)
+            kind = data[pos]
+            pos += 1
+            values = []
+            for j in range(6):
+                value, pos = _get(data, pos)
+                values.append(value)
+            x, y, vel_x, vel_y, age, heading = values
+            records[id] = (kind, x, y, vel_x, vel_y, frame - age, heading)
+
+        for i in range(changes):
+            id, pos = _get(data, pos)
+            change = data[pos]
+            pos += 1
+            record = records[id]
+            if change & CHANGE_MOTION:
+                age, pos = _get(data, pos)
+                start = frame - age
+                seen_x, seen_y = position(record, start)
+                dx, pos = _get(data, pos)
+                dy, pos = _get(data, pos)
+                dvx, pos = _get(data, pos)
+                dvy, pos = _get(data, pos)
+                record = (record[RECORD_KIND], seen_x + dx, seen_y + dy,
+                          record[RECORD_VX] + dvx, record[RECORD_VY] + dvy, start,
+                          record[RECORD_HEADING])
+            if change & CHANGE_HEADING:
+                turn, pos = _get(data, pos)
+                record = record[:RECORD_HEADING] + ((record[RECORD_HEADING] + turn) % 360,)
+            if change & CHANGE_KIND:
+                record = (data[pos],) + record[RECORD_X:]
+                pos += 1
+            records[id] = record
+
+        id = 0
+        for i in range(removals):
+            step, pos = _get(data, pos)
+            id += step
+            del records[id]
+
+        self._history[frame] = (records, lives, ufo_lives)
+        # The encoder only diffs against recent frames at least as new as this baseline
+        oldest = frame - SPECTATOR_HISTORY if acked == VIEW_NONE else acked
+        for old in [old for old in self._history if old < oldest]:
+            del self._history[old]
+        self._frame = frame
+        return frame
+
+
+def _view(records, frame):
+    """
+    Returns the view of a frame from its records.
+
+    The result is a dict from object id to (kind, x, y, heading), with the
+    position in pixels.
+
+    Parameter records: the records of the frame
+    Precondition: records is a dict of id to record
+
+    Parameter frame: the frame
+    Precondition: frame is an int >= 0
+    """
+    result = {}
+    for id, record in records.items():
+        x, y = position(record, frame)
+        result[id] = (record[RECORD_KIND], x / SPECTATOR_SCALE, y / SPECTATOR_SCALE,
+                      record[RECORD_HEADING])
+    return result
@@ -0,0 +1,483 @@
+"""
+Asteroid swarm module for Planetoids
+
+This module contains a stress-test simulation of a very large asteroid field
+(100,000 asteroids or more), far too many to be Asteroid objects. The state
+of every asteroid is one column of a numpy array: x, y, velocity and radius.
+Each frame moves every asteroid, wraps it around the field, and finds every
+pair of asteroids that touch.
+
+To find the pairs, the field is split into strips along x. Each strip finds
+the pairs whose left asteroid it owns, looking a little past its right edge
+(the halo, which wraps around to the left edge of the field) for partners.
+Inside a strip the asteroids are sorted into rows at least as tall as the
+largest possible reach, so each asteroid only has to be compared with nearby
+asteroids in its own row and the two rows next to it.
+
+AsteroidSwarm does every strip in this process. SharedSwarm keeps the state
+in shared memory and gives each strip to a worker process, so the main
+process only gathers the pairs. Both use the same kernels in the same order,
+so they produce the same positions and the same pairs.
+"""
+import math
+import numpy as np
+from consts import *
+from vecmath import wrap_array, wrapped_delta
+
+# The number of asteroids per square pixel when no field size is given
+SWARM_DENSITY = 1e-4
+# The rows of the state array
+SWARM_X, SWARM_Y, SWARM_VX, SWARM_VY, SWARM_R = range(5)
+# The radius and speed of each asteroid size
+SWARM_SIZES = ((SMALL_RADIUS, SMALL_SPEED), (MEDIUM_RADIUS, MEDIUM_SPEED),
+               (LARGE_RADIUS, LARGE_SPEED))
+
+
+def field_size(count):
+    """
+    Returns the side of a square field holding count asteroids at SWARM_DENSITY.
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int > 0
+    """
+    return max(GAME_WIDTH, int(math.sqrt(count / SWARM_DENSITY)))
+
+
+def move(state, start, stop, low_x, low_y, period_x, period_y):
+    """
+    Moves and wraps the asteroids start to stop-1, in place.
+
+    Parameter state: the swarm state
+    Precondition: state is a (5, n) numpy float array
+
+    Parameter start: the first asteroid to move
+    Precondition: start is an int, 0 <= start <= stop
+
+    Parameter stop: one past the last asteroid to move
+    Precondition: stop is an int <= n
+
+    Parameter low_x: the left edge of the field
+    Precondition: low_x is a number
+
+    Parameter low_y: the bottom edge of the field
+    Precondition: low_y is a number
+
+    Parameter period_x: the width of the field
+    Precondition: period_x is a number > 0
+
+    Parameter period_y: the height of the field
+    Precondition: period_y is a number > 0
+    """
+    x = state[SWARM_X, start:stop]
+    y = state[SWARM_Y, start:stop]
+    x += state[SWARM_VX, start:stop]
+    y += state[SWARM_VY, start:stop]
+    wrap_array(x, low_x, low_x + period_x)
+    wrap_array(y, low_y, low_y + period_y)
+
+
+def strip_of(x, low_x, period_x, strips):
+    """
+    Returns the strip that owns each x coordinate.
+
+    Parameter x: the x coordinates
+    Precondition: x is a numpy float array of coordinates in the field
+
+    Parameter low_x: the left edge of the field
+    Precondition: low_x is a number
+
+    Parameter period_x: the width of the field
+    Precondition: period_x is a number > 0
+
+    Parameter strips: the number of strips
+    Precondition: strips is an int > 0
+    """
+    strip = ((x - low_x) * (strips / period_x)).astype(np.int64)
+    return np.clip(strip, 0, strips - 1)
+
+
+def strip_pairs(state, strip, strips, low_x, low_y, period_x, period_y, reach):
+    """
+    Returns every touching pair whose left asteroid is owned by the strip.
+
+    A pair belongs to the asteroid that has the other less than reach to its
+    right (wrapping around the field). The result is a (k, 2) numpy int array
+    of asteroid indices, smaller index first.
+
+    Parameter state: the swarm state
+    Precondition: state is a (5, n) numpy float array
+
+    Parameter strip: the strip
+    Precondition: strip is an int, 0 <= strip < strips
+
+    Parameter strips: the number of strips
+    Precondition: strips is an int > 0
+
+    Parameter low_x: the left edge of the field
+    Precondition: low_x is a number
+
+    Parameter low_y: the bottom edge of the field
+    Precondition: low_y is a number
+
+    Parameter period_x: the width of the field
+    Precondition: period_x is a number > 2 * reach
+
+    Parameter period_y: the height of the field
+    Precondition: period_y is a number > 2 * reach
+
+    Parameter reach: the largest distance at which two asteroids can touch
+    Precondition: reach is a number > 0
+    """
+    x = state[SWARM_X]
+    y = state[SWARM_Y]
+    lo = low_x + period_x * strip / strips
+    hi = low_x + period_x * (strip + 1) / strips
+
+    # The asteroids owned, then the halo (shifted to lie right of the strip)
+    owned = np.flatnonzero(strip_of(x, low_x, period_x, strips) == strip)
+    shift = (x - hi) % period_x
+    halo = np.flatnonzero(shift < reach)
+    ids = np.concatenate((owned, halo))
+    cx = np.concatenate((x[owned], hi + shift[halo])) - lo
+
+    # Rows at least reach tall that evenly divide the field
+    rows = int(period_y // reach)
+    if rows < 3:
+        rows = 1
+    row = ((y[ids] - low_y) * (rows / period_y)).astype(np.int64) % rows
+
+    # Sort by row, then by x within the row
+    span = (hi - lo) + reach + 1
+    key = row * span + cx
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    ids = ids[order]
+    left = np.flatnonzero(order < len(owned))
+    lkey = key[left]
+    lrow = row[order][left]
+    lcx = cx[order][left]
+
+    found = []
+    # Same row: later in the sort and less than reach to the right
+    ends = np.searchsorted(key, lkey + reach, 'left')
+    found.append(_window(state, ids, left, left + 1, ends, period_x, period_y))
+    if rows > 1:
+        # Next row: from the same x (inclusive); previous row: strictly right
+        for step, side in ((1, 'left'), (rows - 1, 'right')):
+            base = ((lrow + step) % rows) * span + lcx
+            starts = np.searchsorted(key, base, side)
+            ends = np.searchsorted(key, base + reach, 'left')
+            found.append(_window(state, ids, left, starts, ends, period_x, period_y))
+    return np.concatenate(found)
+
+
+def _window(state, ids, left, starts, ends, period_x, period_y):
+    """
+    Returns the touching pairs between each left asteroid and its window.
+
+    Parameter state: the swarm state
+    Precondition: state is a (5, n) numpy float array
+
+    Parameter ids: the asteroid at each sorted position
+    Precondition: ids is a numpy int array
+
+    Parameter left: the sorted positions of the left asteroids
+    Precondition: left is a numpy int array
+
+    Parameter starts: the first sorted position in each window
+    Precondition: starts is a numpy int array the size of left
+
+    Parameter ends: one past the last sorted position in each window
+    Precondition: ends is a numpy int array the size of left
+
+    Parameter period_x: the width of the field
+    Precondition: period_x is a number > 0
+
+    Parameter period_y: the height of the field
+    Precondition: period_y is a number > 0
+    """
+    x = state[SWARM_X]
+    y = state[SWARM_Y]
+    r = state[SWARM_R]
+    # Only the left asteroids with partners still to test are kept each round
+    live = starts < ends
+    a = ids[left[live]]
+    q = starts[live]
+    ends = ends[live]
+    found = [np.empty((0, 2), dtype=np.int64)]
+    while len(a) > 0:
+        b = ids[q]
+        # The same test for every partition, from the unshifted coordinates
+        dx = wrapped_delta(x[b] - x[a], period_x)
+        dy = wrapped_delta(y[b] - y[a], period_y)
+        touch = r[a] + r[b]
+        hit = (dx * dx + dy * dy < touch * touch) & (a != b)
+        if hit.any():
+            found.append(np.stack((np.minimum(a[hit], b[hit]),
+                                   np.maximum(a[hit], b[hit])), axis=1))
+        q = q + 1
+        live = q < ends
+        a = a[live]
+        q = q[live]
+        ends = ends[live]
+    return np.concatenate(found)
+
+
+def sort_pairs(pairs, count):
+    """
+    Returns the pairs sorted by first index, then by second.
+
+    Parameter pairs: the pairs
+    Precondition: pairs is a (k, 2) numpy int array of indices < count
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int > 0
+    """
+    key = np.sort(pairs[:, 0] * count + pairs[:, 1])
+    return np.stack((key // count, key % count), axis=1)
+
+
+class AsteroidSwarm(object):
+    """
+    A class to represent a large asteroid field simulated in this process.
+    """
+    # Attribute _state: the x, y, x velocity, y velocity and radius of each asteroid
+    # Invariant: _state is a (5, n) numpy float array
+    #
+    # Attribute _strips: the number of strips the field is split into
+    # Invariant: _strips is an int > 0
+    #
+    # Attribute _low: the bottom left corner of the field, as (x, y)
+    # Invariant: _low is a tuple of two numbers
+    #
+    # Attribute _period: the width and height of the field, as (width, height)
+    # Invariant: _period is a tuple of two numbers > 2 * _reach
+    #
+    # Attribute _reach: the largest distance at which two asteroids can touch
+    # Invariant: _reach is a number > 0
+
+    def getState(self):
+        """
+        Returns the state array (rows x, y, x velocity, y velocity and radius).
+        """
+        return self._state
+
+    def size(self):
+        """
+        Returns the number of asteroids.
+        """
+        return self._state.shape[1]
+
+    def __init__(self, count, width=None, height=None, seed=0, strips=1):
+        """
+        Initializes a field of randomly placed asteroids of every size.
+
+        The field wraps with a dead zone around it, like the game screen.
+
+        Parameter count: the number of asteroids
+        Precondition: count is an int > 0
+
+        Parameter width: the width of the field, or None to size it by count
+        Precondition: width is a number > 0 or None
+
+        Parameter height: the height of the field, or None to size it by count
+        Precondition: height is a number > 0 or None
+
+        Parameter seed: the random seed for the field
+        Precondition: seed is an int
+
+        Parameter strips: the number of strips to split the field into
+        Precondition: strips is an int > 0
+        """
+        if width is None:
+            width = field_size(count)
+        if height is None:
+            height = field_size(count)
+        self._strips = strips
+        self._low = (-DEAD_ZONE, -DEAD_ZONE)
+        self._period = (width + 2 * DEAD_ZONE, height + 2 * DEAD_ZONE)
+        self._reach = 2 * max(size[0] for size in SWARM_SIZES) + 1
+        self._state = self._allocate(count)
+
+        rng = np.random.default_rng(seed)
+        sizes = rng.integers(0, len(SWARM_SIZES), count)
+        radius = np.array([size[0] for size in SWARM_SIZES], dtype=float)[sizes]
+        speed = np.array([size[1] for size in SWARM_SIZES], dtype=float)[sizes]
+        angle = rng.uniform(0, 2 * math.pi, count)
+        self._state[SWARM_X] = rng.uniform(0, width, count)
+        self._state[SWARM_Y] = rng.uniform(0, height, count)
+        self._state[SWARM_VX] = np.cos(angle) * speed
+        self._state[SWARM_VY] = np.sin(angle) * speed
+        self._state[SWARM_R] = radius
+
+    def step(self):
+        """
+        Moves the field one frame and returns every touching pair.
+
+        The result is a (k, 2) numpy int array sorted by first index, then
+        second, with the smaller index first in each pair.
+        """
+        move(self._state, 0, self.size(), self._low[0], self._low[1],
+             self._period[0], self._period[1])
+        found = [strip_pairs(self._state, strip, self._strips, self._low[0],
+                             self._low[1], self._period[0], self._period[1], self._reach)
+                 for strip in range(self._strips)]
+        return sort_pairs(np.concatenate(found), self.size())
+
+    def close(self):
+        """
+        Releases the resources of the field.
+        """
+        pass
+
+    def _allocate(self, count):
+        """
+        Returns a new state array for count asteroids.
+
+        Parameter count: the number of asteroids
+        Precondition: count is an int > 0
+        """
+        return np.zeros((5, count))
+
+    def _params(self):
+        """
+        Returns the field layout as (strips, low x, low y, width, height, reach).
+        """
+        return (self._strips, self._low[0], self._low[1], self._period[0],
+                self._period[1], self._reach)
+
+
+class SharedSwarm(AsteroidSwarm):
+    """
+    A class to represent a large asteroid field simulated by worker processes.
+
+    The state lives in shared memory. Each worker moves its share of the
+    asteroids, waits for the others, and then sends back the pairs of its
+    strip. Call close when done to stop the workers and free the memory.
+    """
+    # Attribute _memory: the shared memory holding the state
+    # Invariant: _memory is a multiprocessing.shared_memory.SharedMemory
+    #
+    # Attribute _workers: the worker processes, one per strip
+    # Invariant: _workers is a list of multiprocessing.Process
+    #
+    # Attribute _pipes: the connection to each worker
+    # Invariant: _pipes is a list of multiprocessing.connection.Connection
+
+    def __init__(self, count, width=None, height=None, seed=0, workers=2):
+        """
+        Initializes the field and starts one worker per strip.
+
+        Parameter count: the number of asteroids
+        Precondition: count is an int > 0
+
+        Parameter width: the width of the field, or None to size it by count
+        Precondition: width is a number > 0 or None
+
+        Parameter height: the height of the field, or None to size it by count
+        Precondition: height is a number > 0 or None
+
+        Parameter seed: the random seed for the field
+        Precondition: seed is an int
+
+        Parameter workers: the number of worker processes
+        Precondition: workers is an int > 0
+        """
+        import multiprocessing
+        self._memory = None
+        self._workers = []
+        self._pipes = []
+        super().__init__(count, width, height, seed, workers)
+
+        barrier = multiprocessing.Barrier(workers)
+        for strip in range(workers):
+            mine, theirs = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_work, daemon=True,
+                args=(self._memory.name, count, strip, self._params(), theirs, barrier))
+            worker.start()
+            theirs.close()
+            self._workers.append(worker)
+            self._pipes.append(mine)
+
+    def step(self):
+        """
+        Moves the field one frame and returns every touching pair.
+
+        The result is the same as AsteroidSwarm.step for the same field.
+        """
+        for pipe in self._pipes:
+            pipe.send('step')
+        found = [np.frombuffer(pipe.recv_bytes(), dtype=np.int64).reshape(-1, 2)
+                 for pipe in self._pipes]
+        return sort_pairs(np.concatenate(found), self.size())
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        for pipe in self._pipes:
+            pipe.send('stop')
+            pipe.close()
+        for worker in self._workers:
+            worker.join()
+        self._pipes = []
+        self._workers = []
+        if self._memory is not None:
+            self._state = self._state.copy()
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def _allocate(self, count):
+        """
+        Returns a new state array for count asteroids, in shared memory.
+
+        Parameter count: the number of asteroids
+        Precondition: count is an int > 0
+        """
+        from multiprocessing import shared_memory
+        self._memory = shared_memory.SharedMemory(create=True, size=5 * count * 8)
+        state = np.ndarray((5, count), dtype=np.float64, buffer=self._memory.buf)
+        state[:] = 0
+        return state
+
+
+def _work(name, count, strip, params, pipe, barrier):
+    """
+    Runs a worker of a SharedSwarm until told to stop.
+
+    Parameter name: the name of the shared memory holding the state
+    Precondition: name is a str
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int > 0
+
+    Parameter strip: the strip (and share of asteroids to move) of this worker
+    Precondition: strip is an int >= 0
+
+    Parameter params: the field layout, as from AsteroidSwarm._params
+    Precondition: params is a tuple
+
+    Parameter pipe: the connection to the main process
+    Precondition: pipe is a multiprocessing.connection.Connection
+
+    Parameter barrier: the barrier shared by every worker
+    Precondition: barrier is a multiprocessing.Barrier
+    """
+    from multiprocessing import shared_memory
+    strips, low_x, low_y, period_x, period_y, reach = params
+    memory = shared_memory.SharedMemory(name=name)
+    state = np.ndarray((5, count), dtype=np.float64, buffer=memory.buf)
+    start = count * strip // strips
+    stop = count * (strip + 1) // strips
+    try:
+        while pipe.recv() == 'step':
+            move(state, start, stop, low_x, low_y, period_x, period_y)
+            # Every asteroid must have moved before any strip looks for pairs
+            barrier.wait()
+            pairs = strip_pairs(state, strip, strips, low_x, low_y, period_x, period_y,
+                                reach)
+            pipe.send_bytes(pairs.astype(np.int64).tobytes())
+    finally:
+        del state
+        memory.close()
@@ -0,0 +1,262 @@
+"""
+Telemetry module for Planetoids
+
+This module keeps a record of every frame for offline analysis. Wave puts
+one sample per frame into a bounded ring buffer, and a background thread
+takes them out in batches and inserts them into a local SQLite database.
+Every run of the game is a new session, so the database can collect
+thousands of sessions. A session may play many waves, and each wave counts
+its frames from zero, so every wave in a session gets its own number; the
+samples are indexed by session, wave and frame.
+
+The game must never wait on the disk. The ring buffer has one writer (the
+game thread) and one reader (the writer thread), so neither needs a lock,
+and when the buffer is full because the writer has fallen behind the new
+sample is dropped and counted instead.
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from consts import *
+
+# The columns of each sample, in order, after the session
+SAMPLE_COLUMNS = ('wave', 'frame', 'time', 'frame_time', 'asteroids', 'bullets', 'ufos',
+                  'lives', 'ufo_lives', 'collisions')
+
+
+class SampleRing(object):
+    """
+    A class to represent a bounded ring buffer with one writer and one reader.
+
+    Only one thread may call push and only one (other) thread may call drain.
+    """
+    # Attribute _slots: the storage for the samples
+    # Invariant: _slots is a list of length _capacity
+    #
+    # Attribute _capacity: the most samples the buffer holds
+    # Invariant: _capacity is an int > 0
+    #
+    # Attribute _head: the number of samples ever pushed (changed only by the writer)
+    # Invariant: _head is an int, _tail <= _head <= _tail + _capacity
+    #
+    # Attribute _tail: the number of samples ever drained (changed only by the reader)
+    # Invariant: _tail is an int >= 0
+    #
+    # Attribute _dropped: the number of samples dropped because the buffer was full
+    # Invariant: _dropped is an int >= 0
+
+    def getCapacity(self):
+        """
+        Returns the most samples the buffer holds.
+        """
+        return self._capacity
+
+    def getDropped(self):
+        """
+        Returns the number of samples dropped because the buffer was full.
+        """
+        return self._dropped
+
+    def __len__(self):
+        """
+        Returns the number of samples waiting in the buffer.
+        """
+        return self._head - self._tail
+
+    def __init__(self, capacity=TELEMETRY_RING):
+        """
+        Initializes an empty ring buffer.
+
+        Parameter capacity: the most samples the buffer holds
+        Precondition: capacity is an int > 0
+        """
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._head = 0
+        self._tail = 0
+        self._dropped = 0
+
+    def push(self, sample):
+        """
+        Adds a sample, or drops it if the buffer is full.
+
+        Returns True if the sample was added.
+
+        Parameter sample: the sample to add
+        Precondition: sample is a tuple
+        """
+        head = self._head
+        if head - self._tail >= self._capacity:
+            self._dropped += 1
+            return False
+        self._slots[head % self._capacity] = sample
+        # Publish the sample only after it is in its slot
+        self._head = head + 1
+        return True
+
+    def drain(self, limit):
+        """
+        Removes and returns up to limit samples, oldest first.
+
+        Parameter limit: the most samples to remove
+        Precondition: limit is an int > 0
+        """
+        tail = self._tail
+        count = min(self._head - tail, limit)
+        result = []
+        for i in range(tail, tail + count):
+            result.append(self._slots[i % self._capacity])
+            self._slots[i % self._capacity] = None
+        self._tail = tail + count
+        return result
+
+
+class TelemetryWriter(threading.Thread):
+    """
+    A class to represent the thread writing samples to the SQLite database.
+
+    Wave calls record once per frame; everything else happens on the thread.
+    """
+    # Attribute _path: the database file
+    # Invariant: _path is a str
+    #
+    # Attribute _session: the id of this session
+    # Invariant: _session is a str
+    #
+    # Attribute _ring: the samples waiting to be written
+    # Invariant: _ring is a SampleRing
+    #
+    # Attribute _waves: the number of waves started in this session
+    # Invariant: _waves is an int >= 0
+    #
+    # Attribute _written: the number of samples written so far
+    # Invariant: _written is an int >= 0
+    #
+    # Attribute _halt: set to stop the thread after a final flush
+    # Invariant: _halt is a threading.Event
+
+    def getSession(self):
+        """
+        Returns the id of this session.
+        """
+        return self._session
+
+    def getWritten(self):
+        """
+        Returns the number of samples written to the database so far.
+        """
+        return self._written
+
+    def getDropped(self):
+        """
+        Returns the number of samples dropped because the writer fell behind.
+        """
+        return self._ring.getDropped()
+
+    def __init__(self, path=TELEMETRY_FILE, capacity=TELEMETRY_RING):
+        """
+        Initializes a writer for a new session.
+
+        Parameter path: the database file (created if needed)
+        Precondition: path is a str
+
+        Parameter capacity: the most samples waiting to be written
+        Precondition: capacity is an int > 0
+        """
+        super().__init__(name='planetoids-telemetry', daemon=True)
+        self._path = path
+        self._session = uuid.uuid4().hex
+        self._ring = SampleRing(capacity)
+        self._waves = 0
+        self._written = 0
+        self._halt = threading.Event()
+
+    def newWave(self):
+        """
+        Returns the number for a new wave in this session, starting at 1.
+
+        Wave calls this when it is given the writer, and records its frames
+        with the number.
+        """
+        self._waves += 1
+        return self._waves
+
+    def record(self, wave, frame, frame_time, asteroids, bullets, ufos, lives, ufo_lives,
+               collisions):
+        """
+        Adds the sample for a frame, dropping it if the writer has fallen behind.
+
+        Parameter wave: the number of the wave in this session (from newWave)
+        Precondition: wave is an int > 0
+
+        Parameter frame: the frame number in the wave
+        Precondition: frame is an int >= 0
+
+        Parameter frame_time: the time since the last frame, in seconds
+        Precondition: frame_time is a number >= 0
+
+        Parameter asteroids: the number of asteroids
+        Precondition: asteroids is an int >= 0
+
+        Parameter bullets: the number of bullets, from the ship and the aliens
+        Precondition: bullets is an int >= 0
+
+        Parameter ufos: the number of UFOs in play
+        Precondition: ufos is an int >= 0
+
+        Parameter lives: the player's lives
+        Precondition: lives is an int
+
+        Parameter ufo_lives: the lives left in the UFO fleet
+        Precondition: ufo_lives is an int >= 0
+
+        Parameter collisions: the number of collisions this frame
+        Precondition: collisions is an int >= 0
+        """
+        self._ring.push((self._session, wave, frame, time.time(), frame_time, asteroids,
+                         bullets, ufos, lives, ufo_lives, collisions))
+
+    def close(self):
+        """
+        Stops the thread after it writes the samples still waiting.
+        """
+        self._halt.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        """
+        Writes the samples in batches until close is called.
+        """
+        connection = sqlite3.connect(self._path)
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS frames (session TEXT, ' +
+                               ', '.join(SAMPLE_COLUMNS) + ')')
+            connection.execute('CREATE INDEX IF NOT EXISTS frames_session_wave_frame '
+                               'ON frames (session, wave, frame)')
+            connection.commit()
+            insert = ('INSERT INTO frames VALUES (' +
+                      ', '.join(['?'] * (len(SAMPLE_COLUMNS) + 1)) + ')')
+            while not self._halt.wait(TELEMETRY_INTERVAL):
+                self._write(connection, insert)
+            self._write(connection, insert)
+        finally:
+            connection.close()
+
+    def _write(self, connection, insert):
+        """
+        Writes every sample waiting, one batch per transaction.
+
+        Parameter connection: the open database
+        Precondition: connection is a sqlite3.Connection
+
+        Parameter insert: the INSERT statement for one sample
+        Precondition: insert is a str
+        """
+        batch = self._ring.drain(TELEMETRY_BATCH)
+        while len(batch) > 0:
+            connection.executemany(insert, batch)
+            connection.commit()
+            self._written += len(batch)
+            batch = self._ring.drain(TELEMETRY_BATCH)
@@ -0,0 +1,121 @@
+"""
+Unit tests for the physics kernels in kernels.py
+
+Every backend that can run here gets the same random inputs as the python
+backend, and must give exactly the same results. Backends that cannot run
+here (numba, when Numba is not installed) are skipped.
+
+Run with: python -m pytest test_kernels.py
+"""
+import numpy as np
+import pytest
+from consts import *
+import kernels
+
+
+# The wrapping area of the game, as in the models
+LOW  = (-DEAD_ZONE, -DEAD_ZONE)
+HIGH = (GAME_WIDTH + DEAD_ZONE, GAME_HEIGHT + DEAD_ZONE)
+
+
+def backend(name):
+    """
+    Returns the backend with this name, skipping the test if it cannot run here.
+
+    Parameter name: the backend name
+    Precondition: name is a key of kernels.BACKENDS
+    """
+    result = kernels.make(name)
+    if result is None:
+        pytest.skip('the %s backend is not available' % name)
+    return result
+
+
+def objects(seed, count=300):
+    """
+    Returns random (positions, velocities) around the wrapping area.
+
+    Parameter seed: the random seed
+    Precondition: seed is an int
+
+    Parameter count: the number of objects
+    Precondition: count is an int > 0
+    """
+    rng = np.random.default_rng(seed)
+    pos = np.column_stack((rng.uniform(LOW[0] - 10, HIGH[0] + 10, count),
+                           rng.uniform(LOW[1] - 10, HIGH[1] + 10, count)))
+    vel = rng.uniform(-10, 10, (count, 2))
+    return (pos, vel)
+
+
+@pytest.mark.parametrize('name', list(kernels.BACKENDS))
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_move_wrap(name, seed):
+    """
+    Tests that move_wrap matches the python backend over many frames.
+    """
+    pos, vel = objects(seed)
+    expected = pos.copy()
+    actual = pos.copy()
+    reference = kernels.make('python')
+    other = backend(name)
+    for frame in range(60):
+        reference.move_wrap(expected, vel, LOW, HIGH)
+        other.move_wrap(actual, vel, LOW, HIGH)
+    assert np.array_equal(actual, expected)
+    assert (actual >= LOW).all() and (actual <= HIGH).all()
+
+
+@pytest.mark.parametrize('name', list(kernels.BACKENDS))
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_wrap(name, seed):
+    """
+    Tests that wrap_array matches the python backend.
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(LOW[0] - GAME_WIDTH / 2, HIGH[0] + GAME_WIDTH / 2, 500)
+    expected = values.copy()
+    actual = values.copy()
+    kernels.make('python').wrap_array(expected, LOW[0], HIGH[0])
+    other = backend(name)
+    other.wrap_array(actual, LOW[0], HIGH[0])
+    assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize('name', list(kernels.BACKENDS))
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_collisions(name, seed):
+    """
+    Tests that first_hit matches the python backend.
+    """
+    pos, vel = objects(seed)
+    rng = np.random.default_rng(seed + 100)
+    points = rng.uniform(LOW[0], HIGH[0], (100, 2))
+    reach = UFO_RADIUS + SHIP_RADIUS
+    reference = kernels.make('python')
+    other = backend(name)
+    hits = 0
+    for x, y in points.tolist():
+        expected = reference.first_hit(pos, x, y, reach)
+        assert other.first_hit(pos, x, y, reach) == expected
+        if expected is not None:
+            hits += 1
+    # The data must exercise both outcomes
+    assert 0 < hits < len(points)
+
+
+def test_check():
+    """
+    Tests that check finds every available backend matches the reference.
+    """
+    result = kernels.check(count=100, frames=20)
+    assert set(result) == set(kernels.available())
+    assert all(result.values())
+
+
+def test_make_caches():
+    """
+    Tests that make returns the same backend each time it is asked.
+    """
+    for name in kernels.available():
+        assert kernels.make(name) is kernels.make(name)
@@ -0,0 +1,162 @@
+"""
+Frame timer module for Planetoids
+
+This module contains the timing wheel that Wave uses for everything that has
+to happen a number of frames from now: when the ship may fire again, when a
+bullet leaves the screen, when an alien fires and when the shield goes down.
+
+A timing wheel is a ring of buckets, one per frame. A timer due in d frames is
+put in the bucket d slots ahead of the current one, so scheduling is O(1) and
+each tick only looks at the one bucket that is due. Timers further away than
+one turn of the wheel stay in their bucket until the wheel comes round to
+them on the right turn.
+"""
+
+# The default number of buckets in a wheel
+WHEEL_SLOTS = 256
+
+
+class Timer(object):
+    """
+    A class to represent a single scheduled callback.
+
+    Timers are returned by TimingWheel.schedule so that they can be
+    cancelled. They should not be created directly.
+    """
+    # Attribute _due: the frame the timer fires on
+    # Invariant: _due is an int
+    #
+    # Attribute _callback: the function to call
+    # Invariant: _callback is callable, or None once the timer is cancelled
+    #
+    # Attribute _args: the arguments to call _callback with
+    # Invariant: _args is a tuple
+    __slots__ = ('_due', '_callback', '_args')
+
+    def getDue(self):
+        """
+        Returns the frame this timer fires on.
+        """
+        return self._due
+
+    def isActive(self):
+        """
+        Returns True if this timer has not fired or been cancelled.
+        """
+        return self._callback is not None
+
+    def __init__(self, due, callback, args):
+        """
+        Initializes a new timer.
+
+        Parameter due: the frame the timer fires on
+        Precondition: due is an int
+
+        Parameter callback: the function to call
+        Precondition: callback is callable
+
+        Parameter args: the arguments to call callback with
+        Precondition: args is a tuple
+        """
+        self._due = due
+        self._callback = callback
+        self._args = args
+
+    def cancel(self):
+        """
+        Stops this timer from firing.
+
+        The timer is left in its bucket and skipped when the bucket is due, so
+        cancelling is O(1).
+        """
+        self._callback = None
+
+
+class TimingWheel(object):
+    """
+    A class to represent a frame-indexed timing wheel.
+
+    Call tick once per frame. It advances the wheel one frame and calls every
+    timer due on that frame, in the order they were scheduled. The cost of a
+    tick depends on the timers in the current bucket, not on the number of
+    timers alive.
+    """
+    # Attribute _frame: the number of ticks so far
+    # Invariant: _frame is an int >= 0
+    #
+    # Attribute _slots: the buckets of the wheel
+    # Invariant: _slots is a list of lists of Timer objects; a timer due on
+    #           frame f is in bucket f % len(_slots)
+    #
+    # Attribute _count: the number of timers in the wheel
+    # Invariant: _count is an int >= 0 (cancelled timers count until skipped)
+
+    def getFrame(self):
+        """
+        Returns the current frame of the wheel.
+        """
+        return self._frame
+
+    def __len__(self):
+        """
+        Returns the number of timers still in the wheel.
+        """
+        return self._count
+
+    def __init__(self, slots=WHEEL_SLOTS):
+        """
+        Initializes an empty timing wheel at frame 0.
+
+        Parameter slots: the number of buckets in the wheel
+        Precondition: slots is an int > 0
+        """
+        self._frame = 0
+        self._slots = [[] for i in range(slots)]
+        self._count = 0
+
+    def schedule(self, delay, callback, *args):
+        """
+        Schedules callback(*args) to be called delay frames from now.
+
+        A delay of 0 (or less) means the next tick. This returns the Timer,
+        which can be used to cancel the call.
+
+        Parameter delay: the number of frames to wait
+        Precondition: delay is an int
+
+        Parameter callback: the function to call
+        Precondition: callback is callable
+        """
+        due = self._frame + max(int(delay), 1)
+        timer = Timer(due, callback, args)
+        self._slots[due % len(self._slots)].append(timer)
+        self._count += 1
+        return timer
+
+    def tick(self):
+        """
+        Advances the wheel one frame and calls every timer due on it.
+
+        Timers scheduled by a callback for this same frame are not called until
+        the next tick.
+        """
+        self._frame += 1
+        bucket = self._slots[self._frame % len(self._slots)]
+        if len(bucket) == 0:
+            return
+
+        due = []
+        later = []
+        for timer in bucket:
+            if timer._due <= self._frame:
+                due.append(timer)
+            else:
+                later.append(timer)  # Due on a later turn of the wheel
+        bucket[:] = later
+        self._count -= len(due)
+
+        for timer in due:
+            callback = timer._callback
+            if callback is not None:
+                timer._callback = None
+                callback(*timer._args)
@@ -0,0 +1,257 @@
+"""
+Vector math kernel for Planetoids
+
+This module contains the small amount of vector math used every frame by the
+models and by Wave. Vectors are passed around as plain floats (or as numpy
+arrays for whole groups of objects), so none of these functions allocate a
+Vector2. Trig values for the angles the game actually uses (whole-degree ship
+headings and the asteroid split angles) are computed once, when the module is
+imported, and looked up after that.
+
+Like consts.py, this module does not depend on any other game module, so both
+the models and the subcontroller may use it.
+"""
+import math
+import numpy as _numpy
+
+# The cosine of every whole-degree heading, indexed by degree (0-359)
+COS_DEG = [math.cos(math.radians(d)) for d in range(360)]
+# The sine of every whole-degree heading, indexed by degree (0-359)
+SIN_DEG = [math.sin(math.radians(d)) for d in range(360)]
+
+# The angle between the pieces of a broken asteroid, in degrees
+SPLIT_ANGLE = 120
+# The cosine of each split rotation (0, 120 and 240 degrees)
+SPLIT_COS = (1.0, COS_DEG[SPLIT_ANGLE], COS_DEG[2 * SPLIT_ANGLE])
+# The sine of each split rotation (0, 120 and 240 degrees)
+SPLIT_SIN = (0.0, SIN_DEG[SPLIT_ANGLE], SIN_DEG[2 * SPLIT_ANGLE])
+# The split tables as rows, for rotating many vectors at once
+_SPLIT_COS_ROW = _numpy.array([SPLIT_COS])
+_SPLIT_SIN_ROW = _numpy.array([SPLIT_SIN])
+
+
+def heading(degrees):
+    """
+    Returns the heading index for an angle in degrees.
+
+    The index is the angle rounded to a whole degree, in the range 0-359, and
+    can be used to look up COS_DEG and SIN_DEG.
+
+    Parameter degrees: the angle
+    Precondition: degrees is an int or float
+    """
+    return int(round(degrees)) % 360
+
+
+def unit(x, y):
+    """
+    Returns the unit vector in the direction (x, y) as a tuple.
+
+    The zero vector has no direction, so (0.0, 0.0) is returned for it.
+
+    Parameter x: the x component
+    Precondition: x is an int or float
+
+    Parameter y: the y component
+    Precondition: y is an int or float
+    """
+    length2 = x*x + y*y
+    if length2 == 0:
+        return (0.0, 0.0)
+    scale = 1.0 / math.sqrt(length2)
+    return (x * scale, y * scale)
+
+
+def scaled(x, y, length):
+    """
+    Returns the vector in the direction (x, y) with the given length.
+
+    The zero vector stays the zero vector.
+
+    Parameter x: the x component
+    Precondition: x is an int or float
+
+    Parameter y: the y component
+    Precondition: y is an int or float
+
+    Parameter length: the length of the result
+    Precondition: length is an int or float
+    """
+    ux, uy = unit(x, y)
+    return (ux * length, uy * length)
+
+
+def clamped(x, y, limit):
+    """
+    Returns (x, y), shortened to the given length if it is any longer.
+
+    Parameter x: the x component
+    Precondition: x is an int or float
+
+    Parameter y: the y component
+    Precondition: y is an int or float
+
+    Parameter limit: the largest length allowed
+    Precondition: limit is an int or float > 0
+    """
+    length2 = x*x + y*y
+    if length2 <= limit*limit:
+        return (x, y)
+    scale = limit / math.sqrt(length2)
+    return (x * scale, y * scale)
+
+
+def rotated(x, y, cos_theta, sin_theta):
+    """
+    Returns (x, y) rotated by the angle with the given cosine and sine.
+
+    Parameter x: the x component
+    Precondition: x is an int or float
+
+    Parameter y: the y component
+    Precondition: y is an int or float
+
+    Parameter cos_theta: the cosine of the angle
+    Precondition: cos_theta is a float
+
+    Parameter sin_theta: the sine of the angle
+    Precondition: sin_theta is a float
+    """
+    return (x * cos_theta - y * sin_theta, x * sin_theta + y * cos_theta)
+
+
+def overlaps(x1, y1, x2, y2, reach):
+    """
+    Returns True if the points (x1, y1) and (x2, y2) are closer than reach.
+
+    The test compares squared distances, so no square root is taken.
+
+    Parameter x1: x coordinate of the first point
+    Precondition: x1 is an int or float
+
+    Parameter y1: y coordinate of the first point
+    Precondition: y1 is an int or float
+
+    Parameter x2: x coordinate of the second point
+    Precondition: x2 is an int or float
+
+    Parameter y2: y coordinate of the second point
+    Precondition: y2 is an int or float
+
+    Parameter reach: the distance to test against (usually a sum of radii)
+    Precondition: reach is an int or float >= 0
+    """
+    dx = x1 - x2
+    dy = y1 - y2
+    return dx*dx + dy*dy < reach*reach
+
+
+def wrapped(value, low, high):
+    """
+    Returns value wrapped into the range [low, high] by one period.
+
+    This matches the models' x_wrap and y_wrap: a value past one edge comes
+    back in from the other, shifted by the size of the range.
+
+    Parameter value: the coordinate to wrap
+    Precondition: value is an int or float
+
+    Parameter low: the low edge of the range
+    Precondition: low is an int or float
+
+    Parameter high: the high edge of the range
+    Precondition: high is an int or float > low
+    """
+    if value < low:
+        return value + (high - low)
+    elif value > high:
+        return value - (high - low)
+    return value
+
+
+def wrap_array(values, low, high):
+    """
+    Wraps every value in a numpy array into the range [low, high], in place.
+
+    This is the array version of wrapped.
+
+    Parameter values: the coordinates to wrap
+    Precondition: values is a numpy float array
+
+    Parameter low: the low edge of the range
+    Precondition: low is an int or float
+
+    Parameter high: the high edge of the range
+    Precondition: high is an int or float > low
+    """
+    values[values < low] += high - low
+    values[values > high] -= high - low
+
+
+def split_directions(dirs):
+    """
+    Returns the directions of the pieces of every broken asteroid at once.
+
+    Each row of dirs is the unit collision vector for one broken asteroid.
+    The result has one row per asteroid and one column per piece, holding
+    that vector rotated by 0, SPLIT_ANGLE and 2*SPLIT_ANGLE degrees.
+
+    Parameter dirs: the collision vectors
+    Precondition: dirs is a numpy float array of shape (n, 2)
+    """
+    x = dirs[:, 0:1]
+    y = dirs[:, 1:2]
+    cos = _SPLIT_COS_ROW
+    sin = _SPLIT_SIN_ROW
+    return _numpy.stack((x * cos - y * sin, x * sin + y * cos), axis=2)
+
+
+def wrapped_delta(delta, period):
+    """
+    Returns the shortest wrapped difference for every value in a numpy array.
+
+    On a wrapping screen, two points can be close across an edge. This maps
+    each difference into the range [-period/2, period/2).
+
+    Parameter delta: the differences between coordinates
+    Precondition: delta is a numpy float array
+
+    Parameter period: the size of the wrapping range
+    Precondition: period is an int or float > 0
+    """
+    return (delta + period / 2) % period - period / 2
+
+
+def time_to_contact(px, py, vx, vy, reach):
+    """
+    Returns the number of frames until each pair of circles touches.
+
+    Each pair is given by the position (px, py) and velocity (vx, vy) of one
+    circle relative to the other. The result is 0 for pairs that already
+    touch and infinity for pairs that never will. Every argument may be a
+    numpy array, and the pairs are all solved at once.
+
+    Parameter px: relative x positions
+    Precondition: px is a numpy float array
+
+    Parameter py: relative y positions
+    Precondition: py is a numpy float array of the same shape as px
+
+    Parameter vx: relative x velocities
+    Precondition: vx is a numpy float array of the same shape as px
+
+    Parameter vy: relative y velocities
+    Precondition: vy is a numpy float array of the same shape as px
+
+    Parameter reach: the distances at which the pairs touch (sums of radii)
+    Precondition: reach is a number or numpy float array of the same shape as px
+    """
+    a = vx*vx + vy*vy
+    b = px*vx + py*vy
+    c = px*px + py*py - reach*reach
+    disc = b*b - a*c
+    with _numpy.errstate(divide='ignore', invalid='ignore'):
+        t = (-b - _numpy.sqrt(disc)) / a
+    closing = (b < 0) & (disc >= 0) & (a > 0)
+    t = _numpy.where(closing, t, _numpy.inf)
+    return _numpy.where(c <= 0, 0.0, t)
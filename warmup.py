@@ -0,0 +1,318 @@
+"""
+Warm-up module for Planetoids
+
+Images, sounds and fonts are loaded the first time something uses them,
+which used to be in the middle of play: the first shot loaded the bullet
+sound and the first split loaded the smaller asteroid images. This module
+loads all of them while the title screen is up instead.
+
+Kivy only lets the main thread make textures and open sounds, so the work is
+split in two. A thread pool imports the game modules (numpy is the slowest
+import in the game) and reads every asset file in parallel, which is the
+slow part on a cold disk. The main thread then builds one game object per
+frame from the files that are ready (a shared sprite, a sound voice or a
+label in each font size), so the title screen keeps animating. Kivy keeps
+the loaded textures and fonts, so play reuses them.
+
+The module also has a clock for the startup report: the time spent on
+imports, until start, until the warm-up is done and until the first frame.
+"""
+import concurrent.futures
+import importlib
+import os
+import sys
+import time
+from consts import *
+
+# The images to load, as (image, width, height) for the shared sprites
+WARM_IMAGES = (
+    (SHIP_IMAGE, 2 * SHIP_RADIUS, 2 * SHIP_RADIUS),
+    (SHIELD_IMAGE, 2 * SHIP_RADIUS * SHIELD_SCALE, 2 * SHIP_RADIUS * SHIELD_SCALE),
+    (LARGE_IMAGE, 2 * LARGE_RADIUS, 2 * LARGE_RADIUS),
+    (MEDIUM_IMAGE, 2 * MEDIUM_RADIUS, 2 * MEDIUM_RADIUS),
+    (SMALL_IMAGE, 2 * SMALL_RADIUS, 2 * SMALL_RADIUS),
+    (UFO_IMAGE, 2 * UFO_RADIUS, 2 * UFO_RADIUS),
+    (UFOalien_IMAGE, 2 * UFO_RADIUS, 2 * UFO_RADIUS),
+)
+
+# The fonts to load, as (font, size) for every label the game shows
+WARM_FONTS = (
+    (TITLE_FONT, TITLE_SIZE), (TITLE_FONT, TITLE_SIZE - 45), (TITLE_FONT, TITLE_SIZE - 73),
+    (MESSAGE_FONT, MESSAGE_SIZE), (MESSAGE_FONT, MESSAGE_SIZE - 5),
+    (MESSAGE_FONT, MESSAGE_SIZE - 15), (MESSAGE_FONT, MESSAGE_SIZE - 20),
+    (MESSAGE_FONT, MESSAGE_SIZE - 22),
+)
+
+
+def asset_path(folder, name):
+    """
+    Returns the path of an asset file in one of the asset folders.
+
+    Parameter folder: the asset folder, next to this module
+    Precondition: folder is a str
+
+    Parameter name: the file name
+    Precondition: name is a str
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), folder, name)
+
+
+def read_file(path):
+    """
+    Returns the number of bytes in a file after reading all of it, or 0 if
+    the file is missing.
+
+    Parameter path: the file to read
+    Precondition: path is a str
+    """
+    try:
+        with open(path, 'rb') as file:
+            return len(file.read())
+    except OSError:
+        return 0
+
+
+class Warmup(object):
+    """
+    A class to represent the warm-up of the game's images, sounds and fonts.
+
+    Call start once, then step once per frame until isDone returns True (or
+    finish to do the rest at once).
+    """
+    # Attribute _pool: the threads reading the asset files
+    # Invariant: _pool is a concurrent.futures.ThreadPoolExecutor, or None when done
+    #
+    # Attribute _tasks: the work left for the main thread, as (future, function, args)
+    # Invariant: _tasks is a list of tuples
+    #
+    # Attribute _keep: the objects built, kept so their textures and fonts stay loaded
+    # Invariant: _keep is a list
+    #
+    # Attribute _bytes: the number of bytes read from the asset files
+    # Invariant: _bytes is an int >= 0
+    #
+    # Attribute _began: when start was called (time.perf_counter), or None before
+    # Invariant: _began is a float or None
+    #
+    # Attribute _time: the time from start until the last task, in seconds
+    # Invariant: _time is a float >= 0
+
+    def isDone(self):
+        """
+        Returns True if every asset has been loaded.
+        """
+        return self._began is not None and len(self._tasks) == 0
+
+    def getTime(self):
+        """
+        Returns the time from start until the last asset was loaded, in seconds.
+        """
+        return self._time
+
+    def getBytes(self):
+        """
+        Returns the number of bytes read from the asset files.
+        """
+        return self._bytes
+
+    def __init__(self, workers=WARMUP_WORKERS):
+        """
+        Initializes a warm-up that has not started.
+
+        Parameter workers: the number of threads reading files
+        Precondition: workers is an int > 0
+        """
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers,
+                                                           thread_name_prefix='warmup')
+        self._tasks = []
+        self._keep = []
+        self._bytes = 0
+        self._began = None
+        self._time = 0.0
+
+    def start(self):
+        """
+        Starts importing the game and reading every asset file on the thread pool.
+        """
+        self._began = time.perf_counter()
+        # Everything after this task needs the game modules
+        self._tasks.append((self._pool.submit(importlib.import_module, 'wave'),
+                            self._imported, ()))
+        for image, width, height in WARM_IMAGES:
+            self._add(asset_path(IMAGE_FOLDER, image), self._sprite, image, width, height)
+        for voice in range(SOUND_VOICES):
+            self._add(asset_path(SOUND_FOLDER, BULLET_SOUND), self._sound, BULLET_SOUND,
+                      voice)
+        for font, size in WARM_FONTS:
+            self._add(asset_path(FONT_FOLDER, font), self._label, font, size)
+
+    def step(self):
+        """
+        Builds the next object whose file has been read, if any.
+
+        Returns True if every asset has been loaded.
+        """
+        if len(self._tasks) > 0 and self._tasks[0][0].done():
+            self._run(self._tasks.pop(0))
+        return self.isDone()
+
+    def finish(self):
+        """
+        Waits for the files and builds every object left.
+        """
+        while len(self._tasks) > 0:
+            self._run(self._tasks.pop(0))
+
+    # HELPER METHODS
+    def _add(self, path, function, *args):
+        """
+        Reads a file on the pool and adds the function to run when it is read.
+
+        Parameter path: the asset file
+        Precondition: path is a str
+
+        Parameter function: builds the object for the asset on the main thread
+        Precondition: function is callable with args
+        """
+        self._tasks.append((self._pool.submit(read_file, path), function, args))
+
+    def _run(self, task):
+        """
+        Runs a main thread task once its file is read.
+
+        Parameter task: the task, as (future, function, args)
+        Precondition: task is a tuple from _tasks
+        """
+        future, function, args = task
+        result = future.result()
+        if isinstance(result, int):
+            self._bytes += result
+        self._keep.append(function(*args))
+        if len(self._tasks) == 0:
+            self._time = time.perf_counter() - self._began
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _imported(self):
+        """
+        Returns None; the game modules were imported on the pool.
+        """
+        return None
+
+    def _sprite(self, image, width, height):
+        """
+        Returns the shared sprite for an image, loading its texture.
+
+        Parameter image: the image file
+        Precondition: image is a str
+
+        Parameter width: the sprite width
+        Precondition: width is a number > 0
+
+        Parameter height: the sprite height
+        Precondition: height is a number > 0
+        """
+        from models import getSprite
+        return getSprite(image, width, height)
+
+    def _sound(self, sound, voice):
+        """
+        Returns the shared sound for a voice, loading the sound.
+
+        Parameter sound: the sound file
+        Precondition: sound is a str
+
+        Parameter voice: the voice number
+        Precondition: voice is an int >= 0
+        """
+        from models import getSound
+        return getSound(sound, voice)
+
+    def _label(self, font, size):
+        """
+        Returns a label in the given font and size, to load the font.
+
+        Parameter font: the font file
+        Precondition: font is a str
+
+        Parameter size: the font size
+        Precondition: size is an int > 0
+        """
+        from game2d import GLabel
+        return GLabel(text='Planetoids', font_name=font, font_size=size)
+
+
+class StartupClock(object):
+    """
+    A class to represent the clock for the startup report.
+    """
+    # Attribute _began: when the program started (time.perf_counter)
+    # Invariant: _began is a float
+    #
+    # Attribute _marks: the times of the startup steps, as (name, seconds) in order
+    # Invariant: _marks is a list of tuples
+    #
+    # Attribute _reported: whether the report has been printed
+    # Invariant: _reported is a bool
+
+    def isReported(self):
+        """
+        Returns True if the report has been printed.
+        """
+        return self._reported
+
+    def isMarked(self, name):
+        """
+        Returns True if the given startup step has been marked.
+
+        Parameter name: the step
+        Precondition: name is a str
+        """
+        for mark in self._marks:
+            if mark[0] == name:
+                return True
+        return False
+
+    def getMarks(self):
+        """
+        Returns the times of the startup steps, as (name, seconds since the
+        program started) tuples in order.
+        """
+        return self._marks
+
+    def __init__(self, began=None):
+        """
+        Initializes a clock.
+
+        Parameter began: when the program started (time.perf_counter)
+        Precondition: began is a float, or None for now
+        """
+        self._began = time.perf_counter() if began is None else began
+        self._marks = []
+        self._reported = False
+
+    def mark(self, name):
+        """
+        Records that a startup step has finished.
+
+        Parameter name: the step
+        Precondition: name is a str
+        """
+        self._marks.append((name, time.perf_counter() - self._began))
+
+    def report(self, out=None):
+        """
+        Prints the time of each startup step.
+
+        Parameter out: the file to print to
+        Precondition: out is a writable text file, or None for standard output
+        """
+        if out is None:
+            out = sys.stdout
+        print('Startup:', file=out)
+        last = 0.0
+        for name, seconds in self._marks:
+            print('  %-12s %8.1f ms  (+%.1f ms)' % (name, seconds * 1000, (seconds - last) * 1000),
+                  file=out)
+            last = seconds
+        self._reported = True
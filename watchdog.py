@@ -0,0 +1,165 @@
+"""
+Hitch watchdog module for Planetoids
+
+This module contains a background thread that catches slow frames as they
+happen. The game marks the start and end of each frame, which only stores a
+number. The watchdog thread sleeps for the frame budget and then checks the
+frame. If the same frame is still running, the thread samples the main
+thread's Python stack every few milliseconds until the frame finishes.
+
+The samples from each hitch are written to a rotating log file as collapsed
+stacks: one line per distinct stack, with the functions from outermost to
+innermost separated by semicolons, followed by the number of samples. This
+is the input format of most flame graph tools.
+"""
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+from consts import *
+
+
+class Watchdog(threading.Thread):
+    """
+    A class to represent the hitch watchdog thread.
+
+    Create it on the main thread, start it, and call frame_start and
+    frame_end around every frame.
+    """
+    # Attribute _budget: the frame time that counts as a hitch, in seconds
+    # Invariant: _budget is a float > 0
+    #
+    # Attribute _interval: the time between stack samples during a hitch, in seconds
+    # Invariant: _interval is a float > 0
+    #
+    # Attribute _target: the thread id of the thread being watched
+    # Invariant: _target is an int
+    #
+    # Attribute _frame: the number of frames started
+    # Invariant: _frame is an int >= 0
+    #
+    # Attribute _running: whether a frame is running
+    # Invariant: _running is a bool
+    #
+    # Attribute _began: when the current frame started (time.perf_counter)
+    # Invariant: _began is a float
+    #
+    # Attribute _hitches: the number of hitches caught
+    # Invariant: _hitches is an int >= 0
+    #
+    # Attribute _log: the logger writing the collapsed stacks
+    # Invariant: _log is a logging.Logger
+    #
+    # Attribute _halt: set to stop the thread
+    # Invariant: _halt is a threading.Event
+
+    def getHitches(self):
+        """
+        Returns the number of hitches caught so far.
+        """
+        return self._hitches
+
+    def __init__(self, budget=WATCHDOG_BUDGET, interval=WATCHDOG_INTERVAL,
+                 path=WATCHDOG_FILE):
+        """
+        Initializes a watchdog for the calling thread.
+
+        Parameter budget: the frame time that counts as a hitch, in seconds
+        Precondition: budget is a float > 0
+
+        Parameter interval: the time between stack samples, in seconds
+        Precondition: interval is a float > 0
+
+        Parameter path: the file to write the collapsed stacks to
+        Precondition: path is a string naming a writable file
+        """
+        super().__init__(name='planetoids-watchdog', daemon=True)
+        self._budget = budget
+        self._interval = interval
+        self._target = threading.get_ident()
+        self._frame = 0
+        self._running = False
+        self._began = time.perf_counter()
+        self._hitches = 0
+        self._halt = threading.Event()
+
+        self._log = logging.getLogger('planetoids.watchdog')
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        if len(self._log.handlers) == 0:
+            handler = logging.handlers.RotatingFileHandler(path,
+                maxBytes=WATCHDOG_FILE_SIZE, backupCount=WATCHDOG_FILE_COUNT)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._log.addHandler(handler)
+
+    def frame_start(self):
+        """
+        Marks the start of a frame.
+        """
+        self._began = time.perf_counter()
+        self._frame += 1
+        self._running = True
+
+    def frame_end(self):
+        """
+        Marks the end of a frame.
+
+        Marking the end again before the next frame starts does nothing.
+        """
+        self._running = False
+
+    def stop(self):
+        """
+        Stops the watchdog thread.
+        """
+        self._halt.set()
+
+    def run(self):
+        """
+        Watches the frames until stop is called.
+        """
+        while not self._halt.is_set():
+            frame = self._frame
+            if not self._running:
+                # Between frames: check again after one budget
+                self._halt.wait(self._budget)
+                continue
+
+            late = self._began + self._budget - time.perf_counter()
+            if late > 0:
+                self._halt.wait(late)
+            elif frame == self._frame and self._running:
+                self._sample(frame)
+            else:
+                self._halt.wait(self._interval)
+
+    def _sample(self, frame):
+        """
+        Samples the watched thread's stack until the given frame finishes.
+
+        Parameter frame: the number of the frame that is running late
+        Precondition: frame is an int > 0
+        """
+        stacks = {}
+        while frame == self._frame and self._running and not self._halt.is_set():
+            top = sys._current_frames().get(self._target)
+            if top is None:
+                return
+            names = []
+            while top is not None:
+                code = top.f_code
+                names.append(os.path.basename(code.co_filename) + ':' + code.co_name)
+                top = top.f_back
+            stack = ';'.join(reversed(names))
+            stacks[stack] = stacks.get(stack, 0) + 1
+            time.sleep(self._interval)
+
+        self._hitches += 1
+        duration = (time.perf_counter() - self._began) * 1000
+        lines = ['# hitch %d: frame %d, at least %.1f ms' %
+                 (self._hitches, frame, duration)]
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+            lines.append('%s %d' % (stack, count))
+        self._log.info('\n'.join(lines))
@@ -15,10 +15,17 @@ screen. These are model objects. Their classes are defined in models.py.
 from game2d import *
 from consts import *
 from models import *
+from vecmath import *
+from timing import *
+from events import *
+from broadphase import *
+from particles import *
+from world import *
 import random
 import datetime
 import math
 import introcs
+import numpy as np
 
 # PRIMARY RULE: Wave can only access attributes in models.py via getters/setters
 # Level is NOT allowed to access anything in app.py (Subcontrollers are not permitted
@@ -37,17 +44,44 @@ class Wave(object):
     - _data: Stores the JSON data for the current wave, used for reloading the level.
     - _ship: The player's ship (an instance of the Ship class).
     - _asteroids: A list of active Asteroid objects on the screen.
+    - _bounce: Boolean indicating whether asteroids bounce off each other (from the
+      wave's "bounce" setting).
+    - _sweep: The SortAndSweep broadphase finding asteroids that may be touching.
+    - _breaks: A list of the asteroid hits this frame, as (x, y, size, dir_x, dir_y)
+      tuples, waiting to be split in one batch at the end of the frame.
     - _bullets: A list of active Bullet objects fired by the ship.
+    - _particles: The ParticleSystem for debris from destroyed asteroids and UFO hits.
+    - _alienbullets: A list of active Bullet objects fired by alien UFOs.
     - _lives: Integer representing the remaining lives of the player.
-    - _firerate: Tracks the number of frames since the last bullet was fired.
+    - _reloaded: Boolean indicating whether the ship may fire again.
     - _sound: Boolean indicating whether sound effects are enabled.
-    - _UFO: Instance of the UFO class, representing the alien ship.
-    - _UFOlives: Integer representing the remaining lives of the UFO.
-    - _ufolivesimage: List of UFOLives objects, visually representing UFO lives.
+    - _voices: List of Sound objects played in turn, one per voice allowed.
+    - _voice: Index of the voice in _voices to play next.
+    - _governor: The Governor setting the quality level, or None for full quality.
+    - _trackers: List of trackers told when each frame and each phase of it starts
+      (such as the AllocationTracker and the Metrics recorder).
+    - _telemetry: The TelemetryWriter given a record of every frame, or None.
+    - _telemetryWave: The number the telemetry writer gave this wave, or None.
+    - _frameTime: The time in seconds since the last frame, for the telemetry.
+    - _tests: The number of collision tests made this frame, counting each bullet
+      against everything it could have hit.
+    - _fleet: A UFOFleet holding every UFO in the wave, including those waiting to spawn.
+    - _ufonodes: List of SceneNode objects, one per UFO in play, each drawing the UFO
+      with UFOLives objects attached that visually represent its lives.
+    - _events: An EventBus collecting this frame's collisions, handed to the consumers
+      (splitting, lives and UFO damage, collision counts) at the end of the frame.
+    - _collisions: List with the number of collisions of each event kind last frame.
+    - _timers: A TimingWheel for everything due a number of frames from now (the next
+      allowed shot, bullet lifetimes, alien fire and the end of the shield). Its frame
+      counts the frames since the wave started.
+    - _world: The StreamingWorld holding the camera and the dormant asteroids when the
+      wave is in a large world (a "world" size in the JSON data), or None if the wave
+      is one wrapping screen.
 
     METHODS:
     - getLives: Returns the current number of player lives.
     - getUFOLives: Returns the current number of UFO lives.
+    - getCollisionCounts: Returns the number of collisions of each kind last frame.
     - __init__: Initializes the wave, creating the ship, asteroids, UFO, and other attributes.
     """
 
@@ -65,10 +99,118 @@ class Wave(object):
         """
         Returns the current number of UFO lives.
 
-        This method allows external access to the UFO's remaining lives, which are
-        represented as an integer between 0 and the maximum value defined by UFO_LIVES.
+        This method allows external access to the remaining lives of the whole UFO
+        fleet, which are represented as the sum of the lives of every UFO in the wave.
         """
-        return self._UFOlives
+        return self._fleet.getTotalLives()
+
+    def getShip(self):
+        """
+        Returns the player's ship, or None if it has been destroyed.
+        """
+        return self._ship
+
+    def getAsteroids(self):
+        """
+        Returns the list of asteroids in the wave.
+
+        The list should not be modified.
+        """
+        return self._asteroids
+
+    def getUFOs(self):
+        """
+        Returns the list of UFOs in play.
+
+        The list should not be modified.
+        """
+        return self._fleet.getUFOs()
+
+    def getThreats(self):
+        """
+        Returns the state of every asteroid and UFO in play as a numpy array.
+
+        The array has one row per object: (x, y, vel_x, vel_y, radius), with
+        the asteroids first and then the UFOs.
+        """
+        ufos = self._fleet.getUFOs()
+        threats = np.empty((len(self._asteroids) + len(ufos), 5))
+        k = 0
+        for ast in self._asteroids:
+            threats[k] = (ast.x, ast.y, ast.getAstVel_x(), ast.getAstVel_y(),
+                          ast.getRadius())
+            k += 1
+        for ufo in ufos:
+            threats[k] = (ufo.x, ufo.y, ufo.getUFOVel_x(), ufo.getUFOVel_y(),
+                          UFO_RADIUS)
+            k += 1
+        return threats
+
+    def setGovernor(self, governor):
+        """
+        Sets the quality governor that limits bullets, pips and sound voices.
+
+        Parameter governor: the governor to follow, or None for full quality
+        Precondition: governor is a Governor or None
+        """
+        self._governor = governor
+
+    def addTracker(self, tracker):
+        """
+        Adds a tracker that is told when each frame and each phase of it starts.
+
+        Parameter tracker: the tracker to add
+        Precondition: tracker has methods frame() and phase(name)
+        """
+        self._trackers.append(tracker)
+
+    def setTelemetry(self, telemetry):
+        """
+        Sets the writer that is given a record of every frame.
+
+        The writer gives the wave a number of its own, so its frames are kept
+        apart from the other waves in the session.
+
+        Parameter telemetry: the telemetry writer, or None to stop recording
+        Precondition: telemetry is a TelemetryWriter or None
+        """
+        self._telemetry = telemetry
+        self._telemetryWave = None if telemetry is None else telemetry.newWave()
+
+    def getBullets(self):
+        """
+        Returns the list of bullets fired by the ship that are still in play.
+        """
+        return self._bullets
+
+    def getAlienBullets(self):
+        """
+        Returns the list of bullets fired by alien UFOs that are still in play.
+        """
+        return self._alienbullets
+
+    def getCollisionTests(self):
+        """
+        Returns the number of collision tests made in the last frame.
+
+        Each bullet is counted against everything it could have hit, and pairs
+        from the bounce broadphase are included.
+        """
+        return self._tests
+
+    def getCollisionCounts(self):
+        """
+        Returns the number of collisions of each kind in the last frame.
+
+        The result is a list indexed by the event kinds in events.py.
+        """
+        return self._collisions
+
+    def getWorld(self):
+        """
+        Returns the large world the wave is in, or None if it is one screen.
+        """
+        return self._world
 
     # INITIALIZER
     def __init__(self, json):
@@ -86,12 +228,20 @@ class Wave(object):
         """
         self._data = json  # Load JSON data for the wave configuration
 
+        # In a large world every asteroid starts dormant, and comes into play
+        # when the camera nears it
+        self._world = None
+        if 'world' in self._data:
+            self._world = self.new_world()
+
         # Initialize the player's ship
         self._ship = self.newShip()
 
         # Initialize the list of asteroids using JSON data
         self._asteroids = []
-        for i in range(len(self._data['asteroids'])):
+        # (a large world holds them dormant instead)
+        count = len(self._data['asteroids']) if self._world is None else 0
+        for i in range(count):
             size_temp = self._data['asteroids'][i]['size']
 
             # Determine asteroid attributes based on size
@@ -116,515 +266,984 @@ class Wave(object):
             )
             self._asteroids.append(temp)
 
-        # Initialize bullets, fire rate, and player lives
+        # Asteroids only bounce off each other if the wave asks for it
+        self._bounce = bool(self._data.get('bounce', False))
+        self._sweep = SortAndSweep()
+
+        # Initialize the frame timers
+        self._timers = TimingWheel()
+
+        # Initialize the collision events and the consumers for each frame
+        self._events = EventBus()
+        self._collisions = [0] * EVENT_KINDS
+        self._events.subscribe(self.on_asteroid_hit, (BULLET_ASTEROID, SHIP_ASTEROID))
+        self._events.subscribe(self.on_ship_hit, (SHIP_ASTEROID, SHIP_UFO, ALIEN_SHIP))
+        self._events.subscribe(self.on_UFO_hit, (BULLET_UFO, SHIP_UFO))
+        self._events.subscribe(self.count_collisions)
+
+        # Initialize asteroid hits, bullets, fire rate, and player lives
+        self._breaks = []
         self._bullets = []
-        self._firerate = 0
+        self._particles = ParticleSystem()
+        self._alienbullets = []
+        self._reloaded = False
+        self._timers.schedule(BULLET_RATE, self.reload)
         self._lives = SHIP_LIVES
 
         # Enable sound by default
         self._sound = True
-
-        # Initialize the UFO and its attributes
-        self._UFO = self.new_UFO()
-        self._UFOlives = UFO_LIVES
-        self._ufolivesimage = []
-
-        # Generate visual indicators for UFO lives
-        self.alienLives_image()
+        self._voices = []
+        self._voice = 0
+        self._governor = None
+        self._trackers = []
+        self._telemetry = None
+        self._telemetryWave = None
+        self._frameTime = 0.0
+        self._tests = 0
+
+        # Initialize the UFO fleet and the visual indicators for UFO lives
+        self._ufonodes = []
+        self._fleet = self.new_fleet()
+        for i in self._fleet.update(self._timers.getFrame()):
+            self.spawn_UFO(i)
 
 
     # UPDATE METHOD TO MOVE THE SHIP, ASTEROIDS, AND BULLETS
-def update(self, input, dt, sound):
-    """
-    Updates the models for the next animation frames.
+    def update(self, input, dt, sound):
+        """
+        Updates the models for the next animation frames.
 
-    Moves the position of everything for just one animation step and
-    resolves collisions (potentially deleting objects).
+        Moves the position of everything for just one animation step and
+        resolves collisions (potentially deleting objects).
 
-    Parameter input: What keys are pressed by the player
-    Precondition: Any key on the keyboard
+        Parameter input: What keys are pressed by the player
+        Precondition: Any key on the keyboard
 
-    Parameter dt: Time in seconds since the last call to update
-    Precondition: dt is an int
+        Parameter dt: Time in seconds since the last call to update
+        Precondition: dt is an int
 
-    Parameter sound: Whether the player has sound on or not.
-    Precondition: sound is a boolean
-    """
-    # Increment the frame counter for bullet firing rate
-    self._firerate += 1
-    # Update the sound setting based on the input parameter
-    self._sound = sound
-
-    # --- UPDATE THE SHIP'S MOVEMENT ---
-    # Ensure the ship exists before applying movement updates
-    if not self._ship == None:
-        # Rotate the ship left when the 'left' key is held
-        if input.is_key_down('left'):
-            self._ship.turn_left()
-        # Rotate the ship right when the 'right' key is held
-        if input.is_key_down('right'):
-            self._ship.turn_right()
-        # Apply thrust to the ship when the 'up' key is held
-        if input.is_key_down('up'):
-            self._ship.apply_thrust()
-
-        # Update the ship's position by adding velocity to its coordinates
-        self._ship.x += self._ship.getShipVel_x()
-        self._ship.y += self._ship.getShipVel_y()
-
-        # Ensure the ship wraps around the screen edges
-        self._ship.x_wrap()
-        self._ship.y_wrap()
-
-        # --- UPDATE THE ASTEROIDS ---
-        # Iterate through each asteroid and update its position
-        for ast in self._asteroids:
-            ast.x += ast.getAstVel_x()  # Add velocity to the x-coordinate
-            ast.y += ast.getAstVel_y()  # Add velocity to the y-coordinate
-            ast.x_wrap()  # Handle x-coordinate wrapping
-            ast.y_wrap()  # Handle y-coordinate wrapping
-
-            # Check for collision between the asteroid and the ship
-            if ast.collision_check(self._ship):
-                # Decrement player lives and break the colliding asteroid
-                self._lives -= 1
-                self.breaking_asteroids(ast, self._ship)
-                # Remove the asteroid from the list and set the ship to None
+        Parameter sound: Whether the player has sound on or not.
+        Precondition: sound is a boolean
+        """
+        for tracker in self._trackers:
+            tracker.frame()
+        self.track('ship')
+        self._tests = 0
+        self._frameTime = dt
+
+        # Advance the frame timers, running everything due this frame
+        self._timers.tick()
+        # Update the sound setting based on the input parameter
+        self._sound = sound
+
+        # --- UPDATE THE SHIP'S MOVEMENT ---
+        # Ensure the ship exists before applying movement updates
+        if not self._ship == None:
+            # Rotate the ship left when the 'left' key is held
+            if input.is_key_down('left'):
+                self._ship.turn_left()
+            # Rotate the ship right when the 'right' key is held
+            if input.is_key_down('right'):
+                self._ship.turn_right()
+            # Apply thrust to the ship when the 'up' key is held
+            if input.is_key_down('up'):
+                self._ship.apply_thrust()
+            # Raise the ship's shield when the 'down' key is pressed
+            if input.is_key_down('down') and self._ship.deploy_shield():
+                self._timers.schedule(SHIELD_TIME, self._ship.lower_shield)
+
+            # Update the ship's position by adding velocity to its coordinates
+            self._ship.x += self._ship.getShipVel_x()
+            self._ship.y += self._ship.getShipVel_y()
+
+            # Ensure the ship wraps around the screen edges
+            self._ship.x_wrap()
+            self._ship.y_wrap()
+
+            # In a large world, the camera follows the ship and asteroids
+            # stream in and out of play around it
+            if self._world is not None:
+                self.track('world')
+                self.follow_ship()
+                self.stream_asteroids()
+
+            # --- UPDATE THE ASTEROIDS ---
+            self.track('asteroids')
+            # Asteroids that hit the ship, removed after the loop
+            hit = []
+            self._tests += len(self._asteroids) + self._fleet.size()
+            # Iterate through each asteroid and update its position
+            for ast in self._asteroids:
+                ast.x += ast.getAstVel_x()  # Add velocity to the x-coordinate
+                ast.y += ast.getAstVel_y()  # Add velocity to the y-coordinate
+                if self._world is None:  # A large world streams them instead
+                    ast.x_wrap()  # Handle x-coordinate wrapping
+                    ast.y_wrap()  # Handle y-coordinate wrapping
+
+                # Check for collision between the asteroid and the ship
+                if ast.collision_check(self._ship):
+                    self._events.emit(SHIP_ASTEROID, self._ship, ast)
+                    hit.append(ast)
+                    # Without a shield the ship is destroyed by the first hit
+                    if not self._ship.isShielded():
+                        break
+            for ast in hit:
                 self._asteroids.remove(ast)
+            if self._bounce:
+                self.bounce_asteroids()
+            if len(hit) > 0 and not self._ship.isShielded():
                 self._ship = None
+                self.end_frame()
                 return
 
-        # Handle collisions between the UFO and the ship if the UFO exists
-        if self._UFO != None:
-            if self.collision_UFO(self._UFO, self._ship):
-                # Decrement player lives and UFO lives on collision
-                self._lives -= 1
+            # Handle collisions between the UFO fleet and the ship
+            # (a shielded ship absorbs these without harm to either)
+            ufo = self.collision_UFO(self._ship)
+            if ufo is not None and not self._ship.isShielded():
+                self._events.emit(SHIP_UFO, self._ship, self._fleet.getUFO(ufo))
                 self._ship = None
-                self._UFOlives -= 1
+                self.end_frame()
                 return
 
-    # --- UPDATE BULLETS ---
-    self.bullet_update(input)
+        # --- UPDATE BULLETS ---
+        self.track('bullet_update')
+        self.bullet_update(input)
 
-    # --- UPDATE UFO ---
-    if self._UFO != None:
-        self._UFO.update_UFO()  # Update the UFO's movement and behavior
-        self.update_UFOLives()  # Update the UFO's lives display
-        if self._UFOlives < 1:
-            self._UFO = None  # Remove the UFO if it has no lives left
+        # --- UPDATE UFOS ---
+        self.track('UFO')
+        # Move the whole fleet, then set up lives displays for new arrivals
+        for i in self._fleet.update(self._timers.getFrame()):
+            self.spawn_UFO(i)
 
+        # --- UPDATE DEBRIS (a cosmetic, so the governor may skip frames) ---
+        interval = 1 if self._governor is None else self._governor.getCosmeticInterval()
+        if self._timers.getFrame() % interval == 0:
+            self._particles.update(interval)
 
-# DRAW METHOD TO DRAW THE SHIP, ASTEROIDS, AND BULLETS
-def draw(self, view):
-    """
-    Method to draw all models to the screen.
-    This method call instructs Python to draw in the window.
+        # --- HAND THIS FRAME'S COLLISIONS TO THE CONSUMERS ---
+        self.end_frame()
 
-    Parameter view: Reference to the window
-    Precondition: an instance of GameApp
-    """
-    # Draw the ship if it exists
-    if self._ship != None:
-        self._ship.draw(view)
 
-    # Iterate through all asteroids and draw each one
-    for i in range(len(self._asteroids)):
-        if i < len(self._asteroids):
-            self._asteroids[i].draw(view)
+    # DRAW METHOD TO DRAW THE SHIP, ASTEROIDS, AND BULLETS
+    def draw(self, view):
+        """
+        Method to draw all models to the screen.
+        This method call instructs Python to draw in the window.
 
-    # Iterate through all bullets and draw each one
-    for j in range(len(self._bullets)):
-        self._bullets[j].draw(view)
+        Parameter view: Reference to the window
+        Precondition: an instance of GameApp
+        """
+        self.track('draw')
 
-    # Draw the UFO if it exists
-    if self._UFO != None:
-        self._UFO.draw(view)
+        # Draw the ship if it exists
+        if self._ship != None:
+            self._ship.draw(view)
 
-    # Draw the UFO's lives display
-    for l in range(len(self._ufolivesimage)):
-        self._ufolivesimage[l].draw(view)
+        # Iterate through all asteroids and draw each one
+        for i in range(len(self._asteroids)):
+            if i < len(self._asteroids):
+                self._asteroids[i].draw(view)
 
+        # Iterate through all bullets and draw each one
+        for j in range(len(self._bullets)):
+            self._bullets[j].draw(view)
+        for bullet in self._alienbullets:
+            bullet.draw(view)
 
-def shoot_bullet(self, x, y, facing, rate):
-    """
-    Method to create a new bullet.
+        # Draw the debris from destroyed asteroids and UFO hits
+        self._particles.draw(view)
 
-    Calculates the starting position of the bullet (the front tip of
-    the ship) by adding the ship's current position to the facing multiplied
-    by the ship's radius (treating the ship as a circle).
-    Calculates the new velocity of the bullet by multiplying the
-    BULLET_SPEED constant by the direction the ship is facing.
-    Each calculation is done by breaking the position or velocity into
-    x and y components.
+        # Draw every UFO in play along with its lives display (unless the
+        # governor is saving time by skipping the pips)
+        pips = self._governor is None or self._governor.getDrawPips()
+        for node in self._ufonodes:
+            node.draw(view, pips)
+        self.track(None)
 
-    The bullet is only created if it has been more than or equal to the
-    allowed number of seconds.
 
-    Parameter x: Current x of the ship
-    Precondition: x is an int or float value
+    def shoot_bullet(self, x, y, facing_x, facing_y, rate):
+        """
+        Method to create a new bullet.
 
-    Parameter y: Current y of the ship
-    Precondition: y is an int or float value
+        Calculates the starting position of the bullet (the front tip of
+        the ship) by adding the ship's current position to the facing multiplied
+        by the ship's radius (treating the ship as a circle).
+        Calculates the new velocity of the bullet by multiplying the
+        BULLET_SPEED constant by the direction the ship is facing.
+        Each calculation is done by breaking the position or velocity into
+        x and y components.
 
-    Parameter facing: The direction the ship is facing
-    Precondition: facing is a Vector2 object
+        The bullet is only created if the ship has reloaded and, when the
+        governor caps them, there are fewer live bullets than the cap. Firing schedules
+        the reload rate frames from now, and schedules the bullet to expire
+        on the frame it leaves the game area.
 
-    Parameter rate: The number of seconds the object needs to wait before
-    firing a bullet.
-    Precondition: rate is an int
-    """
-    # Check if enough time has passed to allow firing a new bullet
-    if self._firerate >= rate:
-        self._firerate = 0  # Reset the firing rate counter
-
-        # Calculate the bullet's starting position
-        new_x = x + facing.x * SHIP_RADIUS
-        new_y = y + facing.y * SHIP_RADIUS
-
-        # Calculate the bullet's velocity based on its direction
-        new_vel_x = facing.x * BULLET_SPEED
-        new_vel_y = facing.y * BULLET_SPEED
-
-        # Create a new bullet object and add it to the bullets list
-        new_bullet = Bullet(
-            x=new_x,
-            y=new_y,
-            vel_x=new_vel_x,
-            vel_y=new_vel_y,
-            fillcolor=BULLET_COLOR
-        )
-        self._bullets.append(new_bullet)
+        Parameter x: Current x of the ship
+        Precondition: x is an int or float value
+
+        Parameter y: Current y of the ship
+        Precondition: y is an int or float value
+
+        Parameter facing_x: The x component of the direction the ship is facing
+        Precondition: facing_x is a float
+
+        Parameter facing_y: The y component of the direction the ship is facing
+        Precondition: facing_y is a float
+
+        Parameter rate: The number of frames the object needs to wait before
+        firing a bullet.
+        Precondition: rate is an int
+        """
+        # Check if the ship has reloaded since the last bullet
+        cap = None if self._governor is None else self._governor.getBulletCap()
+        if self._reloaded and (cap is None or len(self._bullets) < cap):
+            self._reloaded = False
+            self._timers.schedule(rate, self.reload)
+
+            # Calculate the bullet's starting position
+            new_x = x + facing_x * SHIP_RADIUS
+            new_y = y + facing_y * SHIP_RADIUS
+
+            # Calculate the bullet's velocity based on its direction
+            new_vel_x = facing_x * BULLET_SPEED
+            new_vel_y = facing_y * BULLET_SPEED
+
+            # Create a new bullet object and add it to the bullets list
+            new_bullet = Bullet(
+                x=new_x,
+                y=new_y,
+                vel_x=new_vel_x,
+                vel_y=new_vel_y,
+                fillcolor=BULLET_COLOR
+            )
+            self._bullets.append(new_bullet)
+            # (in a large world the camera moves, so stream_asteroids removes them)
+            if self._world is None:
+                self._timers.schedule(self.bullet_lifetime(new_bullet),
+                                      self.expire_bullet, new_bullet, self._bullets)
+
+            # Play the bullet sound effect if sound is enabled
+            if self._sound:
+                self.play_sound()
+
+    def play_sound(self):
+        """
+        Method to play the bullet sound effect on the next free voice.
+
+        There are only as many voices as the governor allows. They are used
+        in turn, so when every voice is busy the oldest sound is restarted
+        instead of a new one being started alongside it.
+        """
+        voices = SOUND_VOICES if self._governor is None else self._governor.getVoices()
+        while len(self._voices) < voices:
+            self._voices.append(getSound(BULLET_SOUND, len(self._voices)))
+        if len(self._voices) > voices:
+            del self._voices[voices:]
+        self._voice = (self._voice + 1) % voices
+        self._voices[self._voice].play()
+
+    def bounce_asteroids(self):
+        """
+        Method to bounce asteroids that touch each other off one another.
+
+        Candidate pairs come from the sort-and-sweep broadphase; each pair is
+        then tested exactly. Touching asteroids that are moving toward each
+        other exchange momentum along the line between their centers, as in an
+        elastic collision with mass proportional to area. Asteroids keep the
+        speed for their size, so only their directions change. Overlapping
+        asteroids are also pushed apart so they do not stick.
+        """
+        pairs = self._sweep.update(self._asteroids)
+        self._tests += len(pairs)
+        for a, b in pairs:
+            ra = a.getRadius()
+            rb = b.getRadius()
+            dx = b.x - a.x
+            dy = b.y - a.y
+            if not overlaps(a.x, a.y, b.x, b.y, ra + rb):
+                continue
+            nx, ny = unit(dx, dy)
+            if nx == 0 and ny == 0:
+                nx = 1.0  # Same center; push apart along x
+
+            # Separate the pair, moving the lighter asteroid further
+            ma = ra * ra
+            mb = rb * rb
+            push = (ra + rb) - (dx*nx + dy*ny)
+            a.x -= nx * push * mb / (ma + mb)
+            a.y -= ny * push * mb / (ma + mb)
+            b.x += nx * push * ma / (ma + mb)
+            b.y += ny * push * ma / (ma + mb)
+
+            # Only bounce if they are moving toward each other
+            avx = a.getAstVel_x()
+            avy = a.getAstVel_y()
+            bvx = b.getAstVel_x()
+            bvy = b.getAstVel_y()
+            closing = (avx - bvx) * nx + (avy - bvy) * ny
+            if closing <= 0:
+                continue
+            impulse = 2 * closing / (ma + mb)
+            a.setAstVel(avx - impulse * mb * nx, avy - impulse * mb * ny)
+            b.setAstVel(bvx + impulse * ma * nx, bvy + impulse * ma * ny)
+
+    def end_frame(self):
+        """
+        Method to hand this frame's collision events to the consumers, then
+        record the frame for the telemetry (if any).
+        """
+        self.track('events')
+        self._events.flush()
+        if self._telemetry is not None:
+            self._telemetry.record(self._telemetryWave, self._timers.getFrame(),
+                self._frameTime, len(self._asteroids),
+                len(self._bullets) + len(self._alienbullets), self._fleet.size(),
+                self._lives, self._fleet.getTotalLives(), sum(self._collisions))
+        self.track(None)
+
+    def track(self, phase):
+        """
+        Method to tell the trackers, if any, that a phase is starting.
+
+        Parameter phase: the name of the phase
+        Precondition: phase is a str, or None at the end of the last phase
+        """
+        for tracker in self._trackers:
+            tracker.phase(phase)
+
+    # CONSUMERS OF COLLISION EVENTS
+    def on_asteroid_hit(self, events):
+        """
+        Method to break up every asteroid hit this frame, leaving debris.
+
+        Parameter events: The asteroid collisions this frame
+        Precondition: events is a list of BULLET_ASTEROID and SHIP_ASTEROID events
+        """
+        for kind, object, asteroid in events:
+            self._particles.emit(asteroid.x, asteroid.y,
+                DEBRIS_COUNT * asteroid.getRadius() // SMALL_RADIUS, DEBRIS_SPEED)
+            self.breaking_asteroids(asteroid, object)
+        self.split_asteroids()
+
+    def on_ship_hit(self, events):
+        """
+        Method to take a player life for every hit on the ship this frame.
+
+        Hits absorbed by the shield cost nothing.
+
+        Parameter events: The ship collisions this frame
+        Precondition: events is a list of SHIP_ASTEROID, SHIP_UFO and ALIEN_SHIP events
+        """
+        for kind, subject, other in events:
+            ship = other if kind == ALIEN_SHIP else subject
+            if not ship.isShielded():
+                self._lives -= 1
+
+    def on_UFO_hit(self, events):
+        """
+        Method to take a UFO life for every hit on a UFO this frame.
+
+        Each hit leaves debris. Hits on a UFO destroyed earlier in the same
+        batch are ignored.
+
+        Parameter events: The UFO collisions this frame
+        Precondition: events is a list of BULLET_UFO and SHIP_UFO events
+        """
+        ufos = self._fleet.getUFOs()
+        for kind, object, ufo in events:
+            self._particles.emit(object.x, object.y, DEBRIS_COUNT, DEBRIS_SPEED)
+            if ufo in ufos:
+                self.damage_UFO(ufos.index(ufo))
+
+    def count_collisions(self, events):
+        """
+        Method to count the collisions of each kind this frame.
+
+        Parameter events: Every collision this frame
+        Precondition: events is a list of events
+        """
+        counts = [0] * EVENT_KINDS
+        for event in events:
+            counts[event[0]] += 1
+        self._collisions = counts
+
+    def reload(self):
+        """
+        Method to allow the ship to fire again.
+        """
+        self._reloaded = True
+
+    def bullet_lifetime(self, bullet):
+        """
+        Method to compute the number of frames until a bullet leaves the game.
+
+        A bullet moves in a straight line at a fixed velocity, so the frame
+        it passes the dead zone around the screen is known when it is fired.
+
+        Parameter bullet: The bullet that was fired
+        Precondition: bullet is a Bullet object with a nonzero velocity
+        """
+        frames = float('inf')
+        vel_x = bullet.getvel_x()
+        vel_y = bullet.getvel_y()
+        if vel_x > 0:
+            frames = min(frames, (GAME_WIDTH + DEAD_ZONE - bullet.x) / vel_x)
+        elif vel_x < 0:
+            frames = min(frames, (-DEAD_ZONE - bullet.x) / vel_x)
+        if vel_y > 0:
+            frames = min(frames, (GAME_HEIGHT + DEAD_ZONE - bullet.y) / vel_y)
+        elif vel_y < 0:
+            frames = min(frames, (-DEAD_ZONE - bullet.y) / vel_y)
+        return int(frames) + 1
+
+    def expire_bullet(self, bullet, bullets):
+        """
+        Method to remove a bullet that has left the game area.
 
-        # Play the bullet sound effect if sound is enabled
-        if self._sound:
-            pewSound = Sound('pew1.wav')
-            pewSound.play()
+        Nothing happens if the bullet was already removed by a collision.
+
+        Parameter bullet: The bullet to remove
+        Precondition: bullet is a Bullet object
+
+        Parameter bullets: The list the bullet was added to
+        Precondition: bullets is self._bullets or self._alienbullets
+        """
+        if bullet in bullets:
+            bullets.remove(bullet)
 
     # HELPER METHODS FOR PHYSICS AND COLLISION DETECTION
 
-    def new_asteroid(self, size, radius, vel, x_old, y_old, source):
-    """
-    Method to create a new asteroid
+    def breaking_asteroids(self, asteroid, object):
+        """
+        Method to record that the given asteroid was hit and must be split.
+
+        The asteroid is not split right away. Every hit in a frame is collected
+        in the _breaks attribute, and split_asteroids then breaks them all in
+        one batch. Small asteroids do not break further, so nothing is recorded
+        for them.
+
+        The collision vector is recorded with the hit. If the collision is with
+        the ship, then the collision vector is the unit vector for the ship
+        velocity, unless the ship is standing still; then we use the facing
+        vector instead. If the collision is with a bullet, then it is the unit
+        vector for the bullet velocity.
+
+        Parameter asteroid: The Asteroid involved in the collision
+        Precondition: asteroid is an Asteroid object in the wave object's
+        attribute _asteroids
+
+        Parameter object: The object the asteroid collided with
+        Precondition: object is either a Bullet object in the wave object's
+        attribute _bullets or is wave's Ship object
+        """
+        if asteroid.getSize() == 'small':
+            return  # Small asteroids do not break further
+
+        # Determine the collision vector based on the object type
+        if isinstance(object, Ship):  # If the object is a Ship
+            vel_x = object.getShipVel_x()
+            vel_y = object.getShipVel_y()
+            if vel_x == 0 and vel_y == 0:  # If the ship is stationary
+                vel_x = object.getFacing_x()  # Use the ship's facing direction
+                vel_y = object.getFacing_y()
+        else:  # The object is a Bullet
+            vel_x = object.getvel_x()
+            vel_y = object.getvel_y()
+
+        # Normalize the collision vector to get a unit vector
+        dir_x, dir_y = unit(vel_x, vel_y)
+        self._breaks.append((asteroid.x, asteroid.y, asteroid.getSize(), dir_x, dir_y))
+
+    def split_asteroids(self):
+        """
+        Method to split every asteroid hit this frame into three smaller ones.
+
+        The positions and directions of all of the new asteroids are computed
+        together: the collision vectors of every hit are rotated by 0, 120 and
+        240 degrees in one array operation, and each new center is the old
+        center plus the new radius along its direction. The new asteroids are
+        then added to the _asteroids attribute all at once, so a frame with
+        many hits costs about the same as a frame with one.
+        """
+        if len(self._breaks) == 0:
+            return
+
+        hits = np.array([(b[0], b[1], b[3], b[4]) for b in self._breaks])
+        large = [b[2] == 'large' for b in self._breaks]
+        self._breaks = []
+
+        # Large asteroids break into medium ones, and medium into small ones
+        radius = np.where(large, MEDIUM_RADIUS, SMALL_RADIUS)[:, None, None]
+        dirs = split_directions(hits[:, 2:4])
+        centers = hits[:, None, 0:2] + radius * dirs
+
+        new_asteroids = []
+        for k in range(len(large)):
+            if large[k]:
+                new_size, new_radius, new_image = 'medium', MEDIUM_RADIUS, MEDIUM_IMAGE
+            else:
+                new_size, new_radius, new_image = 'small', SMALL_RADIUS, SMALL_IMAGE
+            for (x, y), (dir_x, dir_y) in zip(centers[k].tolist(), dirs[k].tolist()):
+                new_asteroids.append(Asteroid(x = x, y = y, size = new_size,
+                    width = 2 * new_radius, height = 2 * new_radius,
+                    direction = [dir_x, dir_y], source = new_image))
+        self._asteroids.extend(new_asteroids)
+
+    def newShip(self, x=None, y=None):
+        """
+        Method to create a new Ship object.
 
-    Calculates the center for the asteroid after it was broken off of a
-    bigger asteroid. Uses the old center and adds it to the components
-    of the resultant vector multiplied by the radius of the new asteroid.
-    The direction of the new asteroid is the same as the direction of the
-    given resultant vector.
+        Creates ship using data from wave object's _data attribute, unless a
+        position is given.
+        NOTE: The given angle in _data is in degrees. Convert the angle to degrees
+        to radians.
 
-    Parameter size: Size of the new asteroid
-    Precondition: one size smaller than the asteroid before it and is a
-    valid asteroid size ('small', 'medium', or 'large')
+        Parameter x: The x coordinate of the ship, or None for the one in _data
+        Precondition: x is an int, float or None
 
-    Parameter radius: Radius of the new asteroid
-    Precondition: radius is an int that is a valid asteroid radius
-    (SMALL_RADIUS, MEDIUM_RADIUS, LARGE_RADIUS)
+        Parameter y: The y coordinate of the ship, or None for the one in _data
+        Precondition: y is an int, float or None
+        """
+        if x is None:
+            x = self.start_position()[0]  # X-coordinate from data
+        if y is None:
+            y = self.start_position()[1]  # Y-coordinate from data
+
+        # Create a new Ship object with the provided position, angle, and dimensions
+        return Ship(
+            x = x,
+            y = y,
+            angle = math.radians(self._data['ship']['angle']),  # Convert angle to radians
+            width = 2 * SHIP_RADIUS,  # Set the ship's width
+            height = 2 * SHIP_RADIUS,  # Set the ship's height
+            source = SHIP_IMAGE  # Use the ship's image source
+        )
 
-    Parameter vel: Resultant vector of an object colliding with an asteroid
-    Precondition: vel is a Vector2 object
+    def respawn(self):
+        """
+        Method to replace a destroyed ship with a new one.
 
-    Parameter x_old: X coordinate of the center of the asteroid that is
-    being broken
-    Precondition: x is an int or float
+        The new ship is placed at the safe spot closest to the ship position
+        in _data (see safe_spawn).
+        """
+        x, y = self.safe_spawn()
+        self._ship = self.newShip(x, y)
 
-    Parameter y_old: Y coordinate of the center of the asteroid that is
-    being broken
-    Precondition: y is an int or float
+    def safe_spawn(self):
+        """
+        Method to find the safest place near the start position for a new ship.
+
+        The screen is covered by a grid with cells RESPAWN_GRID pixels apart.
+        For every cell, the danger from every asteroid and UFO is computed at
+        once: the wrap-aware distance to it and the number of frames until it
+        would hit a ship sitting still in that cell. A cell is safe if nothing
+        hits it for RESPAWN_SAFE_TIME frames. This returns the (x, y) of the
+        safe cell closest to the ship position in _data, or of the cell that
+        stays clear the longest if no cell is safe.
+
+        The cells are scored nearest first, in blocks of RESPAWN_BLOCK, so in
+        the usual case only the first block is ever computed.
+        """
+        start_x, start_y = self.start_position()
+        threats = self.getThreats()
+        if len(threats) == 0:
+            return (start_x, start_y)
+
+        # A large world wraps at its own size, far beyond anything in play
+        period_x = GAME_WIDTH + 2 * DEAD_ZONE
+        period_y = GAME_HEIGHT + 2 * DEAD_ZONE
+        if self._world is not None:
+            period_x = self._world.getWidth()
+            period_y = self._world.getHeight()
+
+        # The candidate cells, nearest to the start position first
+        xs, ys = np.meshgrid(np.arange(RESPAWN_GRID / 2, GAME_WIDTH, RESPAWN_GRID),
+                             np.arange(RESPAWN_GRID / 2, GAME_HEIGHT, RESPAWN_GRID))
+        cells_x = np.concatenate(([start_x], xs.ravel()))
+        cells_y = np.concatenate(([start_y], ys.ravel()))
+        dist_x = wrapped_delta(cells_x - start_x, period_x)
+        dist_y = wrapped_delta(cells_y - start_y, period_y)
+        order = np.argsort(dist_x*dist_x + dist_y*dist_y, kind='stable')
+        cells_x = cells_x[order]
+        cells_y = cells_y[order]
+
+        # Score the cells a block at a time (one row per cell, one column per
+        # threat), stopping at the first block with a safe cell in it
+        best = 0
+        best_clear = -1.0
+        for start in range(0, len(cells_x), RESPAWN_BLOCK):
+            block_x = cells_x[start:start + RESPAWN_BLOCK, None]
+            block_y = cells_y[start:start + RESPAWN_BLOCK, None]
+            dx = wrapped_delta(threats[:, 0] - block_x, period_x)
+            dy = wrapped_delta(threats[:, 1] - block_y, period_y)
+            vx = np.broadcast_to(threats[:, 2], dx.shape)
+            vy = np.broadcast_to(threats[:, 3], dx.shape)
+            clear = time_to_contact(dx, dy, vx, vy, threats[:, 4] + SHIP_RADIUS).min(axis=1)
+
+            safe = np.flatnonzero(clear >= RESPAWN_SAFE_TIME)
+            if len(safe) > 0:
+                best = start + int(safe[0])
+                break
+            if clear.max() > best_clear:
+                best = start + int(np.argmax(clear))
+                best_clear = float(clear.max())
+        return (float(cells_x[best]), float(cells_y[best]))
+
+    # HELPER METHODS FOR A LARGE WORLD
+
+    def new_world(self):
+        """
+        Method that creates the large world for the wave, with every asteroid
+        in it dormant.
 
-    Parameter source: The image name for the associated object
-    Precondition: source is a valid Asteroid image (SMALL_IMAGE,
-    MEDIUM_IMAGE, LARGE_IMAGE)
-    """
-    # Creates a new Asteroid object with the specified parameters
-    return Asteroid(
-        # Calculate the new x-coordinate using the radius and velocity's x-component
-        x = (radius * vel.x) + x_old,
-        # Calculate the new y-coordinate using the radius and velocity's y-component
-        y = (radius * vel.y) + y_old,
-        # Set the size of the new asteroid
-        size = size,
-        # The width is twice the radius (diameter of the asteroid)
-        width = 2 * radius,
-        # The height is also twice the radius
-        height = 2 * radius,
-        # The direction is defined by the velocity components
-        direction = [vel.x, vel.y],
-        # The image source for the asteroid is passed as a parameter
-        source = source
-    )
-
-def rotate_vector(self, vector, angle):
-    """
-    Method to rotate vector by angle.
+        The world size comes from self._data['world'] as [width, height]. In a
+        large world, the asteroid and ship positions in _data are world
+        positions, and each asteroid moves in its own direction. The camera
+        starts with the ship in the middle of the screen.
+        """
+        width, height = self._data['world']
+        start = self._data['ship']['position']
+        world = StreamingWorld(width, height, start[0], start[1])
+        rows = []
+        for entry in self._data['asteroids']:
+            size = WORLD_SIZES.index(entry['size'])
+            speed = (SMALL_SPEED, MEDIUM_SPEED, LARGE_SPEED)[size]
+            vel_x, vel_y = scaled(entry['direction'][0], entry['direction'][1], speed)
+            rows.append((entry['position'][0], entry['position'][1], vel_x, vel_y, size))
+        world.add(np.array(rows, dtype=float).reshape(-1, 5), 0)
+        return world
+
+    def new_asteroid(self, x, y, size, vel_x, vel_y):
+        """
+        Method that creates an asteroid of the given size and velocity.
 
-    The vector result is the resultant vector for the asteroids that
-    are a result of an asteroid being broken.
+        Parameter x: x coordinate of the asteroid
+        Precondition: x is an int or float
 
-    Parameter vector: Vector to be rotated
-    Precondition: vector is a Vector2 object
+        Parameter y: y coordinate of the asteroid
+        Precondition: y is an int or float
 
-    Parameter angle: The angle the vector needs to be rotated by
-    Precondition: angle is an int or float
-    NOTE: angle should be in radians
-    """
-    # Calculate the cosine and sine of the angle
-    cos_theta = math.cos(angle)
-    sin_theta = math.sin(angle)
+        Parameter size: size of the asteroid
+        Precondition: size is a str ('small', 'medium', or 'large')
 
-    # Return the rotated vector using the standard 2D rotation formula
-    return introcs.Vector2(
-        vector.x * cos_theta - vector.y * sin_theta,  # x' = x*cosθ - y*sinθ
-        vector.x * sin_theta + vector.y * cos_theta   # y' = x*sinθ + y*cosθ
-    )
+        Parameter vel_x: x component of the velocity
+        Precondition: vel_x is an int or float
 
-def breaking_asteroids(self, asteroid, object):
-    """
-    Method to split the given asteroid into three smaller asteroids. If the
-    asteroid is already the smallest size, nothing happens.
-
-    Add the new asteroids to the _asteroids attribute of the wave object.
-    Position of each new asteroid is calculated using the collision vector.
-    If the collision is with the ship, then the collision vector is the
-    unit vector for the ship velocity, unless the ship is standing still;
-    then we use the facing vector instead. If the collision is with a
-    bullet, then it is the unit vector for the bullet velocity.
-
-    Parameter asteroid: The Asteroid involved in the collision
-    Precondition: asteroid is an Asteroid object in the wave object's
-    attribute _asteroids
-
-    Parameter object: The object the asteroid collided with
-    Precondition: object is either a Bullet object in the wave object's
-    attribute _bullets or is wave's Ship object
-    """
-    # Store the old coordinates of the asteroid
-    x_old = asteroid.x
-    y_old = asteroid.y
-
-    # Determine the collision vector based on the object type
-    if isinstance(object, Ship):  # If the object is a Ship
-        velocity = object.getShipVel()  # Get the ship's velocity
-        if velocity == Vector2(0.0, 0.0):  # If the ship is stationary
-            velocity = self._ship.getFacing()  # Use the ship's facing direction
-    if isinstance(object, Bullet):  # If the object is a Bullet
-        velocity = object.getBulletVel()  # Get the bullet's velocity
-
-    # Normalize the collision vector to get a unit vector
-    velocity.normalize()
-    angle = math.radians(120)  # Define the angle for splitting (120 degrees)
-
-    # Rotate the velocity vector to create the directions for the new asteroids
-    v1 = self.rotate_vector(velocity, angle)  # First direction
-    v1.normalize()
-    v2 = self.rotate_vector(velocity, 2 * angle)  # Second direction
-    v2.normalize()
-    v3 = velocity  # Third direction remains unchanged
-
-    # Determine the size, radius, and image of the new asteroids based on the original size
-    if asteroid.getSize() == 'large':
-        new_size = 'medium'
-        new_radius = MEDIUM_RADIUS
-        new_image = MEDIUM_IMAGE
-    elif asteroid.getSize() == 'medium':
-        new_size = 'small'
-        new_radius = SMALL_RADIUS
-        new_image = SMALL_IMAGE
-    else:
-        return  # Small asteroids do not break further
-
-    # Create three new asteroids with the calculated attributes
-    new_asteroids = [
-        self.new_asteroid(new_size, new_radius, v1, x_old, y_old, new_image),
-        self.new_asteroid(new_size, new_radius, v2, x_old, y_old, new_image),
-        self.new_asteroid(new_size, new_radius, v3, x_old, y_old, new_image)
-    ]
-
-    # Add the new asteroids to the wave's list of asteroids
-    self._asteroids.extend(new_asteroids)
-
-def newShip(self):
-    """
-    Method to create a new Ship object.
+        Parameter vel_y: y component of the velocity
+        Precondition: vel_y is an int or float
+        """
+        if size == 'small':
+            radius, source = SMALL_RADIUS, SMALL_IMAGE
+        elif size == 'medium':
+            radius, source = MEDIUM_RADIUS, MEDIUM_IMAGE
+        else:
+            radius, source = LARGE_RADIUS, LARGE_IMAGE
+        return Asteroid(x = x, y = y, size = size, width = 2 * radius,
+                        height = 2 * radius, direction = [vel_x, vel_y], source = source)
 
-    Creates ship using data from wave object's _data attribute
-    NOTE: The given angle in _data is in degrees. Convert the angle to degrees
-    to radians.
-    """
-    # Create a new Ship object with the provided position, angle, and dimensions
-    return Ship(
-        x = self._data['ship']['position'][0],  # X-coordinate from data
-        y = self._data['ship']['position'][1],  # Y-coordinate from data
-        angle = math.radians(self._data['ship']['angle']),  # Convert angle to radians
-        width = 2 * SHIP_RADIUS,  # Set the ship's width
-        height = 2 * SHIP_RADIUS,  # Set the ship's height
-        source = SHIP_IMAGE  # Use the ship's image source
-    )
-
-def checkAsteroids(self):
-    """
-    Method to check if there are any asteroids left in the wave.
+    def start_position(self):
+        """
+        Method that returns the (x, y) on screen where the ship starts.
 
-    Returns False if there are no asteroids left. Returns True otherwise.
-    """
-    # Return False if the list of asteroids is empty, True otherwise
-    if self._asteroids == []:
-        return False
-    return True
+        This is the ship position in _data, except in a large world, where
+        the camera keeps the ship in the middle of the screen.
+        """
+        if self._world is not None:
+            return (GAME_WIDTH / 2, GAME_HEIGHT / 2)
+        return (self._data['ship']['position'][0], self._data['ship']['position'][1])
 
-def checkShip(self):
-    """
-    Method to check if there is a Ship left in the wave.
+    def follow_ship(self):
+        """
+        Method to move the camera of a large world to keep the ship in the
+        middle of the screen.
 
-    Returns False is there is no Ship. Returns True otherwise.
-    """
-    # Return False if the ship object is None, True otherwise
-    if self._ship == None:
-        return False
-    return True
+        Everything in play is in screen coordinates, so moving the camera
+        moves the ship, asteroids, bullets, UFOs and debris the other way.
+        """
+        dx = self._ship.x - GAME_WIDTH / 2
+        dy = self._ship.y - GAME_HEIGHT / 2
+        if dx == 0 and dy == 0:
+            return
+        self._world.shift(dx, dy)
+        self._ship.x -= dx
+        self._ship.y -= dy
+        for group in (self._asteroids, self._bullets, self._alienbullets):
+            for obj in group:
+                obj.x -= dx
+                obj.y -= dy
+        self._fleet.shift(-dx, -dy)
+        self._particles.shift(-dx, -dy)
+
+    def stream_asteroids(self):
+        """
+        Method to move asteroids between play and the dormant chunks of a
+        large world.
+
+        Asteroids further than STREAM_DORMANT from the middle of the screen go
+        dormant, and dormant asteroids closer than STREAM_ACTIVE come into play
+        (the gap keeps an asteroid on the edge from going back and forth).
+        Bullets that have left the screen are removed here too, since in a
+        large world the camera moves and their lifetime is not known when
+        they are fired.
+        """
+        frame = self._timers.getFrame()
+        far = []
+        near = []
+        for ast in self._asteroids:
+            if overlaps(ast.x, ast.y, GAME_WIDTH / 2, GAME_HEIGHT / 2, STREAM_DORMANT):
+                near.append(ast)
+            else:
+                far.append(ast)
+        if len(far) > 0:
+            self._world.bury([(ast.x, ast.y, ast.getAstVel_x(), ast.getAstVel_y(),
+                               WORLD_SIZES.index(ast.getSize())) for ast in far], frame)
+            self._asteroids[:] = near
+        for x, y, vel_x, vel_y, size in self._world.wake(frame).tolist():
+            self._asteroids.append(self.new_asteroid(x, y, WORLD_SIZES[int(size)],
+                                                     vel_x, vel_y))
+        self._world.refresh(frame)
+
+        for bullets in (self._bullets, self._alienbullets):
+            bullets[:] = [bullet for bullet in bullets
+                          if -DEAD_ZONE <= bullet.x <= GAME_WIDTH + DEAD_ZONE and
+                          -DEAD_ZONE <= bullet.y <= GAME_HEIGHT + DEAD_ZONE]
+
+    def checkAsteroids(self):
+        """
+        Method to check if there are any asteroids left in the wave.
 
-def checkUFO(self):
-    """
-    Method to check if the UFO exists.
+        Returns False if there are no asteroids left. Returns True otherwise.
+        """
+        # Return False if the list of asteroids is empty, True otherwise
+        if self._asteroids == []:
+            # In a large world, there may still be dormant asteroids
+            return self._world is not None and self._world.size() > 0
+        return True
 
-    Returns False if there is no UFO. Returns True otherwise.
-    """
-    # Return False if the UFO object is None, True otherwise
-    if self._UFO == None:
-        return False
-    return True
+    def checkShip(self):
+        """
+        Method to check if there is a Ship left in the wave.
+
+        Returns False is there is no Ship. Returns True otherwise.
+        """
+        # Return False if the ship object is None, True otherwise
+        if self._ship == None:
+            return False
+        return True
+
+    def checkUFO(self):
+        """
+        Method to check if any UFO is left in the wave.
+
+        Returns False if there are no UFOs in play or waiting to spawn.
+        Returns True otherwise.
+        """
+        # Return False if the fleet is empty, True otherwise
+        if self._fleet.isEmpty():
+            return False
+        return True
 
     def bullet_update(self, input):
-    """
-    Method to move and update Bullet.
+        """
+        Method to move and update Bullet.
 
-    Parameter input: What keys are pressed by the player
-    Precondition: Any key on the keyboard
-    """
-    if self._ship != None:  # Ensure the ship exists before updating bullets
-        if input.is_key_down('spacebar'):  # Check if the spacebar is pressed
-            facing = self._ship.getFacing()  # Get the ship's current facing direction
-            # Shoot a new bullet from the ship's current position in the facing direction
-            self.shoot_bullet(self._ship.x, self._ship.y, facing, BULLET_RATE)
-        # Update the position of each bullet based on its velocity
-        for i in range(len(self._bullets)):
-            self._bullets[i].x += self._bullets[i].getvel_x()  # Update x-coordinate
-            self._bullets[i].y += self._bullets[i].getvel_y()  # Update y-coordinate
-    i = 0
-    while i < len(self._bullets):  # Loop through the bullets to check for collisions
-        bullet = self._bullets[i]  # Get the current bullet
-        # Check if the bullet is outside the game area (dead zone)
-        if (bullet.x < -DEAD_ZONE or bullet.x > GAME_WIDTH + DEAD_ZONE or
-            bullet.y < -DEAD_ZONE or bullet.y > GAME_HEIGHT + DEAD_ZONE):
-            del self._bullets[i]  # Remove the bullet if it's out of bounds
-        else:
+        Parameter input: What keys are pressed by the player
+        Precondition: Any key on the keyboard
+        """
+        if self._ship != None:  # Ensure the ship exists before updating bullets
+            if input.is_key_down('spacebar'):  # Check if the spacebar is pressed
+                # Shoot a new bullet from the ship's current position in the facing direction
+                self.shoot_bullet(self._ship.x, self._ship.y, self._ship.getFacing_x(),
+                                  self._ship.getFacing_y(), BULLET_RATE)
+            # Update the position of each bullet based on its velocity
+            for i in range(len(self._bullets)):
+                self._bullets[i].x += self._bullets[i].getvel_x()  # Update x-coordinate
+                self._bullets[i].y += self._bullets[i].getvel_y()  # Update y-coordinate
+        # Bullets that leave the game area are removed by their expiry timers
+        i = 0
+        while i < len(self._bullets):  # Loop through the bullets to check for collisions
+            bullet = self._bullets[i]  # Get the current bullet
+            self._tests += len(self._asteroids) + self._fleet.size()
             coll = False  # Initialize collision flag as False
             # Check for collisions between the bullet and asteroids
             for asteroid in self._asteroids:
                 if asteroid.collision_check(bullet):  # Collision detected
                     self._asteroids.remove(asteroid)  # Remove the collided asteroid
                     self._bullets.remove(bullet)  # Remove the bullet
-                    self.breaking_asteroids(asteroid, bullet)  # Break the asteroid into smaller ones
+                    self._events.emit(BULLET_ASTEROID, bullet, asteroid)
                     coll = True  # Set collision flag to True
                     break  # Exit the asteroid loop since collision occurred
-            # Check for collisions between the bullet and the UFO
-            if self._UFO != None:
-                if self.collision_UFO(self._UFO, bullet):  # Collision detected with UFO
+            # Check for collisions between the bullet and the UFO fleet
+            if not coll:
+                ufo = self.collision_UFO(bullet)
+                if ufo is not None:  # Collision detected with a UFO
                     self._bullets.remove(bullet)  # Remove the bullet
-                    self._UFOlives -= 1  # Decrease UFO's lives by 1
-                    if self._UFOlives >= 0:  # If UFO still has lives left
-                        del self._ufolivesimage[-1]  # Remove one life image
+                    self._events.emit(BULLET_UFO, bullet, self._fleet.getUFO(ufo))
                     coll = True  # Set collision flag to True
             if not coll:  # If no collision occurred, move to the next bullet
                 i += 1
 
-def new_UFO(self):
-    """
-    Method that creates a new UFO object.
+        # Move the alien bullets and check them against the ship
+        if self._ship != None:
+            self._tests += len(self._alienbullets)
+        for bullet in self._alienbullets[:]:
+            bullet.x += bullet.getvel_x()
+            bullet.y += bullet.getvel_y()
+            if self._ship != None and overlaps(bullet.x, bullet.y, self._ship.x,
+                    self._ship.y, bullet.getRadius() + self._ship.getRadius()):
+                self._alienbullets.remove(bullet)
+                self._events.emit(ALIEN_SHIP, bullet, self._ship)
+                # The shield absorbs the hit; otherwise the ship is destroyed
+                if not self._ship.isShielded():
+                    self._ship = None
+
+    def new_fleet(self):
+        """
+        Method that creates the UFO fleet for the wave.
 
-    Detects whether self._data says that the UFO has an alien or not.
-    Sets the source accordingly.
-    The starting x and y coordinates for the position of the UFO is random.
-    If there is no UFO in self._data, then the method returns None.
-    """
-    if "UFO" in self._data:  # Check if UFO data exists
-        alien = bool(self._data['UFO']['alien'])  # Determine if the UFO has an alien
-        print(alien)  # Debug: Print alien status
-        if alien == False:  # UFO without alien
-            print('no alien')  # Debug: Print message
-            return UFO(
-                x = random.randrange(GAME_WIDTH),  # Random x-coordinate
-                y = random.randrange(GAME_HEIGHT),  # Random y-coordinate
-                source = UFO_IMAGE  # Use non-alien UFO image
-            )
-        elif alien == True:  # UFO with alien
-            print(self._data['UFO']['alien'])  # Debug: Print alien data
-            print('alien')  # Debug: Print message
+        The UFOs come from self._data['UFOs'], a list with one entry per UFO.
+        The older format, a single object (or a list) under self._data['UFO'],
+        is also accepted. If there are no UFOs in self._data, then the fleet
+        is empty.
+        """
+        fleet = UFOFleet()
+        if 'UFOs' in self._data:
+            entries = self._data['UFOs']
+        elif 'UFO' in self._data:
+            entries = self._data['UFO']
+        else:
+            entries = []
+        if isinstance(entries, dict):  # A single UFO in the older format
+            entries = [entries]
+
+        for entry in entries:
+            fleet.add(self.new_UFO(entry),
+                      lives = entry.get('lives', UFO_LIVES),
+                      spawn = entry.get('spawn', 0))
+        return fleet
+
+    def new_UFO(self, entry):
+        """
+        Method that creates a new UFO object.
+
+        Detects whether the entry says that the UFO has an alien or not.
+        Sets the source accordingly.
+        The starting x and y coordinates for the position of the UFO is random.
+
+        Parameter entry: the description of the UFO from the wave data
+        Precondition: entry is a dictionary with an 'alien' key
+        """
+        alien = bool(entry.get('alien', False))  # Determine if the UFO has an alien
+        if alien:  # UFO with alien
             return AlienUFO(
                 x = random.randrange(GAME_WIDTH),  # Random x-coordinate
                 y = random.randrange(GAME_HEIGHT),  # Random y-coordinate
                 source = UFOalien_IMAGE  # Use alien UFO image
             )
-    else:
-        return None  # No UFO data found
+        return UFO(
+            x = random.randrange(GAME_WIDTH),  # Random x-coordinate
+            y = random.randrange(GAME_HEIGHT),  # Random y-coordinate
+            source = UFO_IMAGE  # Use non-alien UFO image
+        )
 
-def collision_UFO(self, ufo, object):
-    """
-    Method that detects whether there has been a collision between a UFO and
-    another object.
+    def collision_UFO(self, object):
+        """
+        Method that detects whether there has been a collision between a UFO
+        in the fleet and another object.
 
-    Calculates the distance between the UFO and object and compares it
-    to the sum of the radii of the UFO and object. If the distance is
-    smaller than the sum of the radii, then the collision occurred; this
-    returns True. Otherwise, returns False
+        The fleet compares the distance between every UFO and the object to
+        the sum of their radii in one step, using the object's own collision
+        radius. Returns the index of the UFO that was hit, or None if no
+        collision occurred.
 
-    Parameter object: object being checked whether it collided with the UFO
-    Precondition: object is a Ship or Bullet
-    """
-    # Calculate the x and y differences between the UFO and the object
-    x_diff = ufo.x - object.x
-    y_diff = ufo.y - object.y
-    # Calculate the Euclidean distance between the UFO and the object
-    distance = math.sqrt(x_diff**2 + y_diff**2)
-    if isinstance(object, Ship):  # Check collision with a Ship
-        if distance < UFO_RADIUS + SHIP_RADIUS:  # Check if distance is less than combined radii
-            return True
-    elif isinstance(object, Bullet):  # Check collision with a Bullet
-        if distance < UFO_RADIUS + BULLET_RADIUS:  # Check if distance is less than combined radii
-            return True
-    return False  # No collision occurred
-
-def alienLives_image(self):
-    """
-    Method that creates the objects representing the UFO Lives.
+        Parameter object: object being checked whether it collided with a UFO
+        Precondition: object is a Ship or Bullet (anything with getRadius)
+        """
+        return self._fleet.collide(object.x, object.y, object.getRadius())
 
-    Creates the objects with the given details and adds them to the attribute
-    that stores them.
-    """
-    if self._UFO != None:  # Ensure the UFO exists
-        # Set the initial y-coordinate for the lives icons
-        y_val = self._UFO.getUFO_y() + UFO_RADIUS + 15
-        for i in range(UFO_LIVES):  # Create icons for the number of UFO lives
+    def damage_UFO(self, i):
+        """
+        Method that takes one life from the UFO at index i.
+
+        Removes one of the UFO's life images. If the UFO has no lives left,
+        it is removed from the fleet along with its lives display.
+
+        Parameter i: index of the UFO in the fleet
+        Precondition: i is an int, 0 <= i < self._fleet.size()
+        """
+        if self._fleet.hit(i) < 1:
+            self._fleet.remove(i)
+            del self._ufonodes[i]
+        else:
+            self._ufonodes[i].detach()
+
+    def spawn_UFO(self, i):
+        """
+        Method that sets up a UFO that has just entered play.
+
+        Creates its lives display and, if it carries an alien, schedules its
+        first shot ALIEN_RATE frames from now.
+
+        Parameter i: index of the UFO in the fleet
+        Precondition: i is an int, 0 <= i < self._fleet.size(), and is the
+        index of the most recently spawned UFO
+        """
+        self.alienLives_image(i)
+        ufo = self._fleet.getUFO(i)
+        if isinstance(ufo, AlienUFO):
+            self._timers.schedule(ALIEN_RATE, self.alien_fire, ufo)
+
+    def alien_fire(self, ufo):
+        """
+        Method that fires a bullet from an alien UFO at the ship.
+
+        The alien fires again ALIEN_RATE frames later for as long as its UFO is
+        in play. It holds its fire while there is no ship.
+
+        Parameter ufo: The UFO the alien is in
+        Precondition: ufo is an AlienUFO object
+        """
+        if not ufo in self._fleet.getUFOs():
+            return  # The UFO was destroyed
+
+        if self._ship != None:
+            dir_x, dir_y = unit(self._ship.x - ufo.x, self._ship.y - ufo.y)
+            if dir_x != 0 or dir_y != 0:
+                bullet = Bullet(
+                    x = ufo.x + dir_x * UFO_RADIUS,
+                    y = ufo.y + dir_y * UFO_RADIUS,
+                    vel_x = dir_x * ALIEN_SPEED,
+                    vel_y = dir_y * ALIEN_SPEED,
+                    fillcolor = ALIEN_COLOR
+                )
+                self._alienbullets.append(bullet)
+                if self._world is None:
+                    self._timers.schedule(self.bullet_lifetime(bullet),
+                                          self.expire_bullet, bullet, self._alienbullets)
+        self._timers.schedule(ALIEN_RATE, self.alien_fire, ufo)
+
+    def alienLives_image(self, i):
+        """
+        Method that creates the objects representing the lives of one UFO.
+
+        Creates a SceneNode for the UFO and attaches one life object per UFO
+        life, placed relative to the UFO. The node is added to the attribute
+        that stores them.
+
+        Parameter i: index of the UFO in the fleet
+        Precondition: i is an int, 0 <= i < self._fleet.size(), and is the
+        index of the most recently spawned UFO
+        """
+        ufo = self._fleet.getUFO(i)
+        node = SceneNode(ufo)
+        for j in range(self._fleet.getLives(i)):  # One icon per UFO life
             life = UFOLives(
-                x = self._UFO.getUFO_x() - 20 + 20*(i),  # Set x-coordinate for each life
-                y = y_val,  # Set y-coordinate
-                vel_x = self._UFO.getUFOVel_x(),  # Set x-velocity
-                vel_y = self._UFO.getUFOVel_y(),  # Set y-velocity
+                x = ufo.getUFO_x() - 20 + 20*(j),  # Set x-coordinate for each life
+                y = ufo.getUFO_y() + UFO_RADIUS + 15,  # Set y-coordinate
                 fillcolor = 'green',  # Set the color of the life icon
                 width = 6,  # Set the width of the icon
                 height = 6  # Set the height of the icon
             )
-            self._ufolivesimage.append(life)  # Add the life icon to the list
-
-def update_UFOLives(self):
-    """
-    Method to updates the objects representing the UFO lives.
-
-    The objects' new positions are calculates and are wrapped to make sure
-    they do not go on forever.
-    """
-    for i in range(self._UFOlives):  # Loop through the remaining UFO lives
-        # Update the x and y positions of the life icons based on UFO's velocity
-        self._ufolivesimage[i].x += self._UFO.getUFOVel_x()
-        self._ufolivesimage[i].y += self._UFO.getUFOVel_y()
-        self._ufolivesimage[i].x_wrap()  # Wrap the x-coordinate if out of bounds
-        self._ufolivesimage[i].y_wrap()  # Wrap the y-coordinate if out of bounds
+            # Keep the icon below the UFO, offset by its place in the row
+            node.attach(life, -20 + 20*(j), UFO_RADIUS + 15)
+        self._ufonodes.append(node)
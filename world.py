@@ -0,0 +1,324 @@
+"""
+Large world module for Planetoids
+
+This module contains the streaming store Wave uses for a wave in a large
+world: a wrapping field many screens across, with a camera that follows the
+ship. Everything in play stays in screen coordinates. The camera is the
+world position of the bottom left corner of the screen, and moving it moves
+everything in play the other way.
+
+Only asteroids near the screen are in play. The rest are dormant: one row of
+floats each (position, velocity, size and the frame the position is from) in
+the numpy array of the chunk of the world they are in. A dormant asteroid
+moves at a constant velocity, so where it is now is worked out from its row
+when it is needed and never simulated frame by frame. Memory holds only the
+rows (48 bytes an asteroid, instead of an image), and each frame only looks
+at the chunks near the camera.
+
+Dormant asteroids drift out of their chunks, so a share of the chunks is
+brought up to date each frame (every chunk once in STREAM_PERIOD frames)
+and rows that have moved are put in their new chunk. The chunks near the
+camera are searched far enough out to cover the most an asteroid can have
+drifted since then, so no asteroid is missed.
+
+Dormant asteroids do not collide or bounce; they pass through each other
+until they are back in play.
+"""
+import math
+import numpy as np
+from consts import *
+from vecmath import wrapped_delta
+
+# The asteroid sizes, in the order of their codes in the dormant rows
+WORLD_SIZES = ('small', 'medium', 'large')
+
+# The columns of a dormant row
+ROW_X, ROW_Y, ROW_VX, ROW_VY, ROW_SIZE, ROW_FRAME = range(6)
+
+# The furthest a dormant asteroid can drift from its chunk between updates
+STREAM_DRIFT = max(SMALL_SPEED, MEDIUM_SPEED, LARGE_SPEED) * 2 * STREAM_PERIOD
+
+
+class StreamingWorld(object):
+    """
+    A class to represent the camera and the dormant asteroids of a large world.
+    """
+    # Attribute _width: the width of the world
+    # Invariant: _width is a float > 2 * (STREAM_DORMANT + STREAM_DRIFT)
+    #
+    # Attribute _height: the height of the world
+    # Invariant: _height is a float > 2 * (STREAM_DORMANT + STREAM_DRIFT)
+    #
+    # Attribute _columns: the number of chunks across the world
+    # Invariant: _columns is an int > 0
+    #
+    # Attribute _rows: the number of chunks up the world
+    # Invariant: _rows is an int > 0
+    #
+    # Attribute _chunk_width: the width of a chunk (at most CHUNK_SIZE, so they fit exactly)
+    # Invariant: _chunk_width is a float == _width / _columns
+    #
+    # Attribute _chunk_height: the height of a chunk
+    # Invariant: _chunk_height is a float == _height / _rows
+    #
+    # Attribute _camera_x: the world x of the left edge of the screen
+    # Invariant: _camera_x is a float, 0 <= _camera_x < _width
+    #
+    # Attribute _camera_y: the world y of the bottom edge of the screen
+    # Invariant: _camera_y is a float, 0 <= _camera_y < _height
+    #
+    # Attribute _chunks: the dormant rows of each chunk that has any, by (column, row)
+    # Invariant: _chunks is a dict of (int, int) to (n, 6) numpy float arrays, n > 0
+    #
+    # Attribute _count: the number of dormant asteroids
+    # Invariant: _count is an int >= 0
+    #
+    # Attribute _queue: the chunks still to bring up to date this round
+    # Invariant: _queue is a list of keys of _chunks (some may have emptied since)
+    #
+    # Attribute _share: the number of chunks brought up to date each frame this round
+    # Invariant: _share is an int > 0
+
+    def getWidth(self):
+        """
+        Returns the width of the world.
+        """
+        return self._width
+
+    def getHeight(self):
+        """
+        Returns the height of the world.
+        """
+        return self._height
+
+    def getCamera(self):
+        """
+        Returns the world position of the bottom left corner of the screen, as (x, y).
+        """
+        return (self._camera_x, self._camera_y)
+
+    def getChunks(self):
+        """
+        Returns the number of chunks holding dormant asteroids.
+        """
+        return len(self._chunks)
+
+    def size(self):
+        """
+        Returns the number of dormant asteroids.
+        """
+        return self._count
+
+    def __init__(self, width, height, x, y):
+        """
+        Initializes a world with no asteroids and the camera centered on (x, y).
+
+        Parameter width: the width of the world
+        Precondition: width is a number > 2 * (STREAM_DORMANT + STREAM_DRIFT)
+
+        Parameter height: the height of the world
+        Precondition: height is a number > 2 * (STREAM_DORMANT + STREAM_DRIFT)
+
+        Parameter x: the world x of the middle of the screen
+        Precondition: x is a number
+
+        Parameter y: the world y of the middle of the screen
+        Precondition: y is a number
+        """
+        self._width = float(width)
+        self._height = float(height)
+        self._columns = int(math.ceil(self._width / CHUNK_SIZE))
+        self._rows = int(math.ceil(self._height / CHUNK_SIZE))
+        self._chunk_width = self._width / self._columns
+        self._chunk_height = self._height / self._rows
+        self._camera_x = (x - GAME_WIDTH / 2) % self._width
+        self._camera_y = (y - GAME_HEIGHT / 2) % self._height
+        self._chunks = {}
+        self._count = 0
+        self._queue = []
+        self._share = 1
+
+    def shift(self, dx, dy):
+        """
+        Moves the camera.
+
+        Parameter dx: the distance to move right
+        Precondition: dx is a number
+
+        Parameter dy: the distance to move up
+        Precondition: dy is a number
+        """
+        self._camera_x = (self._camera_x + dx) % self._width
+        self._camera_y = (self._camera_y + dy) % self._height
+
+    def add(self, rows, frame):
+        """
+        Adds dormant asteroids at world positions.
+
+        Parameter rows: the asteroids, one (x, y, vel_x, vel_y, size) row each,
+        where size is an index into WORLD_SIZES
+        Precondition: rows is an (n, 5) numpy float array
+
+        Parameter frame: the frame the positions are from
+        Precondition: frame is an int >= 0
+        """
+        if len(rows) == 0:
+            return
+        full = np.empty((len(rows), 6))
+        full[:, 0:5] = rows
+        full[:, ROW_X] %= self._width
+        full[:, ROW_Y] %= self._height
+        full[:, ROW_FRAME] = frame
+        self._count += len(full)
+        self._store(full)
+
+    def bury(self, rows, frame):
+        """
+        Makes asteroids in play dormant.
+
+        Parameter rows: the asteroids, one (x, y, vel_x, vel_y, size) row each
+        in screen coordinates, where size is an index into WORLD_SIZES
+        Precondition: rows is an (n, 5) numpy float array
+
+        Parameter frame: the current frame
+        Precondition: frame is an int >= 0
+        """
+        rows = np.array(rows, dtype=float)
+        rows[:, ROW_X] += self._camera_x
+        rows[:, ROW_Y] += self._camera_y
+        self.add(rows, frame)
+
+    def wake(self, frame):
+        """
+        Returns the dormant asteroids now within STREAM_ACTIVE of the middle of
+        the screen, removing them from the world.
+
+        The result has one (x, y, vel_x, vel_y, size) row per asteroid, in
+        screen coordinates, where size is an index into WORLD_SIZES.
+
+        Parameter frame: the current frame
+        Precondition: frame is an int >= 0
+        """
+        center_x = self._camera_x + GAME_WIDTH / 2
+        center_y = self._camera_y + GAME_HEIGHT / 2
+        keys = self._near(center_x, center_y, STREAM_ACTIVE + STREAM_DRIFT)
+        if len(keys) == 0:
+            return np.empty((0, 5))
+
+        # Test every candidate at once, then split the result back by chunk
+        rows = np.concatenate([self._chunks[key] for key in keys])
+        x, y = self._advance(rows, frame)
+        dx = wrapped_delta(x - center_x, self._width)
+        dy = wrapped_delta(y - center_y, self._height)
+        near = dx*dx + dy*dy < STREAM_ACTIVE * STREAM_ACTIVE
+        if not near.any():
+            return np.empty((0, 5))
+
+        start = 0
+        for key in keys:
+            stop = start + len(self._chunks[key])
+            if near[start:stop].any():
+                left = self._chunks[key][~near[start:stop]]
+                if len(left) > 0:
+                    self._chunks[key] = left
+                else:
+                    del self._chunks[key]
+            start = stop
+
+        result = np.empty((int(near.sum()), 5))
+        result[:, ROW_X] = GAME_WIDTH / 2 + dx[near]
+        result[:, ROW_Y] = GAME_HEIGHT / 2 + dy[near]
+        result[:, ROW_VX:ROW_FRAME] = rows[near, ROW_VX:ROW_FRAME]
+        self._count -= len(result)
+        return result
+
+    def refresh(self, frame):
+        """
+        Brings this frame's share of the chunks up to date.
+
+        The rows are moved to where their asteroids are now, and any that
+        have left their chunk are put in their new one.
+
+        Parameter frame: the current frame
+        Precondition: frame is an int >= 0
+        """
+        if len(self._queue) == 0:
+            self._queue = list(self._chunks)
+            self._share = max(1, int(math.ceil(len(self._queue) / STREAM_PERIOD)))
+        keys = self._queue[-self._share:]
+        del self._queue[-self._share:]
+
+        parts = [self._chunks.pop(key) for key in keys if key in self._chunks]
+        if len(parts) == 0:
+            return
+        rows = np.concatenate(parts)
+        rows[:, ROW_X], rows[:, ROW_Y] = self._advance(rows, frame)
+        rows[:, ROW_FRAME] = frame
+        self._store(rows)
+
+    # HELPER METHODS
+    def _advance(self, rows, frame):
+        """
+        Returns the world positions of dormant asteroids at a frame, as (x, y) arrays.
+
+        Parameter rows: the dormant rows
+        Precondition: rows is an (n, 6) numpy float array
+
+        Parameter frame: the frame
+        Precondition: frame is an int >= every frame in rows
+        """
+        age = frame - rows[:, ROW_FRAME]
+        x = (rows[:, ROW_X] + rows[:, ROW_VX] * age) % self._width
+        y = (rows[:, ROW_Y] + rows[:, ROW_VY] * age) % self._height
+        return (x, y)
+
+    def _store(self, rows):
+        """
+        Adds dormant rows to the chunks their positions are in.
+
+        Parameter rows: the dormant rows, with wrapped world positions
+        Precondition: rows is an (n, 6) numpy float array
+        """
+        columns = np.minimum((rows[:, ROW_X] // self._chunk_width).astype(int),
+                             self._columns - 1)
+        rows_up = np.minimum((rows[:, ROW_Y] // self._chunk_height).astype(int),
+                             self._rows - 1)
+        keys = columns * self._rows + rows_up
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        rows = rows[order]
+        starts = (np.flatnonzero(np.diff(keys)) + 1).tolist()
+        for start, stop, key in zip([0] + starts, starts + [len(keys)],
+                                    keys[[0] + starts].tolist()):
+            key = divmod(key, self._rows)
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                self._chunks[key] = rows[start:stop]
+            else:
+                self._chunks[key] = np.concatenate((chunk, rows[start:stop]))
+
+    def _near(self, x, y, reach):
+        """
+        Returns the keys of the chunks with rows that overlap the square of
+        side 2 * reach around a world position.
+
+        Parameter x: the world x of the middle of the square
+        Precondition: x is a float
+
+        Parameter y: the world y of the middle of the square
+        Precondition: y is a float
+
+        Parameter reach: half the side of the square
+        Precondition: reach is a number > 0
+        """
+        width = self._chunk_width
+        height = self._chunk_height
+        columns = range(int((x - reach) // width), int((x + reach) // width) + 1)
+        rows_up = range(int((y - reach) // height), int((y + reach) // height) + 1)
+        keys = []
+        for i in columns:
+            for j in rows_up:
+                key = (i % self._columns, j % self._rows)
+                if key in self._chunks and not key in keys:
+                    keys.append(key)
+        return keys